@@ -4,9 +4,10 @@ import datetime
 import requests
 import uuid
 import re
+import json
 from zoneinfo import ZoneInfo
 
-from flask import Flask, request, redirect, url_for, session, abort, jsonify, flash, render_template, Response
+from flask import Flask, request, redirect, url_for, session, abort, jsonify, flash, render_template, Response, stream_with_context
 from werkzeug.security import generate_password_hash
 import sys
 from pymongo import MongoClient
@@ -15,9 +16,13 @@ load_dotenv()
 
 # Import new service layer
 from services.auth_service import auth_service
-from services.order_service import order_service
+from models.user import user_model
+from services.order_service import order_service, BATCH_QUOTE_MAX_ITEMS
 from services.image_service import image_service
 from services.email_service import email_service
+from services.email_outbox_worker import email_outbox_worker
+from services.email_renderer import email_renderer
+from services.autocomplete_service import autocomplete_service, AutocompleteSuperseded
 from utils.formatters import format_helsinki_time
 from typing import Any, Dict, Optional
 from utils.rate_limiter import check_rate_limit
@@ -105,8 +110,11 @@ def set_security_headers(resp: Response) -> Response:
     )
     return resp
 
-# Configure email service
+# Configure email service; emails are queued and sent by the outbox worker thread
 mail = email_service.configure_mail(app)
+email_outbox_worker.init_app(app)
+# Compile email templates now instead of on the first send of each
+email_renderer.init_app(app)
 # --- Compat: pudota tuntematon 'partitioned' kwarg vanhasta Werkzeugista ---
 try:
     from flask import Response as _FlaskResponse
@@ -133,13 +141,15 @@ import order_wizard_new
 # ----------------- DB HELPERS -----------------
 
 def init_db():
-    # indeksit
-    users_col().create_index("email", unique=True)
-    users_col().create_index("id", unique=True)
-
-    orders_col().create_index([("id", 1)], unique=True)
-    orders_col().create_index([("user_id", 1)])
-    orders_col().create_index([("status", 1), ("id", -1)])
+    # indeksit: declared on the models, see models/indexes.py
+    from models.indexes import sync_indexes
+    try:
+        report = sync_indexes()
+        for action in ("created", "rebuilt", "unknown"):
+            if report[action]:
+                print(f"Indexes {action}: {', '.join(report[action])}")
+    except Exception as e:
+        print(f"Warning: Index sync failed (may be concurrent initialization): {e}")
 
     # Sync counters with existing data to prevent duplicate key errors
     print("Syncing counters with existing data...")
@@ -411,39 +421,18 @@ def inject_admin_notifications():
         return {'admin_notifications': None}
     
     try:
-        from datetime import datetime, timezone
-        
-        # Get last viewed timestamps from session
-        last_viewed_orders = session.get('admin_last_viewed_orders')
-        last_viewed_reviews = session.get('admin_last_viewed_reviews')
-        last_viewed_applications = session.get('admin_last_viewed_applications')
-        
-        # Count new orders created after last view
-        orders_query: Dict[str, Any] = {'status': 'NEW'}
-        if last_viewed_orders is not None:
-            orders_query = {**orders_query, 'created_at': {'$gt': last_viewed_orders}}
-        new_orders_count = orders_col().count_documents(orders_query)
-        
-        # Count pending reviews created after last view
-        from models.rating import rating_model
-        reviews_query: Dict[str, Any] = {'status': 'pending'}
-        if last_viewed_reviews is not None:
-            reviews_query = {**reviews_query, 'created_at': {'$gt': last_viewed_reviews}}
-        pending_reviews_count = len(list(rating_model.find(reviews_query)))
-        
-        # Count pending applications created after last view
-        from models.driver_application import driver_application_model
-        apps_query: Dict[str, Any] = {'status': 'pending'}
-        if last_viewed_applications is not None:
-            apps_query = {**apps_query, 'created_at': {'$gt': last_viewed_applications}}
-        pending_applications_count = driver_application_model.count_documents(apps_query)
+        # Cached pending-item snapshots; the last viewed offsets from the session
+        # are applied in memory, so this normally runs no queries
+        from services.admin_notification_service import (
+            admin_notification_service, KIND_ORDERS, KIND_REVIEWS, KIND_APPLICATIONS
+        )
         
         return {
-            'admin_notifications': {
-                'new_orders': new_orders_count,
-                'pending_reviews': pending_reviews_count,
-                'pending_applications': pending_applications_count
-            }
+            'admin_notifications': admin_notification_service.get_badges({
+                KIND_ORDERS: session.get('admin_last_viewed_orders'),
+                KIND_REVIEWS: session.get('admin_last_viewed_reviews'),
+                KIND_APPLICATIONS: session.get('admin_last_viewed_applications')
+            })
         }
     except Exception as e:
         print(f"Error loading admin notifications: {e}")
@@ -634,6 +623,12 @@ def logout():
     session.clear()
     return redirect("/")
 
+def autocomplete_session_id() -> str:
+    """Random per-browser-session id; remote_addr is the platform proxy for every anonymous user"""
+    if "autocomplete_sid" not in session:
+        session["autocomplete_sid"] = secrets.token_hex(8)
+    return session["autocomplete_sid"]
+
 @app.post("/api/places_autocomplete")
 def api_places_autocomplete():
     """Google Places Autocomplete API endpoint"""
@@ -649,31 +644,21 @@ def api_places_autocomplete():
         return jsonify({"error": "Google Places API key not configured"}), 500
 
     try:
-        # Google Places Autocomplete API request
-        url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-        params = {
-            "input": query,
-            "key": GOOGLE_PLACES_API_KEY,
-            "language": "fi",
-            "types": "address",  # Only address type to avoid API conflicts
-        }
-        if scope == "fi":
-            params["components"] = "country:FI"  # Restrict to Finland
-
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get("status") == "OK":
-            return jsonify({
-                "predictions": data.get("predictions", []),
-                "status": data.get("status"),
-                "source": "google"
-            })
-        else:
-            error_msg = f"Google Places API error: {data.get('status')} - {data.get('error_message', 'Unknown error')}"
-            return jsonify({"error": error_msg}), 500
-
+        predictions, source = autocomplete_service.get_predictions(
+            query,
+            scope,
+            session_key=autocomplete_session_id()
+        )
+        return jsonify({
+            "predictions": predictions,
+            "status": "OK",
+            "source": source
+        })
+    except AutocompleteSuperseded:
+        # A newer keystroke from the same session replaced this query
+        return jsonify({"predictions": [], "status": "SUPERSEDED", "source": "superseded"})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
     except requests.exceptions.RequestException as e:
         error_msg = f"HTTP request failed: {str(e)}"
         return jsonify({"error": error_msg}), 500
@@ -1112,8 +1097,7 @@ def api_quote_for_addresses():
         is_first_order = False
         if user_id:
             try:
-                existing_orders = order_service.get_user_orders(user_id, limit=1)
-                is_first_order = len(existing_orders) == 0
+                is_first_order = order_service.is_first_order(user_id)
             except Exception as e:
                 print(f"Failed to determine first-order status for quote: {e}")
 
@@ -1152,6 +1136,54 @@ def api_quote_for_addresses():
         return jsonify({"error": "Hintalaskenta ei ole saatavilla juuri nyt, yritä hetken kuluttua uudestaan"}), 500
 
 
+@app.post("/api/quote_batch")
+def api_quote_batch():
+    """
+    Quote many pickup/dropoff pairs in one request (fleet customers).
+    Body: {"items": [{"pickup", "dropoff", "pickup_place_id", "dropoff_place_id", "return_leg"}], "promo_code"}
+    Streams one JSON object per line as each item is priced.
+    """
+    user = auth_service.get_current_user()
+    if not user:
+        return jsonify({"error": "Kirjaudu sisään käyttääksesi hintalaskuria"}), 401
+
+    allowed, retry_after = check_rate_limit(f"quote_batch:{request.remote_addr}", limit=5, window_seconds=60, lockout_seconds=300)
+    if not allowed:
+        return jsonify({"error": "Liikaa pyyntöjä, yritä hetken kuluttua"}), 429
+
+    payload = request.get_json(force=True, silent=True) or {}
+    items = payload.get("items")
+    # Malformed items are reported per item in the stream, not by failing the whole batch
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Lähtö- ja kohdeosoitteet vaaditaan"}), 400
+    if len(items) > BATCH_QUOTE_MAX_ITEMS:
+        return jsonify({"error": f"Enintään {BATCH_QUOTE_MAX_ITEMS} kuljetusta kerralla"}), 400
+
+    user_id = int(user["id"]) if user.get("id") else None
+    is_first_order = False
+    if user_id:
+        try:
+            is_first_order = order_service.is_first_order(user_id)
+        except Exception as e:
+            print(f"Failed to determine first-order status for batch quote: {e}")
+
+    promo_code = payload.get("promo_code")
+    if not isinstance(promo_code, str):
+        promo_code = None
+    results = order_service.batch_quote(
+        items,
+        user_id=user_id,
+        promo_code=promo_code,
+        is_first_order=is_first_order
+    )
+
+    def generate():
+        for result in results:
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @app.get("/api/quote")
 def api_quote():
     user = auth_service.get_current_user()
@@ -1211,7 +1243,7 @@ def api_saved_addresses_list():
         a["phone"] = str(phone_raw).strip() if phone_raw else ""
             
     if modified:
-        users_col().update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": addrs}})
+        user_model.update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": addrs}})
         
     return jsonify({"items": addrs})
 
@@ -1240,7 +1272,7 @@ def api_saved_addresses_create():
     doc = users_col().find_one({"id": int(u["id"])}, {"_id": 0, "saved_addresses": 1}) or {}
     arr = list(doc.get("saved_addresses") or [])
     arr.append(item)
-    users_col().update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": arr}})
+    user_model.update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": arr}})
     return jsonify({"item": item})
 
 @app.put("/api/saved_addresses/<addr_id>")
@@ -1269,7 +1301,7 @@ def api_saved_addresses_update(addr_id: str):
             break
     if not found:
         return jsonify({"error": "not found"}), 404
-    users_col().update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": arr}})
+    user_model.update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": arr}})
     return jsonify({"item": next(a for a in arr if str(a.get("id")) == str(addr_id))})
 
 @app.delete("/api/saved_addresses/<addr_id>")
@@ -1283,7 +1315,7 @@ def api_saved_addresses_delete(addr_id: str):
     if len(new_arr) == len(arr):
         return jsonify({"error": "not found"}), 404
     
-    users_col().update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": new_arr}})
+    user_model.update_one({"id": int(u["id"])}, {"$set": {"saved_addresses": new_arr}})
     return jsonify({"ok": True})
 
 
@@ -1451,76 +1483,25 @@ def submit_driver_application():
     application_dict: Dict[str, Any] = application
 
     try:
-        import uuid
-        from werkzeug.utils import secure_filename
-
-        # Process front image
-        # Validate file
-        front_validation_error = image_service._validate_file(license_front)
-        if front_validation_error:
-            flash(f"Virhe ajokortin etupuolessa: {front_validation_error}", "error")
-            return render_template('driver_application.html')
-
-        # Generate unique filename and save temporarily
-        front_extension = image_service._get_file_extension(license_front.filename or "")
-        front_unique_filename = f"license_{application_id}_front_{uuid.uuid4().hex}.{front_extension}"
-        front_temp_path = os.path.join(image_service.upload_folder, front_unique_filename)
-        license_front.save(front_temp_path)
-
-        # Process image with higher quality for license images
-        front_processed_path = image_service._process_image(front_temp_path, max_width=None, quality=95)
-        if not front_processed_path:
-            image_service._cleanup_file(front_temp_path)
-            flash("Virhe ajokortin etupuolen käsittelyssä - tarkista että kuva ei ole vioittunut", "error")
-            return render_template('driver_application.html')
-
-        # Upload front image to GCS privately
-        front_blob_name = f"driver-licenses/{application_id}/front.jpg"
-        front_blob, front_upload_error = gcs_service.upload_private_file(
-            front_processed_path,
-            front_blob_name
-        )
-        if front_upload_error:
-            flash(f"Virhe ajokortin etupuolen tallentamisessa: {front_upload_error}", "error")
-            image_service._cleanup_file(front_processed_path)
-            return render_template('driver_application.html')
-
-        license_images["front"] = front_blob_name
-        image_service._cleanup_file(front_processed_path)  # Clean up temp file
-
-        # Process back image
-        # Validate file
-        back_validation_error = image_service._validate_file(license_back)
-        if back_validation_error:
-            flash(f"Virhe ajokortin takapuolessa: {back_validation_error}", "error")
-            return render_template('driver_application.html')
-
-        # Generate unique filename and save temporarily
-        back_extension = image_service._get_file_extension(license_back.filename or "")
-        back_unique_filename = f"license_{application_id}_back_{uuid.uuid4().hex}.{back_extension}"
-        back_temp_path = os.path.join(image_service.upload_folder, back_unique_filename)
-        license_back.save(back_temp_path)
-
-        # Process image with higher quality for license images
-        back_processed_path = image_service._process_image(back_temp_path, max_width=None, quality=95)
-        if not back_processed_path:
-            image_service._cleanup_file(back_temp_path)
-            flash("Virhe ajokortin takapuolen käsittelyssä - tarkista että kuva ei ole vioittunut", "error")
-            return render_template('driver_application.html')
-
-        # Upload back image to GCS privately
-        back_blob_name = f"driver-licenses/{application_id}/back.jpg"
-        back_blob, back_upload_error = gcs_service.upload_private_file(
-            back_processed_path,
-            back_blob_name
+        # Process each side in memory (higher quality for license images) and upload the buffer
+        license_sides = (
+            ("front", license_front, "etupuolessa", "etupuolen"),
+            ("back", license_back, "takapuolessa", "takapuolen"),
         )
-        if back_upload_error:
-            flash(f"Virhe ajokortin takapuolen tallentamisessa: {back_upload_error}", "error")
-            image_service._cleanup_file(back_processed_path)
-            return render_template('driver_application.html')
-
-        license_images["back"] = back_blob_name
-        image_service._cleanup_file(back_processed_path)  # Clean up temp file
+        for side, upload, label_in, label_of in license_sides:
+            image_data, image_error = image_service.process_upload(upload, max_width=None, quality=95)
+            if image_error:
+                flash(f"Virhe ajokortin {label_in}: {image_error}", "error")
+                return render_template('driver_application.html')
+
+            # Upload image to GCS privately
+            blob_name = f"driver-licenses/{application_id}/{side}.jpg"
+            _, upload_error = gcs_service.upload_private_bytes(image_data, blob_name)
+            if upload_error:
+                flash(f"Virhe ajokortin {label_of} tallentamisessa: {upload_error}", "error")
+                return render_template('driver_application.html')
+
+            license_images[side] = blob_name
 
         # Update application with license image blob names
         driver_application_model.update_one(
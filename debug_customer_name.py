@@ -6,7 +6,8 @@ import json
 with app.app_context():
     # Force fresh fetch
     print("Fetching orders...")
-    orders, total = order_model.get_orders_with_driver_info_paginated(page=1, per_page=10)
+    page = order_model.get_orders_with_driver_info_page(per_page=10)
+    orders, total = page["orders"], page["total"]
     
     print(f"Found {total} total orders. Inspecting first 5:")
     for order in orders[:5]:
@@ -0,0 +1,42 @@
+"""
+Database Migration: Backfill order search tokens
+
+Writes search_tokens (order id, reg number, orderer, customer and driver
+names) on every order so the admin dashboard search can match on the
+indexed field. Orders created before the tokens existed are not found by
+the dashboard search until this has run. Safe to re-run.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.order import order_model
+
+
+def backfill_order_search_tokens():
+    """Recompute search_tokens for all orders"""
+    print("[MIGRATION] Writing order search tokens...")
+    updated = order_model.refresh_search_fields()
+    print(f"\n[MIGRATION COMPLETE]")
+    print(f"  - Orders updated: {updated}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Order Search Tokens Backfill")
+    print("=" * 60)
+
+    if "--yes" in sys.argv:
+        backfill_order_search_tokens()
+        sys.exit(0)
+
+    # Confirm before running
+    response = input("\nThis will rewrite search_tokens on all orders.\nContinue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        backfill_order_search_tokens()
+    else:
+        print("[CANCELLED] Migration cancelled by user")
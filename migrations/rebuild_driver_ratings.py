@@ -0,0 +1,42 @@
+"""
+Database Migration / Reconciliation: Rebuild driver rating aggregates
+
+Recomputes rating_sum, total_ratings, rating_histogram and average_rating on
+every driver document from approved ratings with a single $group pipeline.
+Run once after deploying running aggregates, and any time they need
+reconciling (e.g. after manual edits to the ratings collection).
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.rating import rating_model
+
+
+def rebuild_driver_ratings():
+    """Rebuild rating aggregates for all drivers"""
+    print("[MIGRATION] Rebuilding driver rating aggregates...")
+    updated = rating_model.rebuild_driver_rating_aggregates()
+    print(f"\n[MIGRATION COMPLETE]")
+    print(f"  - Drivers with approved ratings: {updated}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Driver Rating Aggregates Rebuild")
+    print("=" * 60)
+
+    if "--yes" in sys.argv:
+        rebuild_driver_ratings()
+        sys.exit(0)
+
+    # Confirm before running
+    response = input("\nThis will overwrite rating aggregates on all driver documents.\nContinue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        rebuild_driver_ratings()
+    else:
+        print("[CANCELLED] Migration cancelled by user")
@@ -0,0 +1,43 @@
+"""
+Database Migration / Reconciliation: Rebuild order counters
+
+Recomputes the materialised order_counters document (total, per-status and
+per-day counts) from the orders collection with a single $group pipeline.
+Run once after deploying the counters, and any time they need reconciling
+(e.g. after manual edits or bulk imports to the orders collection).
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.order import order_model
+
+
+def rebuild_order_counters():
+    """Rebuild the order counters document"""
+    print("[MIGRATION] Rebuilding order counters...")
+    counters = order_model.rebuild_order_counters()
+    print(f"\n[MIGRATION COMPLETE]")
+    print(f"  - Orders counted: {counters['total']}")
+    print(f"  - Statuses: {len(counters['by_status'])}, days: {len(counters['by_day'])}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Order Counters Rebuild")
+    print("=" * 60)
+
+    if "--yes" in sys.argv:
+        rebuild_order_counters()
+        sys.exit(0)
+
+    # Confirm before running
+    response = input("\nThis will overwrite the order_counters document.\nContinue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        rebuild_order_counters()
+    else:
+        print("[CANCELLED] Migration cancelled by user")
@@ -0,0 +1,44 @@
+"""
+Database Migration / Reconciliation: Rebuild per-user order stats
+
+Recomputes the user_order_stats documents (order count, last order number,
+first order id, lifetime spend) for every customer from the orders collection
+with a single $group by user_id. Stats are also seeded lazily per user on
+their next order, so this is only needed to backfill everyone at once or to
+repair drift after manual edits or bulk imports.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.order import order_model
+
+
+def rebuild_user_order_stats():
+    """Rebuild the per-user order stats"""
+    print("[MIGRATION] Rebuilding per-user order stats...")
+    rebuilt = order_model.rebuild_user_order_stats()
+    print(f"\n[MIGRATION COMPLETE]")
+    print(f"  - Customers: {len(rebuilt)}")
+    print(f"  - Orders counted: {sum(stats['order_count'] for stats in rebuilt.values())}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Per-user Order Stats Rebuild")
+    print("=" * 60)
+
+    if "--yes" in sys.argv:
+        rebuild_user_order_stats()
+        sys.exit(0)
+
+    # Confirm before running
+    response = input("\nThis will overwrite the user_order_stats documents.\nContinue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        rebuild_user_order_stats()
+    else:
+        print("[CANCELLED] Migration cancelled by user")
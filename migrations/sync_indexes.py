@@ -0,0 +1,53 @@
+"""
+Database Migration: Sync declared indexes
+
+Creates the indexes declared on the models (models/indexes.py) and rebuilds
+any whose keys or options changed. Safe to run on every deploy. Indexes that
+are no longer declared are listed; pass --prune to drop them, --dry-run to
+only report what would change.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path so we can import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.indexes import sync_indexes
+
+
+def run_sync(prune=False, dry_run=False):
+    """Sync indexes and print what changed"""
+    print(f"[MIGRATION] Syncing indexes{' (dry run)' if dry_run else ''}...")
+    report = sync_indexes(prune=prune, dry_run=dry_run)
+
+    for action in ("created", "rebuilt", "dropped", "unknown"):
+        for label in report[action]:
+            print(f"  - {action}: {label}")
+
+    print(f"\n[MIGRATION COMPLETE]")
+    print(f"  - Unchanged: {len(report['unchanged'])}, created: {len(report['created'])}, "
+          f"rebuilt: {len(report['rebuilt'])}, dropped: {len(report['dropped'])}")
+    if report["unknown"]:
+        print(f"  - {len(report['unknown'])} undeclared indexes kept (run with --prune to drop)")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Index Sync")
+    print("=" * 60)
+
+    prune = "--prune" in sys.argv
+    dry_run = "--dry-run" in sys.argv
+
+    if "--yes" in sys.argv or dry_run or not prune:
+        run_sync(prune=prune, dry_run=dry_run)
+        sys.exit(0)
+
+    # Dropping indexes needs confirmation
+    response = input("\nThis will drop indexes that are not declared on the models.\nContinue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        run_sync(prune=prune)
+    else:
+        print("[CANCELLED] Migration cancelled by user")
@@ -0,0 +1,77 @@
+"""
+Admin Digest Model
+Buffered admin notifications, one open digest per order. Driver progress
+events are pushed here and the outbox worker turns each due digest into a
+single summary email (services/admin_digest_service.py).
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List
+from pymongo import ReturnDocument
+from .database import BaseModel
+from .indexes import IndexSpec
+
+
+class AdminDigestModel(BaseModel):
+    """Open admin notification digests keyed by order id"""
+
+    collection_name = "admin_notification_digests"
+
+    indexes = (
+        # Due digests for the flusher
+        IndexSpec("flush_at"),
+    )
+
+    def add_event(self, order_id: int, event: Dict, order_summary: Dict, flush_at: datetime,
+                  flush_now: bool = False) -> Dict:
+        """
+        Append an event to the order's open digest, opening one if needed.
+        The flush time is set by the first event; flush_now moves it to now.
+        """
+        now = datetime.now(timezone.utc)
+        update = {
+            "$push": {"events": event},
+            "$set": {"order": order_summary, "updated_at": now},
+            "$setOnInsert": {"opened_at": now},
+        }
+        if flush_now:
+            update["$set"]["flush_at"] = now
+        else:
+            # Keeps the earliest flush time, so later events never postpone the digest
+            update["$min"] = {"flush_at": flush_at}
+        return self.collection.find_one_and_update(
+            {"_id": order_id},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def claim_due(self, limit: int = 50) -> List[Dict]:
+        """Remove and return digests whose flush time has passed (oldest first)"""
+        now = datetime.now(timezone.utc)
+        claimed = []
+        for _ in range(limit):
+            doc = self.collection.find_one_and_delete({"flush_at": {"$lte": now}}, sort=[("flush_at", 1)])
+            if doc is None:
+                break
+            claimed.append(doc)
+        return claimed
+
+    def restore(self, digest: Dict, flush_at: datetime):
+        """Put a claimed digest back after a failed flush, merging events added meanwhile"""
+        self.collection.update_one(
+            {"_id": digest["_id"]},
+            {
+                "$push": {"events": {"$each": digest.get("events", []), "$position": 0}},
+                "$setOnInsert": {"order": digest.get("order"), "opened_at": digest.get("opened_at")},
+                "$min": {"flush_at": flush_at},
+            },
+            upsert=True
+        )
+
+    def get_open_count(self) -> int:
+        return self.count_documents({})
+
+
+# Global instance
+admin_digest_model = AdminDigestModel()
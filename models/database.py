@@ -4,6 +4,7 @@ Centralized MongoDB connection management and database operations
 """
 
 import os
+import threading
 from pymongo import MongoClient, ReturnDocument
 from dotenv import load_dotenv
 
@@ -15,6 +16,14 @@ DB_NAME = os.getenv("DB_NAME", "carrental")
 if not MONGODB_URI:
     raise RuntimeError("MONGODB_URI puuttuu (aseta ympäristömuuttuja).")
 
+# IDs reserved per counter round trip; each worker hands its block out locally
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "50"))
+# Sequences allocated one ID at a time. Order IDs are the admin list's sort key
+# and customers' order numbers, so they stay in creation order without gaps.
+SEQUENTIAL_ID_SEQUENCES = {
+    name.strip() for name in os.getenv("SEQUENTIAL_ID_SEQUENCES", "orders").split(",") if name.strip()
+}
+
 
 class DatabaseManager:
     """Singleton database manager for MongoDB connections"""
@@ -61,15 +70,16 @@ class DatabaseManager:
                 max_id = 0
                 print(f"No existing records in {collection_name}, starting counter at 0")
 
-            # Set the counter to max_id (next increment will be max_id + 1)
+            # Only ever move forward: other workers may hold reserved blocks above max_id
             counters_col = self.get_collection("counters")
-            counters_col.update_one(
+            counter = counters_col.find_one_and_update(
                 {"_id": sequence_name},
-                {"$set": {"value": max_id}},
-                upsert=True
+                {"$max": {"value": max_id}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
             )
-            print(f"Synced {sequence_name} counter to {max_id}")
-            return max_id
+            print(f"Synced {sequence_name} counter to {counter['value']}")
+            return counter["value"]
 
         except Exception as e:
             print(f"Error syncing counter {sequence_name}: {e}")
@@ -87,6 +97,9 @@ class BaseModel:
     """Base model class with common database operations"""
 
     collection_name = None
+    # IndexSpecs for this collection / {other collection: [IndexSpec]}, see models.indexes
+    indexes = ()
+    related_indexes = {}
 
     def __init__(self):
         self.db_manager = DatabaseManager()
@@ -143,16 +156,76 @@ class BaseModel:
 
 
 class CounterManager:
-    """Manages auto-incrementing counters for IDs"""
-
-    def __init__(self):
+    """
+    Manages auto-incrementing counters for IDs.
+
+    Most sequences are handed out from blocks of ID_BLOCK_SIZE reserved with a
+    single $inc, so only one insert in a block pays a counter round trip. IDs
+    stay unique across workers but are not in creation order between workers,
+    and a restart skips the rest of its block. Sequences in
+    SEQUENTIAL_ID_SEQUENCES are allocated one at a time instead: increasing in
+    creation order, and gap-free as long as failed inserts release their ID.
+    """
+
+    def __init__(self, block_size=None, sequential=None):
         self.db_manager = DatabaseManager()
         self.collection = self.db_manager.get_collection("counters")
+        self.block_size = ID_BLOCK_SIZE if block_size is None else block_size
+        self.sequential = SEQUENTIAL_ID_SEQUENCES if sequential is None else set(sequential)
+        self._blocks = {}  # sequence -> [next id, last reserved id]
+        self._checked = set()
+        self._lock = threading.Lock()
+        self._round_trips = 0
+        self._allocated = 0
+
+    def is_sequential(self, sequence_name):
+        """True if sequence_name is allocated one ID at a time"""
+        return sequence_name in self.sequential or self.block_size <= 1
 
     def get_next_id(self, sequence_name):
         """Get the next ID for a sequence"""
-        # Check if counter exists, if not sync it first to prevent starting from 1
+        with self._lock:
+            self._ensure_counter(sequence_name)
+            self._allocated += 1
+            if self.is_sequential(sequence_name):
+                return self._reserve(sequence_name, 1)
+
+            block = self._blocks.get(sequence_name)
+            if block is None or block[0] > block[1]:
+                last = self._reserve(sequence_name, self.block_size)
+                block = self._blocks[sequence_name] = [last - self.block_size + 1, last]
+            next_id = block[0]
+            block[0] += 1
+            return next_id
+
+    def release_id(self, sequence_name, value):
+        """
+        Give back an ID whose insert failed, so the sequence stays gap-free.
+        Only the most recently handed out ID can be returned; returns True if it was.
+        """
+        with self._lock:
+            if self.is_sequential(sequence_name):
+                self._round_trips += 1
+                result = self.collection.update_one({"_id": sequence_name, "value": value}, {"$inc": {"value": -1}})
+                return result.modified_count > 0
+            block = self._blocks.get(sequence_name)
+            if block is not None and block[0] - 1 == value:
+                block[0] = value
+                return True
+            return False
+
+    def resync(self, sequence_name, collection_name=None, id_field="id"):
+        """Drop this worker's unused block and move the counter past existing data"""
+        with self._lock:
+            self._blocks.pop(sequence_name, None)
+        return self.db_manager.sync_counter(sequence_name, collection_name or sequence_name, id_field)
+
+    def _ensure_counter(self, sequence_name):
+        # Check once per process that the counter exists; if not, sync it first to prevent starting from 1
+        if sequence_name in self._checked:
+            return
         counter_doc = self.collection.find_one({"_id": sequence_name})
+        self._round_trips += 1
         if not counter_doc:
             print(f"Counter {sequence_name} doesn't exist, syncing with existing data...")
             # Map sequence names to collection names
@@ -163,11 +236,14 @@ class CounterManager:
             }
             collection_name = collection_mapping.get(sequence_name, sequence_name)
             self.db_manager.sync_counter(sequence_name, collection_name, "id")
+        self._checked.add(sequence_name)
 
-        # Atomically increment and get the new value
+    def _reserve(self, sequence_name, count):
+        """Atomically advance the counter by count; returns the last reserved value"""
+        self._round_trips += 1
         result = self.collection.find_one_and_update(
             {"_id": sequence_name},
-            {"$inc": {"value": 1}},
+            {"$inc": {"value": count}},
             upsert=True,
             return_document=ReturnDocument.AFTER
         )
@@ -175,12 +251,31 @@ class CounterManager:
 
     def reset_counter(self, sequence_name, start_value=0):
         """Reset a counter to a specific value"""
+        with self._lock:
+            self._blocks.pop(sequence_name, None)
         self.collection.update_one(
             {"_id": sequence_name},
             {"$set": {"value": start_value}},
             upsert=True
         )
 
+    def forget(self):
+        """Drop local blocks and existence checks (after the counters collection was replaced)"""
+        with self._lock:
+            self._blocks.clear()
+            self._checked.clear()
+
+    def get_stats(self):
+        """IDs handed out and counter round trips taken by this worker"""
+        with self._lock:
+            return {
+                "block_size": self.block_size,
+                "sequential": sorted(self.sequential),
+                "allocated": self._allocated,
+                "round_trips": self._round_trips,
+                "blocks": {name: {"next": block[0], "last": block[1]} for name, block in self._blocks.items()}
+            }
+
 
 # Global instances for backward compatibility
 db_manager = DatabaseManager()
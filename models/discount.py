@@ -3,9 +3,19 @@ Discount Model
 Handles discount data operations and business logic for advanced pricing discounts
 """
 
+import os
+import time
+import threading
 from datetime import datetime, timezone
 from typing import List, Dict, Optional, Tuple
+from pymongo import ReturnDocument
 from .database import BaseModel, counter_manager
+from .indexes import IndexSpec
+
+# Shared rules version lives in the counters collection so every worker sees admin changes
+DISCOUNT_RULES_VERSION_KEY = "discount_rules_version"
+# How often a worker re-reads the shared version (the only DB access on the quote path)
+DISCOUNT_RULES_CHECK_SECONDS = float(os.getenv("DISCOUNT_RULES_CHECK_SECONDS", "5"))
 
 
 class DiscountModel(BaseModel):
@@ -13,6 +23,17 @@ class DiscountModel(BaseModel):
 
     collection_name = "discounts"
 
+    indexes = (
+        IndexSpec("id", unique=True),
+        IndexSpec("code", "active"),
+        # Active rules / user discounts by priority, and the admin list
+        IndexSpec("active", "priority", ("created_at", -1)),
+        IndexSpec("priority", ("created_at", -1)),
+    )
+    related_indexes = {
+        "discount_usage": (IndexSpec("discount_id"),),
+    }
+
     # Discount types
     TYPE_PERCENTAGE = "percentage"           # X% off total price
     TYPE_FIXED_AMOUNT = "fixed_amount"       # €X off total
@@ -35,6 +56,13 @@ class DiscountModel(BaseModel):
 
     VALID_SCOPES = [SCOPE_ACCOUNT, SCOPE_GLOBAL, SCOPE_CODE, SCOPE_FIRST_ORDER]
 
+    def __init__(self):
+        super().__init__()
+        self._rules: Optional["DiscountRuleSet"] = None
+        self._rules_checked_at = 0.0
+        self._rules_compiles = 0
+        self._rules_lock = threading.Lock()
+
     def create_discount(self, discount_data: Dict) -> Tuple[Optional[Dict], Optional[str]]:
         """Create a new discount"""
         try:
@@ -107,20 +135,21 @@ class DiscountModel(BaseModel):
             }
 
             self.insert_one(discount_doc)
+            self.invalidate_rules()
             return discount_doc, None
 
         except Exception as e:
             error_str = str(e)
             if "duplicate key error" in error_str.lower() or "E11000" in error_str:
                 # Handle duplicate key - resync counter and retry
-                from models.database import db_manager
-                db_manager.sync_counter("discounts", "discounts", "id")
+                counter_manager.resync("discounts")
                 
                 discount_id = counter_manager.get_next_id("discounts")
                 discount_doc["id"] = discount_id
                 
                 try:
                     self.insert_one(discount_doc)
+                    self.invalidate_rules()
                     return discount_doc, None
                 except Exception as retry_error:
                     return None, f"Alennuksen luominen epäonnistui: {str(retry_error)}"
@@ -172,6 +201,7 @@ class DiscountModel(BaseModel):
                 {"$set": update_fields}
             )
 
+            self.invalidate_rules()
             return True, None
 
         except Exception as e:
@@ -209,6 +239,58 @@ class DiscountModel(BaseModel):
             ]
         }).sort([("priority", 1)]))
 
+    def get_rules(self) -> "DiscountRuleSet":
+        """Compiled active discounts, rebuilt when the shared rules version changes"""
+        now = time.monotonic()
+        rules = self._rules
+        if rules is not None and now - self._rules_checked_at < DISCOUNT_RULES_CHECK_SECONDS:
+            return rules
+
+        with self._rules_lock:
+            rules = self._rules
+            if rules is not None and now - self._rules_checked_at < DISCOUNT_RULES_CHECK_SECONDS:
+                return rules
+
+            version = self._shared_rules_version()
+            if rules is None or version != rules.version:
+                # Expired discounts never become valid again; future ones are checked at match time
+                discounts = list(self.collection.find({
+                    "active": True,
+                    "$or": [{"valid_until": None}, {"valid_until": {"$gte": datetime.now(timezone.utc)}}]
+                }))
+                rules = DiscountRuleSet(discounts, version)
+                self._rules = rules
+                self._rules_compiles += 1
+            self._rules_checked_at = now
+            return rules
+
+    def invalidate_rules(self):
+        """Bump the shared rules version after any change that affects discount matching"""
+        try:
+            self.db_manager.get_collection("counters").update_one(
+                {"_id": DISCOUNT_RULES_VERSION_KEY},
+                {"$inc": {"value": 1}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Failed to bump discount rules version: {e}")
+        # This worker recompiles on its next quote, others within DISCOUNT_RULES_CHECK_SECONDS
+        with self._rules_lock:
+            self._rules = None
+
+    def get_rules_stats(self) -> Dict:
+        """Compiled rule set version and size (per worker process)"""
+        rules = self._rules
+        return {
+            "version": rules.version if rules else None,
+            "compiled_discounts": rules.size if rules else 0,
+            "compiles": self._rules_compiles
+        }
+
+    def _shared_rules_version(self) -> int:
+        doc = self.db_manager.get_collection("counters").find_one({"_id": DISCOUNT_RULES_VERSION_KEY})
+        return int(doc.get("value", 0)) if doc else 0
+
     def get_applicable_discounts(
         self,
         user_id: Optional[int],
@@ -217,87 +299,26 @@ class DiscountModel(BaseModel):
         pickup_city: str = "",
         dropoff_city: str = "",
         promo_code: Optional[str] = None,
-        is_first_order: bool = False
+        is_first_order: bool = False,
+        rules: Optional["DiscountRuleSet"] = None
     ) -> List[Dict]:
-        """Get all discounts applicable to an order"""
-        now = datetime.now(timezone.utc)
-        applicable = []
-
-        # Build base query
-        query = {
-            "active": True,
-            "$and": [
-                {"$or": [{"valid_from": None}, {"valid_from": {"$lte": now}}]},
-                {"$or": [{"valid_until": None}, {"valid_until": {"$gte": now}}]}
-            ]
-        }
-
-        # Get all potentially applicable discounts
-        all_discounts = list(self.collection.find(query).sort([("priority", 1)]))
-
-        pickup_city_lower = pickup_city.lower().strip() if pickup_city else ""
-        dropoff_city_lower = dropoff_city.lower().strip() if dropoff_city else ""
-
-        for discount in all_discounts:
-            # Check scope
-            scope = discount.get("scope")
-            
-            if scope == self.SCOPE_ACCOUNT:
-                # Must be assigned to user
-                if not user_id or int(user_id) not in discount.get("assigned_users", []):
-                    continue
-                    
-            elif scope == self.SCOPE_CODE:
-                # Must match promo code
-                if not promo_code or discount.get("code") != promo_code.strip().upper():
-                    continue
-                    
-            elif scope == self.SCOPE_FIRST_ORDER:
-                # Must be first order
-                if not is_first_order:
-                    continue
-            # SCOPE_GLOBAL applies to everyone
-
-            # Check usage limits
-            max_total = discount.get("max_uses_total")
-            if max_total and discount.get("current_uses", 0) >= max_total:
-                continue
-
-            # Check distance conditions
-            min_km = discount.get("min_distance_km")
-            max_km = discount.get("max_distance_km")
-            
-            if min_km and distance_km < min_km:
-                continue
-            if max_km and distance_km > max_km:
-                continue
-
-            # Check price conditions
-            min_price = discount.get("min_order_value")
-            max_price = discount.get("max_order_value")
-            
-            if min_price and base_price < min_price:
-                continue
-            if max_price and base_price > max_price:
-                continue
-
-            # Check city restrictions
-            allowed_pickup = discount.get("allowed_pickup_cities", [])
-            allowed_dropoff = discount.get("allowed_dropoff_cities", [])
-            excluded = discount.get("excluded_cities", [])
-
-            if allowed_pickup and pickup_city_lower not in [c.lower() for c in allowed_pickup]:
-                continue
-            if allowed_dropoff and dropoff_city_lower not in [c.lower() for c in allowed_dropoff]:
-                continue
-            if excluded:
-                excluded_lower = [c.lower() for c in excluded]
-                if pickup_city_lower in excluded_lower or dropoff_city_lower in excluded_lower:
-                    continue
-
-            applicable.append(discount)
-
-        return applicable
+        """
+        Get all discounts applicable to an order
+
+        rules: a get_rules() snapshot held by the caller (batch quotes keep one
+        consistent set for the whole batch); the current set is used otherwise.
+        """
+        if rules is None:
+            rules = self.get_rules()
+        return rules.match(
+            user_id=user_id,
+            distance_km=distance_km,
+            base_price=base_price,
+            pickup_city=pickup_city,
+            dropoff_city=dropoff_city,
+            promo_code=promo_code,
+            is_first_order=is_first_order
+        )
 
     def assign_to_user(self, discount_id: int, user_id: int) -> Tuple[bool, Optional[str]]:
         """Assign a discount to a user"""
@@ -318,6 +339,7 @@ class DiscountModel(BaseModel):
                 }
             )
 
+            self.invalidate_rules()
             return True, None
 
         except Exception as e:
@@ -334,6 +356,7 @@ class DiscountModel(BaseModel):
                 }
             )
 
+            self.invalidate_rules()
             return True, None
 
         except Exception as e:
@@ -342,10 +365,16 @@ class DiscountModel(BaseModel):
     def increment_usage(self, discount_id: int, user_id: Optional[int] = None) -> bool:
         """Increment discount usage counter"""
         try:
-            self.update_one(
+            discount = self.collection.find_one_and_update(
                 {"id": int(discount_id)},
-                {"$inc": {"current_uses": 1}}
+                {"$inc": {"current_uses": 1}},
+                projection={"current_uses": 1, "max_uses_total": 1},
+                return_document=ReturnDocument.AFTER
             )
+            # Compiled rules only change once this use exhausts max_uses_total
+            max_total = discount.get("max_uses_total") if discount else None
+            if max_total and discount.get("current_uses", 0) >= max_total:
+                self.invalidate_rules()
             return True
         except Exception:
             return False
@@ -357,6 +386,7 @@ class DiscountModel(BaseModel):
                 {"id": int(discount_id)},
                 {"$set": {"active": False, "updated_at": datetime.now(timezone.utc)}}
             )
+            self.invalidate_rules()
             return True, None
         except Exception as e:
             return False, f"Alennuksen poistaminen käytöstä epäonnistui: {str(e)}"
@@ -368,6 +398,7 @@ class DiscountModel(BaseModel):
                 {"id": int(discount_id)},
                 {"$set": {"active": True, "updated_at": datetime.now(timezone.utc)}}
             )
+            self.invalidate_rules()
             return True, None
         except Exception as e:
             return False, f"Alennuksen aktivointi epäonnistui: {str(e)}"
@@ -399,5 +430,123 @@ class DiscountModel(BaseModel):
         }
 
 
+def _epoch(value) -> Optional[float]:
+    """Datetime -> epoch seconds; naive values are UTC as stored by Mongo"""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _priority_key(discount: Dict) -> Tuple:
+    """Same order as sort([("priority", 1)]): a missing priority sorts first, like null in MongoDB"""
+    priority = discount.get("priority")
+    return (priority is not None, priority or 0)
+
+
+def _city_set(cities) -> frozenset:
+    return frozenset(c.lower() for c in (cities or []) if isinstance(c, str))
+
+
+class DiscountRuleSet:
+    """
+    Active discounts compiled for in-memory matching.
+
+    Discounts are bucketed by scope (global, first order, per assigned user,
+    per promo code); each rule carries its km/price bounds, lowercased city
+    sets and validity window precomputed, so matching is a few comparisons
+    per candidate and no database access.
+    """
+
+    def __init__(self, discounts: List[Dict], version: int = 0):
+        self.version = version
+        self.size = 0
+        self._global: List[Tuple] = []
+        self._first_order: List[Tuple] = []
+        self._by_user: Dict[int, List[Tuple]] = {}
+        self._by_code: Dict[str, List[Tuple]] = {}
+
+        for order, discount in enumerate(sorted(discounts, key=_priority_key)):
+            rule = (
+                order,
+                discount.get("min_distance_km") or None,
+                discount.get("max_distance_km") or None,
+                discount.get("min_order_value") or None,
+                discount.get("max_order_value") or None,
+                _city_set(discount.get("allowed_pickup_cities")),
+                _city_set(discount.get("allowed_dropoff_cities")),
+                _city_set(discount.get("excluded_cities")),
+                _epoch(discount.get("valid_from")),
+                _epoch(discount.get("valid_until")),
+                discount
+            )
+            scope = discount.get("scope")
+            if scope == DiscountModel.SCOPE_ACCOUNT:
+                for user_id in discount.get("assigned_users") or []:
+                    self._by_user.setdefault(int(user_id), []).append(rule)
+            elif scope == DiscountModel.SCOPE_CODE:
+                if discount.get("code"):
+                    self._by_code.setdefault(discount["code"], []).append(rule)
+            elif scope == DiscountModel.SCOPE_FIRST_ORDER:
+                self._first_order.append(rule)
+            else:
+                self._global.append(rule)
+            self.size += 1
+
+    def match(
+        self,
+        user_id: Optional[int],
+        distance_km: float,
+        base_price: float,
+        pickup_city: str = "",
+        dropoff_city: str = "",
+        promo_code: Optional[str] = None,
+        is_first_order: bool = False
+    ) -> List[Dict]:
+        """Applicable discounts in priority order (same rules as the old query + filter)"""
+        candidates = list(self._global)
+        if is_first_order:
+            candidates.extend(self._first_order)
+        if user_id:
+            candidates.extend(self._by_user.get(int(user_id), []))
+        if promo_code:
+            candidates.extend(self._by_code.get(promo_code.strip().upper(), []))
+        if not candidates:
+            return []
+
+        now = time.time()
+        pickup = pickup_city.lower().strip() if pickup_city else ""
+        dropoff = dropoff_city.lower().strip() if dropoff_city else ""
+
+        applicable = []
+        for (_, min_km, max_km, min_price, max_price, allowed_pickup, allowed_dropoff,
+             excluded, valid_from, valid_until, discount) in sorted(candidates, key=lambda r: r[0]):
+            if valid_from is not None and valid_from > now:
+                continue
+            if valid_until is not None and valid_until < now:
+                continue
+            max_total = discount.get("max_uses_total")
+            if max_total and discount.get("current_uses", 0) >= max_total:
+                continue
+            if min_km and distance_km < min_km:
+                continue
+            if max_km and distance_km > max_km:
+                continue
+            if min_price and base_price < min_price:
+                continue
+            if max_price and base_price > max_price:
+                continue
+            if allowed_pickup and pickup not in allowed_pickup:
+                continue
+            if allowed_dropoff and dropoff not in allowed_dropoff:
+                continue
+            if excluded and (pickup in excluded or dropoff in excluded):
+                continue
+            # Callers get their own copy; the compiled set is shared across threads
+            applicable.append(dict(discount))
+
+        return applicable
+
 # Singleton instance
 discount_model = DiscountModel()
@@ -5,6 +5,7 @@ Handles driver application data operations and business logic
 
 from datetime import datetime, timezone
 from .database import BaseModel, counter_manager
+from .indexes import IndexSpec
 
 
 class DriverApplicationModel(BaseModel):
@@ -12,6 +13,13 @@ class DriverApplicationModel(BaseModel):
 
     collection_name = "driver_applications"
 
+    indexes = (
+        IndexSpec("id", unique=True),
+        IndexSpec("email"),
+        IndexSpec("status", ("created_at", -1)),
+        IndexSpec(("created_at", -1)),
+    )
+
     def create_application(self, application_data):
         """Create a new driver application"""
         # Generate new application ID
@@ -55,6 +63,7 @@ class DriverApplicationModel(BaseModel):
 
         try:
             self.insert_one(application)
+            self._pending_added(application)
             return application, None
         except Exception as e:
             error_str = str(e)
@@ -62,8 +71,7 @@ class DriverApplicationModel(BaseModel):
             if "duplicate key error" in error_str.lower() or "E11000" in error_str:
                 print(f"Duplicate key error for driver application ID {application_id}, forcing counter resync...")
                 # Force resync counter and retry once
-                from models.database import db_manager
-                db_manager.sync_counter("driver_applications", "driver_applications", "id")
+                counter_manager.resync("driver_applications")
 
                 # Get new ID and retry
                 application_id = counter_manager.get_next_id("driver_applications")
@@ -71,6 +79,7 @@ class DriverApplicationModel(BaseModel):
 
                 try:
                     self.insert_one(application)
+                    self._pending_added(application)
                     return application, None
                 except Exception as retry_error:
                     return None, f"Hakemuksen luominen epäonnistui (retry): {str(retry_error)}"
@@ -101,7 +110,7 @@ class DriverApplicationModel(BaseModel):
 
     def approve_application(self, application_id, processed_by):
         """Approve a driver application"""
-        return self.update_one(
+        success = self.update_one(
             {"id": int(application_id)},
             {"$set": {
                 "status": "approved",
@@ -110,10 +119,13 @@ class DriverApplicationModel(BaseModel):
                 "updated_at": datetime.now(timezone.utc)
             }}
         )
+        if success:
+            self._pending_changed()
+        return success
 
     def deny_application(self, application_id, processed_by):
         """Deny a driver application"""
-        return self.update_one(
+        success = self.update_one(
             {"id": int(application_id)},
             {"$set": {
                 "status": "denied",
@@ -122,10 +134,30 @@ class DriverApplicationModel(BaseModel):
                 "updated_at": datetime.now(timezone.utc)
             }}
         )
+        if success:
+            self._pending_changed()
+        return success
+
+    def delete_one(self, filter_dict):
+        """Delete a single application (may be pending)"""
+        deleted = super().delete_one(filter_dict)
+        if deleted:
+            self._pending_changed()
+        return deleted
+
+    def _pending_added(self, application):
+        """Count a new application in the admin "pending applications" badge"""
+        from services.admin_notification_service import admin_notification_service, KIND_APPLICATIONS
+        admin_notification_service.item_added(KIND_APPLICATIONS, application.get("created_at"))
+
+    def _pending_changed(self):
+        """Reload the admin "pending applications" badge after an application left pending"""
+        from services.admin_notification_service import admin_notification_service, KIND_APPLICATIONS
+        admin_notification_service.invalidate(KIND_APPLICATIONS)
 
     def get_application_statistics(self):
         """Get application statistics"""
-        total = self.count_documents({})
+        total = self.collection.estimated_document_count()
         pending = self.count_documents({"status": "pending"})
         approved = self.count_documents({"status": "approved"})
         denied = self.count_documents({"status": "denied"})
@@ -0,0 +1,138 @@
+"""
+Email Outbox Model
+Durable queue of outgoing emails. Request handlers enqueue; the outbox worker
+(services/email_outbox_worker.py) claims batches, sends them and records the
+delivery status, retrying failures with exponential backoff.
+"""
+
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+from pymongo import ReturnDocument
+from .database import BaseModel
+from .indexes import IndexSpec
+
+# Delivery attempts before a message is marked failed
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+# Retry delay after the first failure, doubled per attempt up to the cap
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+# A claimed message whose worker died is picked up again after this long
+EMAIL_OUTBOX_LEASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "120"))
+# Sent messages are kept this long for troubleshooting, then removed by the TTL monitor
+EMAIL_OUTBOX_RETENTION_DAYS = float(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "30"))
+
+
+class EmailOutboxModel(BaseModel):
+    """Outgoing email queue"""
+
+    collection_name = "email_outbox"
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    indexes = (
+        # Due messages, and expired leases of crashed workers
+        IndexSpec("status", "next_attempt_at"),
+        IndexSpec("sent_at", expireAfterSeconds=int(EMAIL_OUTBOX_RETENTION_DAYS * 86400)),
+    )
+
+    def enqueue(self, subject: str, recipients: List[str], html_body: str, text_body: Optional[str] = None,
+                sender: Optional[str] = None, reply_to: Optional[str] = None) -> Dict:
+        """Queue a message for the worker; returns the stored document"""
+        now = datetime.now(timezone.utc)
+        doc = {
+            "subject": subject,
+            "recipients": list(recipients),
+            "html_body": html_body,
+            "text_body": text_body,
+            "sender": sender,
+            "reply_to": reply_to,
+            "status": self.STATUS_PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.insert_one(doc)
+        return doc
+
+    def claim_batch(self, worker_id: str, limit: int) -> List[Dict]:
+        """
+        Atomically claim up to limit due messages for worker_id (oldest due first).
+        Messages stuck in "sending" past their lease are claimed again.
+        """
+        now = datetime.now(timezone.utc)
+        lease_until = now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS)
+        claimed = []
+        for _ in range(limit):
+            doc = self.collection.find_one_and_update(
+                # While sending, next_attempt_at is the lease expiry
+                {"status": {"$in": [self.STATUS_PENDING, self.STATUS_SENDING]}, "next_attempt_at": {"$lte": now}},
+                {
+                    "$set": {"status": self.STATUS_SENDING, "worker": worker_id,
+                             "next_attempt_at": lease_until, "updated_at": now},
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            claimed.append(doc)
+        return claimed
+
+    def mark_sent(self, message_id):
+        """Record a successful delivery"""
+        now = datetime.now(timezone.utc)
+        self.collection.update_one(
+            {"_id": message_id},
+            {"$set": {"status": self.STATUS_SENT, "sent_at": now, "updated_at": now},
+             "$unset": {"last_error": ""}}
+        )
+
+    def mark_failed(self, message: Dict, error: str) -> str:
+        """
+        Record a failed attempt: schedule a retry with backoff, or give up after
+        EMAIL_OUTBOX_MAX_ATTEMPTS. Returns the new status.
+        """
+        now = datetime.now(timezone.utc)
+        attempts = message.get("attempts", 1)
+        update = {"last_error": str(error)[:500], "updated_at": now}
+        if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            update["status"] = self.STATUS_FAILED
+        else:
+            update["status"] = self.STATUS_PENDING
+            update["next_attempt_at"] = now + timedelta(seconds=self.backoff_seconds(attempts))
+        self.collection.update_one({"_id": message["_id"]}, {"$set": update})
+        return update["status"]
+
+    @staticmethod
+    def backoff_seconds(attempts: int) -> float:
+        """Delay before the retry that follows attempt number attempts"""
+        return min(EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0)), EMAIL_OUTBOX_BACKOFF_MAX_SECONDS)
+
+    def retry_failed(self, message_ids: Optional[List] = None) -> int:
+        """Put failed messages (all, or the given ids) back in the queue"""
+        now = datetime.now(timezone.utc)
+        filter_dict = {"status": self.STATUS_FAILED}
+        if message_ids is not None:
+            filter_dict["_id"] = {"$in": list(message_ids)}
+        result = self.collection.update_many(
+            filter_dict,
+            {"$set": {"status": self.STATUS_PENDING, "attempts": 0, "next_attempt_at": now, "updated_at": now}}
+        )
+        return result.modified_count
+
+    def get_queue_stats(self) -> Dict:
+        """Message counts by status"""
+        return {
+            status: self.count_documents({"status": status})
+            for status in (self.STATUS_PENDING, self.STATUS_SENDING, self.STATUS_FAILED)
+        }
+
+
+# Global instance
+email_outbox_model = EmailOutboxModel()
@@ -0,0 +1,181 @@
+"""
+Geocode Cache Model
+Persistent cache of geocoding results (coordinates + country code) keyed by
+Google place_id and by normalised address text, with an in-memory front tier
+and a cross-worker stampede lock.
+"""
+
+import os
+import re
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from .database import BaseModel
+from .indexes import IndexSpec
+from utils.cache import TTLCache
+
+GEOCODE_CACHE_TTL_DAYS = float(os.getenv("GEOCODE_CACHE_TTL_DAYS", "90"))
+GEOCODE_CACHE_MEMORY_SIZE = int(os.getenv("GEOCODE_CACHE_MEMORY_SIZE", "4096"))
+GEOCODE_CACHE_MEMORY_TTL = float(os.getenv("GEOCODE_CACHE_MEMORY_TTL", "3600"))
+# Upper bound for holding the upstream lock (a crashed worker cannot block a key longer)
+GEOCODE_LOCK_SECONDS = float(os.getenv("GEOCODE_LOCK_SECONDS", "15"))
+# How long a worker waits for another worker's in-flight lookup before going upstream itself
+GEOCODE_LOCK_WAIT_SECONDS = float(os.getenv("GEOCODE_LOCK_WAIT_SECONDS", "5"))
+
+
+class GeocodeCacheModel(BaseModel):
+    """Geocode cache for Google Places / Geocoding results"""
+
+    collection_name = "geocode_cache"
+    locks_collection_name = "geocode_locks"
+
+    # Unique lookup key; expired entries and stale locks are removed by the TTL monitor
+    indexes = (
+        IndexSpec("key", unique=True),
+        IndexSpec("expires_at", expireAfterSeconds=0),
+    )
+    related_indexes = {
+        "geocode_locks": (IndexSpec("expires_at", expireAfterSeconds=0),),
+    }
+
+    CACHED_FIELDS = ("lat", "lng", "country_code")
+
+    def __init__(self):
+        super().__init__()
+        self._memory = TTLCache(GEOCODE_CACHE_MEMORY_SIZE, GEOCODE_CACHE_MEMORY_TTL)
+
+    @property
+    def locks(self):
+        """Collection holding short-lived upstream lookup locks"""
+        return self.db_manager.get_collection(self.locks_collection_name)
+
+    @staticmethod
+    def normalize_address(address: Optional[str]) -> str:
+        """Normalise address text for cache keys"""
+        if not address:
+            return ""
+        return re.sub(r"\s+", " ", address.strip().lower())
+
+    def build_keys(self, address: Optional[str] = None, place_id: Optional[str] = None) -> List[str]:
+        """Cache keys for a lookup, most specific first"""
+        keys = []
+        if place_id:
+            keys.append(f"place:{place_id.strip()}")
+        normalized = self.normalize_address(address)
+        if normalized:
+            keys.append(f"addr:{normalized}")
+        return keys
+
+    def lookup(self, address: Optional[str] = None, place_id: Optional[str] = None,
+               require: str = "lat") -> Optional[Dict]:
+        """
+        Return cached geocode containing the required field, or None
+
+        Args:
+            address: Address text as typed/selected by the user
+            place_id: Google Places place_id, if known
+            require: Field that must be present ('lat' or 'country_code')
+        """
+        for key in self.build_keys(address, place_id):
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self.find_one({"key": key})
+                if not entry or self._is_expired(entry):
+                    continue
+                self._memory.set(key, entry)
+
+            if entry.get(require) is not None:
+                return entry
+
+        return None
+
+    def save(self, address: Optional[str], place_id: Optional[str], result: Dict) -> None:
+        """Store a geocode result under every key it can be looked up by"""
+        fields = {k: result[k] for k in self.CACHED_FIELDS if result.get(k) is not None}
+        if not fields:
+            return
+
+        now = datetime.now(timezone.utc)
+        for key in self.build_keys(address, place_id):
+            try:
+                doc = self.collection.find_one_and_update(
+                    {"key": key},
+                    {
+                        "$set": {
+                            **fields,
+                            "key": key,
+                            "place_id": place_id or None,
+                            "address": address or None,
+                            "updated_at": now,
+                            "expires_at": now + timedelta(days=GEOCODE_CACHE_TTL_DAYS)
+                        },
+                        "$setOnInsert": {"created_at": now}
+                    },
+                    projection={"_id": 0},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                if doc:
+                    self._memory.set(key, doc)
+            except Exception as e:
+                print(f"Geocode cache save failed for {key}: {e}")
+
+    def acquire_lock(self, key: str) -> bool:
+        """Try to become the single worker resolving this key upstream"""
+        now = datetime.now(timezone.utc)
+        lock_doc = {"_id": key, "expires_at": now + timedelta(seconds=GEOCODE_LOCK_SECONDS)}
+        try:
+            self.locks.insert_one(lock_doc)
+            return True
+        except DuplicateKeyError:
+            # Take over locks left behind by a crashed or hung worker
+            stale = self.locks.delete_one({"_id": key, "expires_at": {"$lt": now}})
+            if stale.deleted_count:
+                try:
+                    self.locks.insert_one(lock_doc)
+                    return True
+                except DuplicateKeyError:
+                    return False
+            return False
+        except Exception as e:
+            # Lock storage unavailable - fail open rather than blocking geocoding
+            print(f"Geocode lock unavailable for {key}: {e}")
+            return True
+
+    def release_lock(self, key: str) -> None:
+        """Release a lock taken with acquire_lock"""
+        try:
+            self.locks.delete_one({"_id": key})
+        except Exception as e:
+            print(f"Geocode lock release failed for {key}: {e}")
+
+    def wait_for(self, address: Optional[str], place_id: Optional[str], require: str = "lat") -> Optional[Dict]:
+        """Poll the cache while another worker resolves the same key"""
+        deadline = time.monotonic() + GEOCODE_LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            for key in self.build_keys(address, place_id):
+                self._memory.delete(key)
+            cached = self.lookup(address, place_id, require=require)
+            if cached:
+                return cached
+        return None
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters of the in-memory front tier"""
+        return self._memory.stats()
+
+    @staticmethod
+    def _is_expired(entry: Dict) -> bool:
+        expires_at = entry.get("expires_at")
+        if not expires_at:
+            return False
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at <= datetime.now(timezone.utc)
+
+
+# Global instance
+geocode_cache_model = GeocodeCacheModel()
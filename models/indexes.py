@@ -0,0 +1,106 @@
+"""
+Index Declarations and Sync
+Models declare the indexes their queries need (`indexes` for their own
+collection, `related_indexes` for side collections they own); sync_indexes()
+creates missing ones and rebuilds changed ones. Idempotent, run at deploy time.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .database import DatabaseManager
+
+# create_index options that make two indexes on the same keys different
+INDEX_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+class IndexSpec:
+    """One declared index: keys as "field" or (field, direction), plus create_index options"""
+
+    def __init__(self, *keys, **options):
+        self.keys: List[Tuple[str, int]] = [(key, 1) if isinstance(key, str) else (key[0], key[1]) for key in keys]
+        unknown = set(options) - set(INDEX_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unsupported index options: {sorted(unknown)}")
+        self.options: Dict = options
+        # MongoDB's default name, so indexes created before declarations existed match
+        self.name = "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def matches(self, info: Dict) -> bool:
+        """True if index_information() entry info is this index"""
+        keys = [(field, int(direction)) for field, direction in info.get("key", [])]
+        if keys != self.keys:
+            return False
+        return all(info.get(option) == self.options.get(option) for option in INDEX_OPTIONS)
+
+    def __repr__(self):
+        return f"IndexSpec({self.name}, {self.options})" if self.options else f"IndexSpec({self.name})"
+
+
+def indexed_models() -> List:
+    """Model instances whose index declarations are synced"""
+    from models.user import user_model
+    from models.order import order_model
+    from models.rating import rating_model
+    from models.discount import discount_model
+    from models.driver_application import driver_application_model
+    from models.geocode_cache import geocode_cache_model
+    from models.email_outbox import email_outbox_model
+    from models.admin_digest import admin_digest_model
+    from models.route_cache import route_cache_model
+    return [user_model, order_model, rating_model, discount_model, driver_application_model, geocode_cache_model,
+            email_outbox_model, admin_digest_model, route_cache_model]
+
+
+def declared_indexes(models: Optional[Sequence] = None) -> Dict[str, List[IndexSpec]]:
+    """{collection name: [IndexSpec]} for models (default: all indexed models)"""
+    declared: Dict[str, List[IndexSpec]] = {}
+    for model in indexed_models() if models is None else models:
+        declared.setdefault(model.collection_name, []).extend(model.indexes)
+        for collection_name, specs in model.related_indexes.items():
+            declared.setdefault(collection_name, []).extend(specs)
+    return declared
+
+
+def sync_indexes(declared: Optional[Dict[str, List[IndexSpec]]] = None, prune: bool = False,
+                 dry_run: bool = False) -> Dict[str, List[str]]:
+    """
+    Bring the database in line with the declared indexes.
+
+    Missing indexes are created, indexes whose keys or options changed are
+    dropped and recreated. Undeclared indexes are only reported unless prune
+    is set. Returns {"created", "rebuilt", "dropped", "unknown", "unchanged"}
+    lists of "collection.index" names.
+    """
+    declared = declared_indexes() if declared is None else declared
+    db = DatabaseManager().db
+    report = {"created": [], "rebuilt": [], "dropped": [], "unknown": [], "unchanged": []}
+
+    for collection_name, specs in declared.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        wanted = {spec.name for spec in specs}
+
+        for spec in specs:
+            label = f"{collection_name}.{spec.name}"
+            info = existing.get(spec.name)
+            if info is not None and spec.matches(info):
+                report["unchanged"].append(label)
+                continue
+            if not dry_run:
+                if info is not None:
+                    collection.drop_index(spec.name)
+                collection.create_index(spec.keys, name=spec.name, **spec.options)
+            report["rebuilt" if info is not None else "created"].append(label)
+
+        for name in existing:
+            if name == "_id_" or name in wanted:
+                continue
+            label = f"{collection_name}.{name}"
+            if prune:
+                if not dry_run:
+                    collection.drop_index(name)
+                report["dropped"].append(label)
+            else:
+                report["unknown"].append(label)
+
+    return report
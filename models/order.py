@@ -3,9 +3,56 @@ Order Model
 Handles order data operations and business logic
 """
 
+import os
+import re
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
 from .database import BaseModel, counter_manager
+from .indexes import IndexSpec
+from utils.cache import TTLCache
+from utils.pagination import ApproximateCounter, keyset_page
+
+# Per-driver job counts shared by the driver dashboard and admin driver views
+DRIVER_STATS_CACHE_TTL = float(os.getenv("DRIVER_STATS_CACHE_TTL", "30"))
+
+# Admin order list totals the order counters cannot answer (searches, rolling windows)
+DASHBOARD_COUNT_CACHE_TTL = float(os.getenv("DASHBOARD_COUNT_CACHE_TTL", "60"))
+
+# Materialised order counts: one document in ORDER_COUNTERS_COLLECTION holding
+# {"total", "by_status": {STATUS: n}, "by_day": {"YYYY-MM-DD": {"total", STATUS: n}}}
+ORDER_COUNTERS_COLLECTION = "order_counters"
+ORDER_COUNTERS_ID = "orders"
+
+# Per-customer order stats, one document per user keyed by user id:
+# {"_id": user_id, "order_count", "last_order_number", "first_order_id", "lifetime_spend", "rebuilt_at"}
+# order_count follows creates/deletes; last_order_number only grows, so numbers are never reused
+USER_ORDER_STATS_COLLECTION = "user_order_stats"
+
+# Order fields the denormalised search_tokens are built from
+SEARCH_SOURCE_FIELDS = ("id", "user_id", "driver_id", "reg_number", "orderer_name", "customer_name", "driver_name")
+
+
+def _search_words(text) -> List[str]:
+    """Lowercased whitespace-separated words of a search value"""
+    return [word for word in str(text or "").lower().split() if word]
+
+
+def search_tokens(*values) -> List[str]:
+    """
+    Normalised tokens for the admin order search. Words are lowercased;
+    hyphenated words ("ABC-123", "Anna-Liisa") also get their parts and a
+    joined form, so "abc123", "abc-1" and "liisa" all prefix-match.
+    """
+    tokens = set()
+    for value in values:
+        for word in _search_words(value):
+            tokens.add(word)
+            parts = [part for part in re.split(r"[-_./]+", word) if part]
+            if len(parts) > 1:
+                tokens.update(parts)
+                tokens.add("".join(parts))
+    return sorted(tokens)
 
 
 class OrderModel(BaseModel):
@@ -13,6 +60,22 @@ class OrderModel(BaseModel):
 
     collection_name = "orders"
 
+    indexes = (
+        IndexSpec("id", unique=True),
+        # Customer order history (and per-user counts)
+        IndexSpec("user_id", ("created_at", -1)),
+        # Driver job lists, active jobs and the per-driver job stats $group
+        IndexSpec("driver_id", ("created_at", -1)),
+        # Admin dashboard status filter with keyset on id
+        IndexSpec("status", ("id", -1)),
+        # Orders by status and the available-jobs list (oldest first)
+        IndexSpec("status", ("created_at", -1)),
+        # Admin dashboard search: prefix match on denormalised tokens
+        IndexSpec("search_tokens", ("id", -1)),
+        # Dashboard date windows and recent orders
+        IndexSpec(("created_at", -1)),
+    )
+
     # Order status definitions
     STATUS_NEW = "NEW"
     STATUS_CONFIRMED = "CONFIRMED"
@@ -31,6 +94,14 @@ class OrderModel(BaseModel):
         STATUS_DELIVERY_IMAGES_ADDED, STATUS_DELIVERED, STATUS_CANCELLED
     ]
 
+    # Statuses counted as a driver's active jobs
+    DRIVER_ACTIVE_STATUSES = [
+        STATUS_CONFIRMED,  # Include CONFIRMED for newly accepted jobs
+        STATUS_ASSIGNED_TO_DRIVER, STATUS_DRIVER_ARRIVED,
+        STATUS_PICKUP_IMAGES_ADDED, STATUS_IN_TRANSIT,
+        STATUS_DELIVERY_ARRIVED, STATUS_DELIVERY_IMAGES_ADDED
+    ]
+
     # All statuses now trigger email notifications for better user experience
     NO_EMAIL_STATUSES = []
 
@@ -46,15 +117,21 @@ class OrderModel(BaseModel):
     TRIP_TYPE_OUTBOUND = "MENO"
     TRIP_TYPE_RETURN = "PALUU"
 
+    def __init__(self):
+        super().__init__()
+        self._driver_stats_cache = TTLCache(maxsize=1, ttl=DRIVER_STATS_CACHE_TTL)
+        self._dashboard_counts = ApproximateCounter(ttl=DASHBOARD_COUNT_CACHE_TTL)
+
     def create_order(self, user_id: int, order_data: Dict) -> Tuple[Optional[Dict], Optional[str]]:
         """Create a new order"""
+        order_id = None
+        order_doc = None
         try:
             # Generate new order ID
             order_id = counter_manager.get_next_id("orders")
 
-            # Calculate user-specific order number (1, 2, 3... for each user)
-            user_order_count = self.count_documents({"user_id": int(user_id)})
-            user_order_number = user_order_count + 1
+            # User-specific order number (1, 2, 3... for each user) from the user's order stats
+            user_order_number = self._claim_user_order(user_id, order_id, order_data.get("price_gross"))
 
             # Prepare order document
             order_doc = {
@@ -83,7 +160,11 @@ class OrderModel(BaseModel):
             if "return_order_id" not in order_doc:
                 order_doc["return_order_id"] = None  # Only set for outbound orders with return
 
+            order_doc["search_tokens"] = self._build_search_tokens(order_doc)
+
+            # Only a failed insert reaches the rollback below; bookkeeping after it never raises
             self.insert_one(order_doc)
+            self._after_order_inserted(order_doc)
             return order_doc, None
 
         except Exception as e:
@@ -92,21 +173,41 @@ class OrderModel(BaseModel):
             if "duplicate key error" in error_str.lower() or "E11000" in error_str:
                 print(f"Duplicate key error for order ID {order_id}, forcing counter resync...")
                 # Force resync counter and retry once
-                from models.database import db_manager
-                db_manager.sync_counter("orders", "orders", "id")
+                counter_manager.resync("orders")
 
                 # Get new ID and retry
-                order_id = counter_manager.get_next_id("orders")
+                stale_id, order_id = order_id, counter_manager.get_next_id("orders")
                 order_doc["id"] = order_id
+                order_doc["search_tokens"] = self._build_search_tokens(order_doc)
+                self.user_stats_collection.update_one(
+                    {"_id": int(user_id), "first_order_id": stale_id}, {"$set": {"first_order_id": order_id}}
+                )
 
                 try:
                     self.insert_one(order_doc)
-                    return order_doc, None
                 except Exception as retry_error:
+                    counter_manager.release_id("orders", order_id)
+                    self._unclaim_user_order(order_doc)
                     return None, f"Tilauksen luominen epäonnistui (retry): {str(retry_error)}"
-
+                self._after_order_inserted(order_doc)
+                return order_doc, None
+
+            # Hand the number back so order numbers stay gap-free
+            if order_id is not None:
+                counter_manager.release_id("orders", order_id)
+            if order_doc is not None:
+                self._unclaim_user_order(order_doc)
             return None, f"Tilauksen luominen epäonnistui: {error_str}"
 
+    def _after_order_inserted(self, order_doc: Dict):
+        """Counters and admin badge for a persisted order; failures are logged, the order stays"""
+        try:
+            self._count_order(order_doc, 1)
+            self._track_new_order(None, order_doc.get("status"), order_doc.get("created_at"))
+        except Exception as e:
+            # Order counters can be rebuilt (migrations/rebuild_order_counters.py)
+            print(f"Order #{order_doc.get('id')} created, but updating counters failed: {e}")
+
     def find_by_id(self, order_id: int, user_id: Optional[int] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Find order by ID, optionally filtered by user"""
         filter_dict = {"id": int(order_id)}
@@ -155,13 +256,15 @@ class OrderModel(BaseModel):
             return False, f"Virheellinen tila: {new_status}"
 
         try:
-            success = self.update_one(
+            success = self._set_status(
                 {"id": int(order_id)},
-                {"$set": {
+                {
                     "status": new_status,
                     "updated_at": datetime.now(timezone.utc)
-                }}
+                }
             )
+            if success:
+                self.invalidate_driver_stats()
             return success, None
         except Exception as e:
             return False, f"Tilan päivitys epäonnistui: {str(e)}"
@@ -277,16 +380,286 @@ class OrderModel(BaseModel):
         )
 
     def get_order_statistics(self) -> Dict:
-        """Get order statistics"""
-        total_orders = self.count_documents()
+        """Get order statistics (one read of the materialised order counters)"""
+        counters = self.get_order_counters()
+        by_status = counters.get("by_status") or {}
 
-        stats = {"total": total_orders}
+        stats = {"total": counters.get("total", 0)}
 
         for status in self.VALID_STATUSES:
-            stats[status.lower()] = self.count_documents({"status": status})
+            stats[status.lower()] = by_status.get(status, 0)
 
         return stats
 
+    @property
+    def counters_collection(self):
+        """Collection holding the materialised order counters document"""
+        return self.db_manager.get_collection(ORDER_COUNTERS_COLLECTION)
+
+    def get_order_counters(self) -> Dict:
+        """Materialised order counters, rebuilt first if the document is missing"""
+        counters = self.counters_collection.find_one({"_id": ORDER_COUNTERS_ID})
+        # Counter $incs upsert, so a document without rebuilt_at was never seeded
+        if not counters or "rebuilt_at" not in counters:
+            counters = self.rebuild_order_counters()
+        return counters
+
+    def _counted_total(self, status: Optional[str], date_filter: Optional[str]) -> Optional[int]:
+        """
+        Order count for a status/date filter from the counters, or None when the
+        counters cannot answer it (rolling 7/30 day windows)
+        """
+        counters = self.get_order_counters()
+        if not date_filter or date_filter == 'all':
+            if status:
+                return (counters.get("by_status") or {}).get(status, 0)
+            return counters.get("total", 0)
+        if date_filter == 'today':
+            today = self._counter_day(datetime.now(timezone.utc))
+            day_counts = (counters.get("by_day") or {}).get(today) or {}
+            return day_counts.get(status or "total", 0)
+        return None
+
+    def rebuild_order_counters(self) -> Dict:
+        """
+        Recompute the order counters document from the orders collection with
+        one $group by status and creation day (repair / first deployment)
+        """
+        rows = self.aggregate([
+            {"$group": {
+                "_id": {
+                    "status": "$status",
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+                },
+                "count": {"$sum": 1}
+            }}
+        ])
+
+        counters = {"_id": ORDER_COUNTERS_ID, "total": 0, "by_status": {}, "by_day": {}}
+        for row in rows:
+            status, day, count = row["_id"].get("status"), row["_id"].get("day"), row["count"]
+            counters["total"] += count
+            if status:
+                counters["by_status"][status] = counters["by_status"].get(status, 0) + count
+            if day:
+                day_counts = counters["by_day"].setdefault(day, {"total": 0})
+                day_counts["total"] += count
+                if status:
+                    day_counts[status] = day_counts.get(status, 0) + count
+
+        counters["rebuilt_at"] = datetime.now(timezone.utc)
+        self.counters_collection.replace_one({"_id": ORDER_COUNTERS_ID}, counters, upsert=True)
+        return counters
+
+    @staticmethod
+    def _counter_day(created_at) -> Optional[str]:
+        """by_day key for an order's created_at (UTC calendar day)"""
+        if isinstance(created_at, datetime):
+            if created_at.tzinfo is not None:
+                created_at = created_at.astimezone(timezone.utc)
+            return created_at.strftime("%Y-%m-%d")
+        return None
+
+    def _inc_order_counters(self, inc: Dict):
+        """Apply one atomic $inc to the counters document"""
+        if not inc:
+            return
+        try:
+            self.counters_collection.update_one({"_id": ORDER_COUNTERS_ID}, {"$inc": inc}, upsert=True)
+        except Exception as e:
+            # The order write already succeeded; rebuild_order_counters repairs any drift
+            print(f"Order counter update failed: {e}")
+
+    def _count_order(self, order: Dict, delta: int):
+        """Add (delta=1) or remove (delta=-1) an order from the counters"""
+        status = order.get("status")
+        day = self._counter_day(order.get("created_at"))
+
+        inc = {"total": delta}
+        if status:
+            inc[f"by_status.{status}"] = delta
+        if day:
+            inc[f"by_day.{day}.total"] = delta
+            if status:
+                inc[f"by_day.{day}.{status}"] = delta
+        self._inc_order_counters(inc)
+
+    @property
+    def user_stats_collection(self):
+        """Collection holding the per-user order stats documents"""
+        return self.db_manager.get_collection(USER_ORDER_STATS_COLLECTION)
+
+    def get_user_order_stats(self, user_id: int) -> Dict:
+        """A customer's order stats (one read), rebuilt first if never seeded"""
+        stats = self.user_stats_collection.find_one({"_id": int(user_id)})
+        if not stats or "rebuilt_at" not in stats:
+            stats = self.rebuild_user_order_stats(user_id)[int(user_id)]
+        return stats
+
+    def is_first_order(self, user_id: Optional[int]) -> bool:
+        """True if the user has no orders yet (first-order discounts)"""
+        if not user_id:
+            return False
+        return self.get_user_order_stats(user_id).get("order_count", 0) == 0
+
+    def rebuild_user_order_stats(self, user_id: Optional[int] = None) -> Dict[int, Dict]:
+        """
+        Recompute per-user order stats from the orders collection with one
+        $group by user_id (one user, or everyone for repair / first deployment)
+        """
+        pipeline = [{"$match": {"user_id": int(user_id)}}] if user_id is not None else []
+        pipeline.append({"$group": {
+            "_id": "$user_id",
+            "order_count": {"$sum": 1},
+            "first_order_id": {"$min": "$id"},
+            "max_order_number": {"$max": "$user_order_number"},
+            "lifetime_spend": {"$sum": {"$ifNull": ["$price_gross", 0]}}
+        }})
+
+        now = datetime.now(timezone.utc)
+        rebuilt: Dict[int, Dict] = {}
+        for row in self.aggregate(pipeline):
+            if row["_id"] is None:
+                continue
+            rebuilt[int(row["_id"])] = {
+                "_id": int(row["_id"]),
+                "order_count": row["order_count"],
+                # Legacy orders may lack numbers; never hand out one already shown
+                "last_order_number": max(row.get("max_order_number") or 0, row["order_count"]),
+                "first_order_id": row.get("first_order_id"),
+                "lifetime_spend": round(float(row.get("lifetime_spend") or 0), 2),
+                "rebuilt_at": now
+            }
+        if user_id is not None and int(user_id) not in rebuilt:
+            rebuilt[int(user_id)] = {
+                "_id": int(user_id), "order_count": 0, "last_order_number": 0,
+                "first_order_id": None, "lifetime_spend": 0.0, "rebuilt_at": now
+            }
+
+        operations = []
+        for uid, stats in rebuilt.items():
+            # $max keeps numbers claimed concurrently with the rebuild. first_order_id is
+            # left unset rather than null, since null would win every later $min.
+            update = {
+                "$set": {k: v for k, v in stats.items() if k not in ("_id", "last_order_number", "first_order_id")},
+                "$max": {"last_order_number": stats["last_order_number"]}
+            }
+            if stats["first_order_id"] is None:
+                update["$unset"] = {"first_order_id": ""}
+            else:
+                update["$set"]["first_order_id"] = stats["first_order_id"]
+            operations.append(UpdateOne({"_id": uid}, update, upsert=True))
+        if operations:
+            self.user_stats_collection.bulk_write(operations, ordered=False)
+        return rebuilt
+
+    def _claim_user_order(self, user_id: int, order_id: int, price_gross) -> int:
+        """
+        Count a new order in the user's stats and return its user_order_number
+        (one atomic round trip once the stats exist)
+        """
+        update = {
+            "$inc": {"order_count": 1, "last_order_number": 1, "lifetime_spend": float(price_gross or 0)},
+            "$min": {"first_order_id": int(order_id)}
+        }
+        stats = self.user_stats_collection.find_one_and_update(
+            {"_id": int(user_id), "rebuilt_at": {"$exists": True}},
+            update,
+            projection={"last_order_number": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if stats is None:
+            # First order since the stats were introduced: seed from history, then claim
+            self.rebuild_user_order_stats(user_id)
+            stats = self.user_stats_collection.find_one_and_update(
+                {"_id": int(user_id)},
+                update,
+                projection={"last_order_number": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        return stats["last_order_number"]
+
+    def _inc_user_stats(self, user_id: int, inc: Dict):
+        """Apply one $inc to a user's stats document"""
+        try:
+            self.user_stats_collection.update_one({"_id": int(user_id)}, {"$inc": inc})
+        except Exception as e:
+            # The order write already succeeded; rebuild_user_order_stats repairs any drift
+            print(f"User order stats update failed: {e}")
+
+    def _unclaim_user_order(self, order: Dict):
+        """Undo _claim_user_order for an order that was never inserted"""
+        if order.get("user_order_number") is None:
+            return
+        self._inc_user_stats(order["user_id"], {
+            "order_count": -1, "lifetime_spend": -float(order.get("price_gross") or 0)
+        })
+        # The number can only be handed back if nobody claimed a later one
+        self.user_stats_collection.update_one(
+            {"_id": int(order["user_id"]), "last_order_number": order["user_order_number"]},
+            {"$inc": {"last_order_number": -1}}
+        )
+
+    def _uncount_user_order(self, order: Dict):
+        """Remove a deleted order from its user's stats (its number is not reused)"""
+        user_id = order.get("user_id")
+        if user_id is None:
+            return
+        try:
+            stats = self.user_stats_collection.find_one_and_update(
+                {"_id": int(user_id)},
+                {"$inc": {"order_count": -1, "lifetime_spend": -float(order.get("price_gross") or 0)}},
+                projection={"first_order_id": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if stats and stats.get("first_order_id") == order.get("id"):
+                # Next-oldest order becomes the first one
+                first = self.collection.find_one({"user_id": int(user_id)}, {"id": 1}, sort=[("id", 1)])
+                self.user_stats_collection.update_one(
+                    {"_id": int(user_id), "first_order_id": order.get("id")},
+                    {"$set": {"first_order_id": first["id"]}} if first else {"$unset": {"first_order_id": ""}}
+                )
+        except Exception as e:
+            print(f"User order stats update failed: {e}")
+
+    def _set_status(self, query: Dict, update_data: Dict) -> bool:
+        """
+        $set a status change and move the order between status counters.
+        Returns True if an order matched the query.
+        """
+        before = self.collection.find_one_and_update(
+            query,
+            {"$set": update_data},
+            projection={"status": 1, "created_at": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not before:
+            return False
+
+        old_status, new_status = before.get("status"), update_data["status"]
+        if old_status != new_status:
+            day = self._counter_day(before.get("created_at"))
+            inc = {f"by_status.{new_status}": 1}
+            if old_status:
+                inc[f"by_status.{old_status}"] = -1
+            if day:
+                inc[f"by_day.{day}.{new_status}"] = 1
+                if old_status:
+                    inc[f"by_day.{day}.{old_status}"] = -1
+            self._inc_order_counters(inc)
+            self._track_new_order(old_status, new_status, before.get("created_at"))
+        return True
+
+    def _track_new_order(self, old_status: Optional[str], new_status: Optional[str], created_at):
+        """Keep the admin "new orders" badge in step with an order entering or leaving NEW"""
+        from services.admin_notification_service import admin_notification_service, KIND_ORDERS
+
+        if new_status == self.STATUS_NEW and old_status != self.STATUS_NEW:
+            admin_notification_service.item_added(KIND_ORDERS, created_at)
+        elif old_status == self.STATUS_NEW and new_status != self.STATUS_NEW:
+            admin_notification_service.item_resolved(KIND_ORDERS, created_at)
+
     def search_orders(self, search_term: str, user_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
         """Search orders by address or registration number"""
         # Build search filter
@@ -322,15 +695,18 @@ class OrderModel(BaseModel):
     def assign_driver(self, order_id: int, driver_id: int) -> Tuple[bool, Optional[str]]:
         """Assign driver to order"""
         try:
-            success = self.update_one(
+            success = self._set_status(
                 {"id": int(order_id)},
-                {"$set": {
+                {
                     "driver_id": int(driver_id),
                     "status": self.STATUS_ASSIGNED_TO_DRIVER,
                     "assigned_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc)
-                }}
+                }
             )
+            if success:
+                self.invalidate_driver_stats()
+                self.refresh_search_fields({"id": int(order_id)})
             return success, None
         except Exception as e:
             return False, f"Kuljettajan määritys epäonnistui: {str(e)}"
@@ -358,23 +734,37 @@ class OrderModel(BaseModel):
             if price_gross < 0:
                 return False, "Hinta ei voi olla negatiivinen"
 
-            success = self.update_one(
+            before = self.collection.find_one_and_update(
                 {"id": int(order_id)},
                 {"$set": {
                     "price_gross": float(price_gross),
                     "updated_at": datetime.now(timezone.utc)
-                }}
+                }},
+                projection={"user_id": 1, "price_gross": 1},
+                return_document=ReturnDocument.BEFORE
             )
-            return success, None
+            if not before:
+                return False, None
+            spent = float(price_gross) - float(before.get("price_gross") or 0)
+            if spent and before.get("user_id") is not None:
+                self._inc_user_stats(before["user_id"], {"lifetime_spend": spent})
+            return True, None
         except Exception as e:
             return False, f"Hinnan päivitys epäonnistui: {str(e)}"
 
     def delete_order(self, order_id: int) -> Tuple[bool, Optional[str]]:
         """Delete order by id"""
         try:
-            success = self.delete_one({"id": int(order_id)})
-            if not success:
+            deleted = self.collection.find_one_and_delete(
+                {"id": int(order_id)},
+                projection={"id": 1, "user_id": 1, "status": 1, "created_at": 1, "price_gross": 1}
+            )
+            if not deleted:
                 return False, "Tilausta ei löytynyt"
+            self._count_order(deleted, -1)
+            self._uncount_user_order(deleted)
+            self._track_new_order(deleted.get("status"), None, deleted.get("created_at"))
+            self.invalidate_driver_stats()
             return True, None
         except Exception as e:
             return False, f"Tilauksen poistaminen epäonnistui: {str(e)}"
@@ -474,10 +864,9 @@ class OrderModel(BaseModel):
             if required_current_status:
                 query["status"] = required_current_status
 
-            success = self.update_one(
-                query,
-                {"$set": update_data}
-            )
+            success = self._set_status(query, update_data)
+            if success:
+                self.invalidate_driver_stats()
             return success, None
         except Exception as e:
             return False, f"Tilan päivitys epäonnistui: {str(e)}"
@@ -506,22 +895,116 @@ class OrderModel(BaseModel):
 
     def get_active_driver_orders(self, driver_id: int) -> List[Dict]:
         """Get active orders for a driver (not completed/cancelled)"""
-        active_statuses = [
-            self.STATUS_CONFIRMED,  # Include CONFIRMED for newly accepted jobs
-            self.STATUS_ASSIGNED_TO_DRIVER, self.STATUS_DRIVER_ARRIVED,
-            self.STATUS_PICKUP_IMAGES_ADDED, self.STATUS_IN_TRANSIT,
-            self.STATUS_DELIVERY_ARRIVED, self.STATUS_DELIVERY_IMAGES_ADDED
-        ]
-
         return self.find(
             {
                 "driver_id": int(driver_id),
-                "status": {"$in": active_statuses}
+                "status": {"$in": self.DRIVER_ACTIVE_STATUSES}
             },
             projection=self.DRIVER_PROJECTION,
             sort=[("created_at", -1)]
         )
 
+    def get_driver_job_stats(self) -> Dict[int, Dict]:
+        """
+        Job counts for every driver from one $group by driver_id/status
+        (cached for DRIVER_STATS_CACHE_TTL seconds)
+
+        Returns:
+            {driver_id: {"total_jobs", "completed_jobs", "active_jobs", "by_status"}}
+        """
+        cached = self._driver_stats_cache.get("all")
+        if cached is not None:
+            return cached
+
+        rows = self.aggregate([
+            {"$match": {"driver_id": {"$ne": None}}},
+            {"$group": {"_id": {"driver_id": "$driver_id", "status": "$status"}, "count": {"$sum": 1}}}
+        ])
+
+        stats: Dict[int, Dict] = {}
+        for row in rows:
+            driver_stats = stats.setdefault(int(row["_id"]["driver_id"]), {
+                "total_jobs": 0,
+                "completed_jobs": 0,
+                "active_jobs": 0,
+                "by_status": {}
+            })
+            status = row["_id"].get("status")
+            driver_stats["total_jobs"] += row["count"]
+            driver_stats["by_status"][status] = row["count"]
+            if status == self.STATUS_DELIVERED:
+                driver_stats["completed_jobs"] += row["count"]
+            elif status in self.DRIVER_ACTIVE_STATUSES:
+                driver_stats["active_jobs"] += row["count"]
+
+        self._driver_stats_cache.set("all", stats)
+        return stats
+
+    def invalidate_driver_stats(self):
+        """Drop cached driver job counts after a status or assignment change"""
+        self._driver_stats_cache.clear()
+
+    def update_one(self, filter_dict, update_dict, upsert=False):
+        """Update a single order, refreshing search_tokens if a searched field changed"""
+        success = super().update_one(filter_dict, update_dict, upsert=upsert)
+        if success and set(update_dict.get("$set", {})) & set(SEARCH_SOURCE_FIELDS):
+            self.refresh_search_fields({"id": filter_dict["id"]} if "id" in filter_dict else filter_dict)
+        return success
+
+    @staticmethod
+    def _users_by_id(user_ids: Iterable) -> Dict[int, Dict]:
+        """Names of the given users with one $in query"""
+        from models.user import user_model
+
+        ids = list({int(user_id) for user_id in user_ids if user_id is not None})
+        if not ids:
+            return {}
+        users = user_model.find({"id": {"$in": ids}}, projection={"_id": 0, "id": 1, "name": 1})
+        return {user["id"]: user for user in users}
+
+    def _build_search_tokens(self, order: Dict, users: Optional[Dict[int, Dict]] = None) -> List[str]:
+        """search_tokens for an order: id, reg number, orderer, customer and driver names"""
+        if users is None:
+            users = self._users_by_id([order.get("user_id"), order.get("driver_id")])
+        customer = users.get(order.get("user_id")) or {}
+        driver = users.get(order.get("driver_id")) or {}
+        return search_tokens(
+            order.get("id"),
+            order.get("reg_number"),
+            order.get("orderer_name"),
+            order.get("customer_name") or customer.get("name"),
+            order.get("driver_name") or driver.get("name")
+        )
+
+    def refresh_search_fields(self, filter_dict: Optional[Dict] = None, batch_size: int = 500) -> int:
+        """
+        Recompute search_tokens for the matching orders (all by default), e.g.
+        after a customer or driver is renamed. Returns the number of orders updated.
+        """
+        projection = {"_id": 0, **{field: 1 for field in SEARCH_SOURCE_FIELDS}}
+        cursor = self.collection.find(filter_dict or {}, projection).batch_size(batch_size)
+
+        updated = 0
+        batch: List[Dict] = []
+        for order in cursor:
+            batch.append(order)
+            if len(batch) >= batch_size:
+                updated += self._write_search_tokens(batch)
+                batch = []
+        if batch:
+            updated += self._write_search_tokens(batch)
+        return updated
+
+    def _write_search_tokens(self, orders: List[Dict]) -> int:
+        users = self._users_by_id(
+            [order.get("user_id") for order in orders] + [order.get("driver_id") for order in orders]
+        )
+        self.collection.bulk_write([
+            UpdateOne({"id": order["id"]}, {"$set": {"search_tokens": self._build_search_tokens(order, users)}})
+            for order in orders
+        ], ordered=False)
+        return len(orders)
+
     def get_orders_with_driver_info(self, limit: int = 300) -> List[Dict]:
         """Get all orders with driver information (for admin)"""
         pipeline = [
@@ -592,26 +1075,9 @@ class OrderModel(BaseModel):
         ]
         return self.aggregate(pipeline)
 
-    def get_orders_with_driver_info_paginated(
-        self, 
-        search: Optional[str] = None,
-        status: Optional[str] = None,
-        date_filter: Optional[str] = None,
-        page: int = 1,
-        per_page: int = 30
-    ) -> Tuple[List[Dict], int]:
-        """Get orders with driver info with search, filtering, and pagination
-        
-        Args:
-            search: Search term for order ID, customer name, or driver name
-            status: Filter by order status
-            date_filter: Filter by date ('today', '7days', '30days', 'all')
-            page: Page number (1-indexed)
-            per_page: Items per page
-            
-        Returns:
-            Tuple of (orders list, total count)
-        """
+    def _dashboard_filter(self, search: Optional[str], status: Optional[str],
+                          date_filter: Optional[str]) -> Tuple[Dict, List[str]]:
+        """$match for the admin order list and the normalised search words"""
         from datetime import timedelta
         
         # Build match filter
@@ -632,18 +1098,17 @@ class OrderModel(BaseModel):
             elif date_filter == '30days':
                 match_filter["created_at"] = {"$gte": now - timedelta(days=30)}
         
-        # Build aggregation pipeline
-        pipeline = []
-        
-        # Initial match for date and status
-        if match_filter:
-            pipeline.append({"$match": match_filter})
-        
-        # Sort by newest first
-        pipeline.append({"$sort": {"id": -1}})
+        # Search on the denormalised search_tokens: every search word must
+        # prefix-match a token, which the search_tokens index can serve
+        words = _search_words(search)
+        if words:
+            match_filter["$and"] = [{"search_tokens": {"$regex": "^" + re.escape(word)}} for word in words]
         
-        # Lookup customer and driver info
-        pipeline.extend([
+        return match_filter, words
+
+    def _dashboard_join_stages(self) -> List[Dict]:
+        """Customer/driver joins and projection, run on the page rows only"""
+        return [
             {"$lookup": {
                 "from": "users",
                 "localField": "user_id",
@@ -658,99 +1123,87 @@ class OrderModel(BaseModel):
             }},
             {"$unwind": {"path": "$customer", "preserveNullAndEmptyArrays": True}},
             {"$unwind": {"path": "$driver", "preserveNullAndEmptyArrays": True}},
-        ])
-        
-        # Add computed fields for search
-        pipeline.append({
-            "$addFields": {
-                "id_string": {"$toString": "$id"},
-                "customer_name_search": {"$ifNull": ["$customer_name", "$customer.name"]},
-                "driver_name_search": {"$ifNull": ["$driver_name", "$driver.name"]}
-            }
-        })
-        
-        # Search filter (after join so we can search on customer/driver names)
-        if search and search.strip():
-            search_term = search.strip()
-            search_regex = {"$regex": search_term, "$options": "i"}
-            pipeline.append({
-                "$match": {
-                    "$or": [
-                        {"id_string": search_regex},
-                        {"customer_name_search": search_regex},
-                        {"driver_name_search": search_regex},
-                        {"orderer_name": search_regex},
-                        {"reg_number": search_regex}
+            {"$project": {
+                "_id": 0,
+                "id": 1, "status": 1,
+                "pickup_address": 1, "dropoff_address": 1,
+                "distance_km": 1, "price_gross": 1,
+                "created_at": 1, "updated_at": 1,
+                "assigned_at": 1, "arrival_time": 1,
+                "pickup_started": 1, "delivery_completed": 1,
+                "images": 1,
+                "reg_number": 1, "winter_tires": 1,
+                "pickup_date": 1, "additional_info": 1,
+                "trip_type": 1, "parent_order_id": 1, "return_order_id": 1,
+                "orderer_name": 1,
+                "orderer_email": 1,
+                "orderer_phone": 1,
+                "customer_reference": 1,
+                "customer_name": {
+                    "$cond": [
+                        {"$or": [{"$eq": ["$customer_name", None]}, {"$eq": ["$customer_name", ""]}]},
+                        "$customer.name",
+                        "$customer_name"
                     ]
-                }
-            })
+                },
+                "customer_phone": {
+                    "$cond": [
+                        {"$or": [{"$eq": ["$customer_phone", None]}, {"$eq": ["$customer_phone", ""]}]},
+                        "$customer.phone",
+                        "$customer_phone"
+                    ]
+                },
+                "customer_email": {
+                    "$cond": [
+                        {"$or": [{"$eq": ["$customer_email", None]}, {"$eq": ["$customer_email", ""]}]},
+                        "$customer.email",
+                        "$customer_email"
+                    ]
+                },
+                "user_name": "$customer.name",
+                "user_email": "$customer.email",
+                "email": 1, "phone": 1, "company": 1,
+                "driver_name": {"$ifNull": ["$driver_name", "$driver.name"]},
+                "driver_email": "$driver.email",
+                "driver_phone": {"$ifNull": ["$driver_phone", "$driver.phone"]}
+            }}
+        ]
+
+    def get_orders_with_driver_info_page(
+        self,
+        search: Optional[str] = None,
+        status: Optional[str] = None,
+        date_filter: Optional[str] = None,
+        cursor: Optional[str] = None,
+        per_page: int = 30
+    ) -> Dict:
+        """Admin order list page by keyset on id (newest first)
         
-        # Use $facet to get both count and paginated results in one query
-        skip = (page - 1) * per_page
-        pipeline.append({
-            "$facet": {
-                "total": [{"$count": "count"}],
-                "orders": [
-                    {"$skip": skip},
-                    {"$limit": per_page},
-                    {"$project": {
-                        "_id": 0,
-                        "id": 1, "status": 1,
-                        "pickup_address": 1, "dropoff_address": 1,
-                        "distance_km": 1, "price_gross": 1,
-                        "created_at": 1, "updated_at": 1,
-                        "assigned_at": 1, "arrival_time": 1,
-                        "pickup_started": 1, "delivery_completed": 1,
-                        "images": 1,
-                        "reg_number": 1, "winter_tires": 1,
-                        "pickup_date": 1, "additional_info": 1,
-                        "trip_type": 1, "parent_order_id": 1, "return_order_id": 1,
-                        "orderer_name": 1,
-                        "orderer_email": 1,
-                        "orderer_phone": 1,
-                        "customer_reference": 1,
-                        "customer_name": {
-                            "$cond": [
-                                {"$or": [{"$eq": ["$customer_name", None]}, {"$eq": ["$customer_name", ""]}]},
-                                "$customer.name",
-                                "$customer_name"
-                            ]
-                        },
-                        "customer_phone": {
-                            "$cond": [
-                                {"$or": [{"$eq": ["$customer_phone", None]}, {"$eq": ["$customer_phone", ""]}]},
-                                "$customer.phone",
-                                "$customer_phone"
-                            ]
-                        },
-                        "customer_email": {
-                            "$cond": [
-                                {"$or": [{"$eq": ["$customer_email", None]}, {"$eq": ["$customer_email", ""]}]},
-                                "$customer.email",
-                                "$customer_email"
-                            ]
-                        },
-                        "user_name": "$customer.name",
-                        "user_email": "$customer.email",
-                        "email": 1, "phone": 1, "company": 1,
-                        "driver_name": {"$ifNull": ["$driver_name", "$driver.name"]},
-                        "driver_email": "$driver.email",
-                        "driver_phone": {"$ifNull": ["$driver_phone", "$driver.phone"]}
-                    }}
-                ]
-            }
-        })
+        Args:
+            search: Search term for order ID, customer name, or driver name
+            status: Filter by order status
+            date_filter: Filter by date ('today', '7days', '30days', 'all')
+            cursor: next/prev token from a previous page (None for the first page)
+            per_page: Items per page
+            
+        Returns:
+            {"orders", "total", "next_cursor", "prev_cursor"}; total is exact from
+            the order counters where they apply, otherwise a cached count
+        """
+        match_filter, words = self._dashboard_filter(search, status, date_filter)
         
-        result = list(self.aggregate(pipeline))
+        orders, next_cursor, prev_cursor = keyset_page(
+            self.collection, match_filter, ["id"], cursor, per_page,
+            pipeline_tail=self._dashboard_join_stages()
+        )
         
-        if result:
-            total = result[0]["total"][0]["count"] if result[0]["total"] else 0
-            orders = result[0]["orders"]
-        else:
-            total = 0
-            orders = []
+        total = None if words else self._counted_total(match_filter.get("status"), date_filter)
+        if total is None:
+            total = self._dashboard_counts.count(
+                self.collection, match_filter, (match_filter.get("status"), date_filter, tuple(words))
+            )
         
-        return orders, total
+        return {"orders": orders, "total": total, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
 
     def update_driver_progress(self, order_id: int, progress_key: str, metadata: Dict) -> Tuple[bool, Optional[str]]:
         """
@@ -3,9 +3,18 @@ Rating Model
 Handles customer ratings and reviews for drivers
 """
 
+import os
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
 from .database import BaseModel, counter_manager
+from .indexes import IndexSpec
+from utils.cache import TTLCache
+
+# Landing page reviews are read on every home page view; admin toggles invalidate locally
+LANDING_REVIEWS_CACHE_TTL = float(os.getenv("LANDING_REVIEWS_CACHE_TTL", "60"))
+
+RATING_STARS = (1, 2, 3, 4, 5)
 
 
 class RatingModel(BaseModel):
@@ -13,11 +22,27 @@ class RatingModel(BaseModel):
 
     collection_name = "ratings"
 
+    indexes = (
+        IndexSpec("id", unique=True),
+        IndexSpec("order_id"),
+        # Driver's approved ratings, newest first, and the aggregate rebuild
+        IndexSpec("driver_id", "status", ("created_at", -1)),
+        # Admin review lists, with and without a status filter
+        IndexSpec("status", ("created_at", -1)),
+        IndexSpec(("created_at", -1)),
+        # Landing page: only the handful of reviews picked for it are indexed
+        IndexSpec("status", ("updated_at", -1), partialFilterExpression={"show_on_landing": True}),
+    )
+
     # Rating statuses
     STATUS_PENDING = "pending"
     STATUS_APPROVED = "approved"
     STATUS_HIDDEN = "hidden"
 
+    def __init__(self):
+        super().__init__()
+        self._landing_cache = TTLCache(maxsize=16, ttl=LANDING_REVIEWS_CACHE_TTL)
+
     def create_rating(self, order_id: int, customer_id: int, driver_id: int, 
                       rating: int, comment: str = None) -> Tuple[Optional[Dict], Optional[str]]:
         """
@@ -61,40 +86,112 @@ class RatingModel(BaseModel):
         try:
             self.insert_one(rating_data)
             
-            # Update driver's average rating
-            self._update_driver_average(driver_id)
+            # Update driver's running rating aggregates
+            self._apply_driver_rating(driver_id, rating, 1)
+            self._track_pending_review(None, rating_data["status"], rating_data["created_at"])
             
             return rating_data, None
         except Exception as e:
             return None, f"Arvostelun tallentaminen epäonnistui: {str(e)}"
 
-    def _update_driver_average(self, driver_id: int):
-        """Recalculate and update driver's average rating"""
+    def _apply_driver_rating(self, driver_id: Optional[int], stars: int, delta: int):
+        """
+        Add (delta=1) or remove (delta=-1) one approved rating from the running
+        aggregates on the driver document: rating_sum, total_ratings and
+        rating_histogram, with average_rating derived from them.
+        """
         from models.user import user_model
-        
-        # Get all approved ratings for this driver
-        ratings = list(self.find({
-            "driver_id": driver_id,
-            "status": self.STATUS_APPROVED
-        }))
-        
-        if not ratings:
+
+        if not driver_id or stars not in RATING_STARS:
             return
-        
-        total = sum(r["rating"] for r in ratings)
-        count = len(ratings)
-        average = round(total / count, 2)
-        
-        # Update driver profile
+
+        driver = user_model.collection.find_one_and_update(
+            {"id": int(driver_id)},
+            {"$inc": {
+                "rating_sum": stars * delta,
+                "total_ratings": delta,
+                f"rating_histogram.{stars}": delta
+            }},
+            projection={"rating_sum": 1, "total_ratings": 1, "rating_histogram": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not driver:
+            return
+
+        histogram = driver.get("rating_histogram") or {}
+        count = driver.get("total_ratings", 0)
+        if sum(histogram.get(str(star), 0) for star in RATING_STARS) != count or count < 0:
+            # Written before running aggregates existed (or drifted) - rebuild this driver
+            self.rebuild_driver_rating_aggregates(driver_id)
+            return
+
+        # Only set the average if no other update landed in between; that one sets its own
         user_model.update_one(
-            {"id": driver_id},
+            {"id": int(driver_id), "total_ratings": count, "rating_sum": driver.get("rating_sum", 0)},
             {"$set": {
-                "average_rating": average,
-                "total_ratings": count,
+                "average_rating": round(driver.get("rating_sum", 0) / count, 2) if count else 0,
                 "rating_updated_at": datetime.now(timezone.utc)
             }}
         )
 
+    def rebuild_driver_rating_aggregates(self, driver_id: Optional[int] = None) -> int:
+        """
+        Reconcile driver rating aggregates from the ratings collection with one
+        $group pipeline (all drivers, or one). Returns the number of drivers updated.
+        """
+        from models.user import user_model
+
+        match = {"status": self.STATUS_APPROVED, "driver_id": {"$ne": None}}
+        if driver_id is not None:
+            match["driver_id"] = int(driver_id)
+
+        rows = self.aggregate([
+            {"$match": match},
+            {"$group": {"_id": {"driver_id": "$driver_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+        ])
+
+        aggregates: Dict[int, Dict] = {}
+        for row in rows:
+            agg = aggregates.setdefault(int(row["_id"]["driver_id"]), {
+                "rating_sum": 0,
+                "total_ratings": 0,
+                "rating_histogram": {str(star): 0 for star in RATING_STARS}
+            })
+            stars = row["_id"]["rating"]
+            agg["rating_sum"] += stars * row["count"]
+            agg["total_ratings"] += row["count"]
+            agg["rating_histogram"][str(stars)] = agg["rating_histogram"].get(str(stars), 0) + row["count"]
+
+        now = datetime.now(timezone.utc)
+        empty = {
+            "rating_sum": 0,
+            "total_ratings": 0,
+            "rating_histogram": {str(star): 0 for star in RATING_STARS},
+            "average_rating": 0,
+            "rating_updated_at": now
+        }
+
+        operations = []
+        for agg_driver_id, agg in aggregates.items():
+            agg["average_rating"] = round(agg["rating_sum"] / agg["total_ratings"], 2)
+            agg["rating_updated_at"] = now
+            operations.append(UpdateOne({"id": agg_driver_id}, {"$set": agg}))
+
+        if operations:
+            user_model.collection.bulk_write(operations, ordered=False)
+
+        # Drivers with no approved ratings left (all hidden) go back to zero
+        if driver_id is not None:
+            if int(driver_id) not in aggregates:
+                user_model.update_one({"id": int(driver_id)}, {"$set": empty})
+        else:
+            user_model.collection.update_many(
+                {"total_ratings": {"$ne": 0, "$exists": True}, "id": {"$nin": list(aggregates)}},
+                {"$set": empty}
+            )
+        user_model.invalidate_cached(driver_id)
+        return len(aggregates)
+
     def get_driver_ratings(self, driver_id: int, limit: int = 50) -> List[Dict]:
         """Get all ratings for a driver"""
         return list(self.find(
@@ -110,30 +207,27 @@ class RatingModel(BaseModel):
         Returns:
             Dict with average_rating, total_ratings, rating_distribution
         """
-        ratings = list(self.find({
-            "driver_id": driver_id,
-            "status": self.STATUS_APPROVED
-        }))
-        
-        if not ratings:
+        from models.user import user_model
+
+        projection = {"_id": 0, "average_rating": 1, "total_ratings": 1, "rating_histogram": 1}
+        driver = user_model.find_one({"id": int(driver_id)}, projection)
+        if driver and "rating_histogram" not in driver:
+            # Not reconciled yet; build the aggregates once
+            self.rebuild_driver_rating_aggregates(driver_id)
+            driver = user_model.find_one({"id": int(driver_id)}, projection)
+
+        if not driver or not driver.get("total_ratings"):
             return {
                 "average_rating": 0,
                 "total_ratings": 0,
                 "distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
             }
-        
-        total = sum(r["rating"] for r in ratings)
-        count = len(ratings)
-        
-        # Calculate distribution
-        distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        for r in ratings:
-            distribution[r["rating"]] += 1
-        
+
+        histogram = driver.get("rating_histogram") or {}
         return {
-            "average_rating": round(total / count, 2),
-            "total_ratings": count,
-            "distribution": distribution
+            "average_rating": driver.get("average_rating", 0),
+            "total_ratings": driver["total_ratings"],
+            "distribution": {star: histogram.get(str(star), 0) for star in RATING_STARS}
         }
 
     def get_order_rating(self, order_id: int) -> Optional[Dict]:
@@ -170,8 +264,9 @@ class RatingModel(BaseModel):
 
         old_status = rating.get("status")
         
+        # Conditional on the status we read, so concurrent moderation counts a transition once
         success = self.update_one(
-            {"id": rating_id},
+            {"id": rating_id, "status": old_status},
             {"$set": {
                 "status": new_status,
                 "moderated_by": admin_id,
@@ -181,13 +276,25 @@ class RatingModel(BaseModel):
         )
 
         if success:
-            # Recalculate driver average if visibility changed
-            if old_status != new_status:
-                self._update_driver_average(rating["driver_id"])
+            # Move the rating in or out of the driver's aggregates if visibility changed
+            if old_status != new_status and self.STATUS_APPROVED in (old_status, new_status):
+                delta = 1 if new_status == self.STATUS_APPROVED else -1
+                self._apply_driver_rating(rating.get("driver_id"), rating.get("rating"), delta)
+            self._track_pending_review(old_status, new_status, rating.get("created_at"))
+            self._landing_cache.clear()
             return True, None
         
         return False, "Moderointi epäonnistui"
 
+    def _track_pending_review(self, old_status: Optional[str], new_status: Optional[str], created_at):
+        """Keep the admin "pending reviews" badge in step with a review entering or leaving pending"""
+        from services.admin_notification_service import admin_notification_service, KIND_REVIEWS
+
+        if new_status == self.STATUS_PENDING and old_status != self.STATUS_PENDING:
+            admin_notification_service.item_added(KIND_REVIEWS, created_at)
+        elif old_status == self.STATUS_PENDING and new_status != self.STATUS_PENDING:
+            admin_notification_service.item_resolved(KIND_REVIEWS, created_at)
+
     def get_reviews_with_details(self, limit: int = 100) -> List[Dict]:
         """Get reviews with customer and driver info (for admin)"""
         from models.user import user_model
@@ -195,11 +302,18 @@ class RatingModel(BaseModel):
         
         reviews = list(self.find(sort=[("created_at", -1)], limit=limit))
         
-        # Enrich with user info
+        # Enrich with user info: one batched fetch per collection, joined in memory
+        users = self._fetch_by_ids(
+            user_model,
+            [r.get("customer_id") for r in reviews] + [r.get("driver_id") for r in reviews],
+            {"_id": 0, "id": 1, "name": 1}
+        )
+        orders = self._fetch_by_ids(order_model, [r.get("order_id") for r in reviews], {"_id": 0, "id": 1, "reg_number": 1})
+
         for review in reviews:
-            customer = user_model.find_by_id(review["customer_id"]) if review.get("customer_id") else None
-            driver = user_model.find_by_id(review["driver_id"]) if review.get("driver_id") else None
-            order = order_model.find_by_id(review["order_id"]) if review.get("order_id") else None
+            customer = self._lookup(users, review.get("customer_id"))
+            driver = self._lookup(users, review.get("driver_id"))
+            order = self._lookup(orders, review.get("order_id"))
             
             review["customer_name"] = customer.get("name") if customer else "Tuntematon"
             review["driver_name"] = driver.get("name") if driver else "Ei kuljettajaa"
@@ -207,6 +321,19 @@ class RatingModel(BaseModel):
         
         return reviews
 
+    @staticmethod
+    def _fetch_by_ids(model: BaseModel, ids: Iterable, projection: Dict) -> Dict[int, Dict]:
+        """Fetch documents for many numeric ids with a single $in query, keyed by id"""
+        unique_ids = {int(i) for i in ids if i}
+        if not unique_ids:
+            return {}
+        docs = model.collection.find({"id": {"$in": list(unique_ids)}}, projection)
+        return {doc["id"]: doc for doc in docs}
+
+    @staticmethod
+    def _lookup(docs: Dict[int, Dict], doc_id) -> Optional[Dict]:
+        return docs.get(int(doc_id)) if doc_id else None
+
     def toggle_landing_visibility(self, rating_id: int, is_visible: bool) -> Tuple[bool, Optional[str]]:
         """
         Toggle whether a review is shown on the landing page
@@ -220,12 +347,17 @@ class RatingModel(BaseModel):
         )
         
         if success:
+            self._landing_cache.clear()
             return True, None
         return False, "Päivitys epäonnistui"
 
     def get_landing_reviews(self, limit: int = 3) -> List[Dict]:
-        """Get reviews selected for landing page"""
+        """Get reviews selected for landing page (cached for LANDING_REVIEWS_CACHE_TTL seconds)"""
         from models.user import user_model
+
+        cached = self._landing_cache.get(limit)
+        if cached is not None:
+            return [dict(review) for review in cached]
         
         reviews = list(self.find(
             {"show_on_landing": True, "status": self.STATUS_APPROVED},
@@ -234,11 +366,13 @@ class RatingModel(BaseModel):
         ))
         
         # Enrich with customer name
+        customers = self._fetch_by_ids(user_model, [r.get("customer_id") for r in reviews], {"_id": 0, "id": 1, "name": 1})
         for review in reviews:
-            customer = user_model.find_by_id(review["customer_id"])
+            customer = self._lookup(customers, review.get("customer_id"))
             review["customer_name"] = customer.get("name") if customer else "Asiakas"
-            
-        return reviews
+
+        self._landing_cache.set(limit, reviews)
+        return [dict(review) for review in reviews]
 
 
 # Global instance
@@ -0,0 +1,28 @@
+"""
+Route Cache Model
+Persistent cache of computed routes (distance and polyline) keyed by
+normalised pickup/dropoff. Reads, writes and the in-process tier live in
+OrderService; this model owns the collection and its indexes.
+"""
+
+import os
+from .database import BaseModel
+from .indexes import IndexSpec
+
+# Routes nobody has quoted for this long are dropped by the TTL monitor
+ROUTE_CACHE_TTL_DAYS = float(os.getenv("ROUTE_CACHE_TTL_DAYS", "180"))
+
+
+class RouteCacheModel(BaseModel):
+    """Cached routes for price quotes"""
+
+    collection_name = "route_cache"
+
+    indexes = (
+        IndexSpec("key", unique=True),
+        IndexSpec("last_used_at", expireAfterSeconds=int(ROUTE_CACHE_TTL_DAYS * 86400)),
+    )
+
+
+# Global instance
+route_cache_model = RouteCacheModel()
@@ -3,9 +3,23 @@ User Model
 Handles user data operations and business logic
 """
 
+import os
+import copy
+import threading
 from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from .database import BaseModel, counter_manager
+from .indexes import IndexSpec
+from utils.cache import TTLCache
+from utils.pagination import ApproximateCounter, keyset_page
+
+# Cross-request user snapshots for get_current_user. Writes through this model
+# invalidate them; the TTL bounds staleness for writes made by other workers.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "15"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))
+
+# Admin user list totals are cached counts, refreshed at most this often
+USER_COUNT_CACHE_TTL = float(os.getenv("USER_COUNT_CACHE_TTL", "60"))
 
 
 class UserModel(BaseModel):
@@ -13,6 +27,28 @@ class UserModel(BaseModel):
 
     collection_name = "users"
 
+    indexes = (
+        IndexSpec("email", unique=True),
+        IndexSpec("id", unique=True),
+        # Admin users list: role filter with keyset on (created_at, id), or no filter
+        IndexSpec("role", ("created_at", -1), ("id", -1)),
+        IndexSpec(("created_at", -1), ("id", -1)),
+        # Pending approvals and status counts
+        IndexSpec("status", ("created_at", -1)),
+        # Active driver listing sorted by name, driver counts
+        IndexSpec("role", "status", "name"),
+        # Only users with an outstanding password reset are indexed
+        IndexSpec("reset_token", partialFilterExpression={"reset_token": {"$exists": True}}),
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+        self._user_cache_lock = threading.Lock()
+        # Bumped on every invalidation so request-level memos can tell they are stale
+        self.cache_generation = 0
+        self._list_counts = ApproximateCounter(ttl=USER_COUNT_CACHE_TTL)
+
     def generate_reset_token(self, email):
         """Generate password reset token for user"""
         import secrets
@@ -126,8 +162,7 @@ class UserModel(BaseModel):
             if "duplicate key error" in error_str.lower() or "E11000" in error_str:
                 print(f"Duplicate key error for user ID {user_id}, forcing counter resync...")
                 # Force resync counter and retry once
-                from models.database import db_manager
-                db_manager.sync_counter("users", "users", "id")
+                counter_manager.resync("users")
 
                 # Get new ID and retry
                 user_id = counter_manager.get_next_id("users")
@@ -149,6 +184,61 @@ class UserModel(BaseModel):
         """Find user by ID"""
         return self.find_one({"id": int(user_id)})
 
+    def find_by_id_cached(self, user_id):
+        """
+        find_by_id served from the cross-request snapshot cache.
+        Returns (user, from_cache); the user is a copy callers may modify.
+        """
+        user_id = int(user_id)
+        user = self._user_cache.get(user_id)
+        if user is not None:
+            return copy.deepcopy(user), True
+
+        generation = self.cache_generation
+        user = self.find_by_id(user_id)
+        # Skip caching a read that raced with an invalidation
+        if user is not None and generation == self.cache_generation:
+            self._user_cache.set(user_id, copy.deepcopy(user))
+        return user, False
+
+    def invalidate_cached(self, user_id=None):
+        """Drop one cached user snapshot, or all of them"""
+        with self._user_cache_lock:
+            self.cache_generation += 1
+        if user_id is None:
+            self._user_cache.clear()
+        else:
+            self._user_cache.delete(int(user_id))
+
+    def _invalidate_for(self, filter_dict):
+        user_id = (filter_dict or {}).get("id")
+        self.invalidate_cached(user_id if isinstance(user_id, int) else None)
+
+    def update_one(self, filter_dict, update_dict, upsert=False):
+        """Update a single user and drop its cached snapshot"""
+        try:
+            success = super().update_one(filter_dict, update_dict, upsert=upsert)
+        finally:
+            self._invalidate_for(filter_dict)
+
+        # Customer and driver names are denormalised into order search tokens
+        if success and "name" in update_dict.get("$set", {}) and "id" in filter_dict:
+            from models.order import order_model
+            user_id = int(filter_dict["id"])
+            order_model.refresh_search_fields({"$or": [{"user_id": user_id}, {"driver_id": user_id}]})
+        return success
+
+    def delete_one(self, filter_dict):
+        """Delete a single user and drop its cached snapshot"""
+        try:
+            return super().delete_one(filter_dict)
+        finally:
+            self._invalidate_for(filter_dict)
+
+    def get_cache_stats(self):
+        """Snapshot cache hit/miss counters"""
+        return self._user_cache.stats()
+
     def authenticate(self, email, password):
         """Authenticate user with email and password"""
         user = self.find_by_email(email)
@@ -211,6 +301,19 @@ class UserModel(BaseModel):
             limit=limit
         )
 
+    def get_users_page(self, filter_dict, cursor=None, per_page=50):
+        """
+        Admin user list page by keyset on (created_at, id), newest first.
+        Returns {"users", "total", "next_cursor", "prev_cursor"}; total is a
+        count cached for USER_COUNT_CACHE_TTL seconds.
+        """
+        users, next_cursor, prev_cursor = keyset_page(
+            self.collection, filter_dict, ["created_at", "id"], cursor, per_page,
+            nullable=["created_at"], projection={"_id": 0, "password_hash": 0}
+        )
+        total = self._list_counts.count(self.collection, filter_dict, repr(sorted(filter_dict.items())))
+        return {"users": users, "total": total, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
     def update_user_profile(self, user_id, name=None, email=None):
         """Update user profile information"""
         update_data = {"updated_at": datetime.now(timezone.utc)}
@@ -331,7 +434,7 @@ class UserModel(BaseModel):
 
     def get_user_stats(self):
         """Get user statistics"""
-        total_users = self.count_documents()
+        total_users = self.collection.estimated_document_count()
         pending_users = self.count_documents({"status": "pending"})
         active_users = self.count_documents({"status": "active"})
         admin_users = self.count_documents({"role": "admin"})
@@ -493,8 +493,7 @@ def order_confirm_v2():
     is_first_order = False
     if user_id:
         try:
-            existing = order_service.get_user_orders(user_id, limit=1)
-            is_first_order = len(existing) == 0
+            is_first_order = order_service.is_first_order(user_id)
         except:
             pass
 
@@ -758,8 +757,7 @@ def api_order_submit():
         # Check if first order
         is_first_order = False
         try:
-            existing = order_service.get_user_orders(user_id, limit=1)
-            is_first_order = len(existing) == 0
+            is_first_order = order_service.is_first_order(user_id)
         except:
             pass
         
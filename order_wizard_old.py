@@ -1885,8 +1885,7 @@ def order_confirm():
     if u and u.get("id"):
         try:
             user_id = int(u["id"])
-            existing_orders = order_service.get_user_orders(user_id, limit=1)
-            is_first_order = len(existing_orders) == 0
+            is_first_order = order_service.is_first_order(user_id)
         except Exception as e:
             print(f"Failed to check first order status: {e}")
             user_id = int(u["id"])
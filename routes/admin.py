@@ -2,6 +2,7 @@
 Admin Routes for user and system management
 """
 
+import math
 from datetime import datetime, timezone
 from flask import Blueprint, request, redirect, url_for, flash, render_template, jsonify
 from werkzeug.security import generate_password_hash
@@ -25,7 +26,7 @@ def dashboard():
 @admin_required
 def users():
     """Admin user management page with search/filter"""
-    from app import users_col
+    from models.user import user_model
 
     search = request.args.get("search", "").strip()
     # Default to 'user' (customers) if no role specified, unless explicit "all" is requested (though UI won't offer "all")
@@ -44,11 +45,14 @@ def users():
             {"phone": {"$regex": search, "$options": "i"}},
         ]
 
-    users = list(users_col().find(query, {"_id": 0}).sort("created_at", -1))
+    page = user_model.get_users_page(query, cursor=request.args.get("cursor") or None)
 
     return render_template(
         "admin/users.html",
-        users=users,
+        users=page["users"],
+        total_users=page["total"],
+        next_cursor=page["next_cursor"],
+        prev_cursor=page["prev_cursor"],
         current_user=auth_service.get_current_user(),
         search=search,
         role_filter=role_filter,
@@ -143,6 +147,7 @@ def approve_user():
         {"id": user_id},
         {"$set": {"status": "active"}}
     )
+    user_model.invalidate_cached(user_id)
 
     if result.modified_count > 0:
         flash("Käyttäjä hyväksytty onnistuneesti", "success")
@@ -192,6 +197,7 @@ def deny_user():
     # Delete the user from users collection
     try:
         result = users_col().delete_one({"id": user_id})
+        user_model.invalidate_cached(user_id)
         if result.deleted_count == 0:
             deletion_successful = False
     except Exception as e:
@@ -432,6 +438,7 @@ def delete_admin_user():
     # Delete the admin user
     from app import users_col
     result = users_col().delete_one({"id": user_id})
+    user_model.invalidate_cached(user_id)
     
     if result.deleted_count > 0:
         flash(f"Admin-käyttäjä {target_user.get('name')} poistettu onnistuneesti", "success")
@@ -582,6 +589,7 @@ def delete_driver(driver_id):
     deletion_successful = True
     try:
         result = users_col().delete_one({"id": driver_id})
+        user_model.invalidate_cached(driver_id)
         if result.deleted_count == 0:
             deletion_successful = False
     except Exception as e:
@@ -682,6 +690,7 @@ def deny_driver_application():
         # Delete the orphaned driver account
         try:
             users_col().delete_one({"id": existing_user['id']})
+            user_model.invalidate_cached(existing_user['id'])
             flash(f"Hakemus hylätty ja liittyvä kuljettajatili poistettu: {app['name']}", "warning")
         except Exception as e:
             print(f"Failed to delete orphaned driver account: {e}")
@@ -730,6 +739,7 @@ def delete_driver_application(application_id):
         # Delete user account
         try:
             users_col().delete_one({"id": user_id})
+            user_model.invalidate_cached(user_id)
             user_deleted = True
             user_info = f"Käyttäjätili #{user_id} poistettu ({user_role}, {user_status})"
             print(f"✓ Deleted user account #{user_id} ({app_email})")
@@ -1709,6 +1719,51 @@ def api_preview_discounted_price():
     return jsonify(result)
 
 
+@admin_bp.route("/api/discounts/what-if", methods=["POST"])
+@admin_required
+def api_discount_what_if():
+    """Price many distances at once, optionally with one discount (bulk re-pricing analysis)"""
+    from services.pricing_engine import price_batch
+    from services.discount_service import discount_service
+
+    data = request.get_json(force=True, silent=True) or {}
+
+    try:
+        distances = [float(d) for d in data.get("distances") or []]
+    except (TypeError, ValueError):
+        return jsonify({"error": "Virheellinen etäisyys"}), 400
+    # float() also accepts "nan", "inf" and negatives, which would end up in the pricing output
+    if not all(math.isfinite(d) and d >= 0 for d in distances):
+        return jsonify({"error": "Virheellinen etäisyys"}), 400
+    if not distances:
+        return jsonify({"error": "Etäisyys vaaditaan"}), 400
+    if len(distances) > 100000:
+        return jsonify({"error": "Enintään 100000 etäisyyttä kerralla"}), 400
+
+    metro = data.get("metro")
+    if metro is not None and (not isinstance(metro, list) or len(metro) != len(distances)):
+        return jsonify({"error": "Metro-lippuja pitää olla yhtä monta kuin etäisyyksiä"}), 400
+
+    discount = None
+    if data.get("discount_id"):
+        try:
+            discount_id = int(data["discount_id"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "Virheellinen alennuksen tunniste"}), 400
+        discount = discount_service.get_discount(discount_id)
+        if not discount:
+            return jsonify({"error": "Alennusta ei löytynyt"}), 404
+
+    result = price_batch(
+        distances,
+        [bool(m) for m in metro] if metro is not None else None,
+        discount=discount,
+        return_leg=bool(data.get("return_leg", False))
+    )
+    result["distances"] = distances
+    return jsonify(result)
+
+
 # ----------------- REVIEWS MODERATION -----------------
 
 @admin_bp.route("/reviews")
@@ -1798,3 +1853,36 @@ def toggle_landing_review():
     return redirect(url_for("admin.reviews"))
 
 
+
+
+# ----------------- PERFORMANCE -----------------
+
+@admin_bp.route("/api/performance-stats")
+@admin_required
+def api_performance_stats():
+    """Cache hit rates, upstream call counts and latency histograms (per worker process)"""
+    from services.maps_client import maps_client
+    from services.autocomplete_service import autocomplete_service
+    from models.geocode_cache import geocode_cache_model
+    from models.discount import discount_model
+    from services.admin_notification_service import admin_notification_service
+    from models.database import counter_manager
+    from services.email_outbox_worker import email_outbox_worker
+    from services.email_service import email_service
+    from services.email_renderer import email_renderer
+    from services.admin_digest_service import admin_digest_service
+
+    return jsonify({
+        "maps": maps_client.get_stats(),
+        "autocomplete": autocomplete_service.get_stats(),
+        "route_cache": order_service.get_route_cache_stats(),
+        "geocode_cache": geocode_cache_model.get_stats(),
+        "discount_rules": discount_model.get_rules_stats(),
+        "admin_notifications": admin_notification_service.get_stats(),
+        "current_user": auth_service.get_stats(),
+        "id_allocation": counter_manager.get_stats(),
+        "email_outbox": email_outbox_worker.get_stats(),
+        "smtp_pool": email_service.smtp_pool.get_stats(),
+        "email_render": email_renderer.get_stats(),
+        "admin_digests": admin_digest_service.get_stats()
+    })
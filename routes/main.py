@@ -63,40 +63,29 @@ def admin_dashboard():
     search = request.args.get('search', '').strip()
     status = request.args.get('status', '')
     date_filter = request.args.get('date_filter', '30days')
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor') or None
     per_page = 30
     
-    # Validate page number
-    if page < 1:
-        page = 1
-    
-    # Get orders with filtering and pagination
+    # Get orders with filtering and keyset pagination (flat cost on deep pages)
     from models.order import order_model
-    orders, total_orders = order_model.get_orders_with_driver_info_paginated(
+    page = order_model.get_orders_with_driver_info_page(
         search=search if search else None,
         status=status if status else None,
         date_filter=date_filter if date_filter else None,
-        page=page,
+        cursor=cursor,
         per_page=per_page
     )
     
-    # Calculate pagination info
-    total_pages = (total_orders + per_page - 1) // per_page if total_orders > 0 else 1
-    start_order = (page - 1) * per_page + 1 if total_orders > 0 else 0
-    end_order = min(page * per_page, total_orders)
-    
     user = auth_service.get_current_user()
     return render_template(
         "admin/dashboard.html", 
-        orders=orders, 
+        orders=page["orders"], 
         current_user=user,
         # Pagination context
-        total_orders=total_orders,
-        current_page=page,
-        total_pages=total_pages,
+        total_orders=page["total"],
+        next_cursor=page["next_cursor"],
+        prev_cursor=page["prev_cursor"],
         per_page=per_page,
-        start_order=start_order,
-        end_order=end_order,
         # Filter context
         search=search,
         status=status,
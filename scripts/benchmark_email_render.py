@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark email rendering: precompiled templates + text templates vs the old path
+
+  legacy    render_template + regex HTML->text over the full rendered page
+  renderer  EmailRenderer.render (compiled HTML template + text template)
+
+Usage:
+    python scripts/benchmark_email_render.py
+    python scripts/benchmark_email_render.py --count 5000
+
+No database or SMTP server needed.
+"""
+
+import re
+import sys
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask, render_template
+
+from services.email_renderer import EmailRenderer
+
+ORDER = {
+    "id": 1042, "order_id": 1042, "status": "Vahvistettu", "status_description": "Tilaus on vahvistettu",
+    "pickup_address": "Mannerheimintie 1, 00100 Helsinki", "dropoff_address": "Hämeenkatu 2, 33100 Tampere",
+    "pickup_date": "20.10.2026", "vehicle_make": "Volvo", "vehicle_model": "V70", "distance_km": 176.4,
+    "price_gross": 189.0, "created_at": datetime(2026, 10, 16, 9, 30), "reg_number": "ABC-123", "winter_tires": True
+}
+
+EMAILS = {
+    "status_update": {"user_name": "Matti Meikäläinen", "order": ORDER, "new_status": "CONFIRMED"},
+    "order_created": {"user_name": "Matti Meikäläinen", "order": ORDER},
+    "admin_new_order": {"order": ORDER, "customer": {"name": "Matti", "email": "matti@example.com"},
+                        "admin_url": "https://www.levoro.fi/admin", "order_detail_url": "https://www.levoro.fi/admin/order/1042"},
+    "password_reset": {"user_name": "Matti", "reset_url": "https://www.levoro.fi/reset/abc", "token": "abc"},
+}
+
+
+def legacy_html_to_text(html_content):
+    """EmailService._html_to_text before the renderer"""
+    text = re.sub('<[^<]+?>', '', html_content)
+    text = text.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark email rendering")
+    parser.add_argument("--count", type=int, default=2000, help="Renders per email and mode")
+    args = parser.parse_args()
+
+    app = Flask(__name__, template_folder=str(Path(__file__).parent.parent / "templates"))
+    renderer = EmailRenderer()
+
+    with app.app_context():
+        started = time.perf_counter()
+        compiled = renderer.init_app(app)
+        print(f"Precompiled {compiled} templates in {(time.perf_counter() - started) * 1000:.1f} ms\n")
+
+        print(f"{'email':<16} {'mode':<9} {'us/msg':>9} {'text bytes':>11}")
+        for name, context in EMAILS.items():
+            modes = (
+                ("legacy", lambda: (lambda h: (h, legacy_html_to_text(h)))(
+                    render_template(f"emails/{name}.html", **context))),
+                ("renderer", lambda: renderer.render(name, **context)),
+            )
+            for mode, render in modes:
+                render()
+                started = time.perf_counter()
+                for _ in range(args.count):
+                    html_body, text_body = render()
+                seconds = time.perf_counter() - started
+                print(f"{name:<16} {mode:<9} {seconds / args.count * 1e6:9.1f} {len(text_body.encode('utf-8')):11d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark block ID allocation against the previous per-insert counter path
+
+Inserts the same number of orders, users and ratings three ways and prints
+the time and counter round trips for each:
+  legacy      find_one existence check + find_one_and_update $inc per insert
+  sequential  one $inc per insert (SEQUENTIAL_ID_SEQUENCES, gap-free)
+  block       one $inc per --block-size inserts (default path)
+
+Usage:
+    python scripts/benchmark_id_allocation.py
+    python scripts/benchmark_id_allocation.py --count 5000 --block-size 100
+
+Needs MONGODB_URI like the app. Writes only to a scratch database
+(--db, default benchmark_ids) which is dropped afterwards.
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path to import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+COLLECTIONS = ("orders", "users", "ratings")
+
+
+def legacy_next_id(counters, sequence_name, stats):
+    """The allocation path before block IDs: two round trips per insert"""
+    from pymongo import ReturnDocument
+
+    counters.find_one({"_id": sequence_name})
+    result = counters.find_one_and_update(
+        {"_id": sequence_name},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    stats["round_trips"] += 2
+    return result["value"]
+
+
+def make_doc(collection_name, doc_id):
+    now = datetime.now(timezone.utc)
+    if collection_name == "orders":
+        return {"id": doc_id, "user_id": 1, "status": "NEW", "created_at": now, "price_gross": 42.0}
+    if collection_name == "users":
+        return {"id": doc_id, "email": f"bench{doc_id}@example.com", "name": "Bench", "role": "user", "created_at": now}
+    return {"id": doc_id, "order_id": doc_id, "driver_id": 1, "rating": 5, "status": "approved", "created_at": now}
+
+
+def run(db, collection_name, count, next_id):
+    """Insert count documents one by one (as the app does); returns seconds"""
+    db[collection_name].drop()
+    db[collection_name].create_index("id", unique=True)
+    db["counters"].delete_many({"_id": collection_name})
+
+    started = time.perf_counter()
+    for _ in range(count):
+        db[collection_name].insert_one(make_doc(collection_name, next_id(collection_name)))
+    seconds = time.perf_counter() - started
+
+    ids = db[collection_name].distinct("id")
+    if len(ids) != count:
+        raise RuntimeError(f"{collection_name}: expected {count} unique ids, found {len(ids)}")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark block vs per-insert ID allocation")
+    parser.add_argument("--count", type=int, default=2000, help="Documents inserted per collection and mode")
+    parser.add_argument("--block-size", type=int, default=50)
+    parser.add_argument("--db", default="benchmark_ids", help="Scratch database (dropped afterwards)")
+    args = parser.parse_args()
+
+    # Point the models at the scratch database before they connect
+    os.environ["DB_NAME"] = args.db
+    from models.database import db_manager, CounterManager
+
+    db = db_manager.db
+    try:
+        print(f"Inserts per run: {args.count}, block size {args.block_size}\n")
+        print(f"{'collection':<10} {'mode':<11} {'total ms':>10} {'us/insert':>10} {'round trips':>12}")
+        for collection_name in COLLECTIONS:
+            legacy_stats = {"round_trips": 0}
+            modes = [
+                ("legacy", lambda name: legacy_next_id(db["counters"], name, legacy_stats), lambda: legacy_stats["round_trips"]),
+            ]
+            sequential = CounterManager(sequential=COLLECTIONS)
+            block = CounterManager(block_size=args.block_size, sequential=())
+            modes.append(("sequential", sequential.get_next_id, lambda m=sequential: m.get_stats()["round_trips"]))
+            modes.append(("block", block.get_next_id, lambda m=block: m.get_stats()["round_trips"]))
+
+            for mode, next_id, round_trips in modes:
+                seconds = run(db, collection_name, args.count, next_id)
+                print(f"{collection_name:<10} {mode:<11} {seconds * 1000:10.1f} "
+                      f"{seconds / args.count * 1e6:10.1f} {round_trips():12d}")
+    finally:
+        db_manager.client.drop_database(args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark order photo processing: in-memory pipeline vs the old save/reopen path
+
+  legacy    verify() decode, file.save to disk, reopen + full decode, LANCZOS
+            resize, save to a second file, re-read it for the GCS upload
+  pipeline  ImageService.process_upload (draft-mode decode, resize, JPEG into
+            memory) - the bytes go straight to storage
+
+Each mode runs in its own child process so peak RSS is measured separately.
+
+Usage:
+    python scripts/benchmark_image_pipeline.py
+    python scripts/benchmark_image_pipeline.py --corpus ~/Pictures/phone --count 20
+
+Without --corpus, synthetic 12-MP (4032x3024) photos are generated. No
+database, GCS bucket or network needed.
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from io import BytesIO
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# models.database requires a URI at import time; it is never contacted here
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+PHOTO_SIZE = (4032, 3024)
+
+
+def synthetic_photo(seed: int) -> bytes:
+    """A 12-MP JPEG with enough detail to compress like a phone photo"""
+    from PIL import Image, ImageFilter
+
+    noise = Image.effect_noise((PHOTO_SIZE[0] // 8, PHOTO_SIZE[1] // 8), 40 + seed % 20)
+    img = Image.merge("RGB", (
+        noise.resize(PHOTO_SIZE, Image.Resampling.BICUBIC),
+        Image.linear_gradient("L").resize(PHOTO_SIZE),
+        noise.rotate(90, expand=True).resize(PHOTO_SIZE).filter(ImageFilter.DETAIL),
+    ))
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def load_corpus(corpus: str, count: int):
+    paths = sorted(p for p in Path(corpus).expanduser().iterdir()
+                   if p.suffix.lower() in (".jpg", ".jpeg"))[:count]
+    if not paths:
+        sys.exit(f"No JPEG files in {corpus}")
+    return [p.read_bytes() for p in paths]
+
+
+def legacy_process(data: bytes, workdir: str, max_width: int, quality: int) -> bytes:
+    """ImageService.save_order_image before the in-memory pipeline"""
+    from PIL import Image
+    from werkzeug.datastructures import FileStorage
+
+    file = FileStorage(stream=BytesIO(data), filename="photo.jpg")
+    # _validate_file: read and verify
+    file.seek(0)
+    with Image.open(file) as img:
+        img.verify()
+    file.seek(0)
+
+    original = os.path.join(workdir, "upload.jpg")
+    file.save(original)
+
+    processed = os.path.join(workdir, "processed.jpg")
+    with Image.open(original) as img:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if img.width > max_width:
+            new_height = int((max_width / img.width) * img.height)
+            img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+        img.save(processed, "JPEG", quality=quality, optimize=True)
+    os.remove(original)
+
+    # GCS upload read the processed file back from disk
+    with open(processed, "rb") as f:
+        output = f.read()
+    os.remove(processed)
+    return output
+
+
+def run_mode(mode: str, corpus: str, count: int):
+    """Child process: process the corpus and print one result line"""
+    from werkzeug.datastructures import FileStorage
+    from services.image_service import image_service, MAX_IMAGE_WIDTH, IMAGE_QUALITY
+
+    photos = load_corpus(corpus, count)
+    # Phone photos can exceed the 5MB upload limit; the limit is not what is measured
+    image_service.max_file_size = max(len(p) for p in photos) + 1
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output_bytes = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for data in photos:
+            if mode == "legacy":
+                output = legacy_process(data, workdir, MAX_IMAGE_WIDTH, IMAGE_QUALITY)
+            else:
+                output, error = image_service.process_upload(FileStorage(stream=BytesIO(data), filename="photo.jpg"))
+                if error:
+                    sys.exit(error)
+            output_bytes += len(output)
+        cpu = time.process_time() - cpu_started
+        wall = time.perf_counter() - wall_started
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode:<9} {len(photos):6d} {cpu / len(photos) * 1000:10.1f} {wall / len(photos) * 1000:10.1f} "
+          f"{peak_rss / 1024:10.1f} {(peak_rss - rss_before) / 1024:10.1f} {output_bytes / len(photos) / 1024:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark order photo processing")
+    parser.add_argument("--corpus", help="Directory of JPEG phone photos (default: synthetic 12-MP photos)")
+    parser.add_argument("--count", type=int, default=10, help="Photos to process per mode")
+    parser.add_argument("--mode", choices=("legacy", "pipeline"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.corpus, args.count)
+        return
+
+    with tempfile.TemporaryDirectory() as synthetic:
+        corpus = args.corpus
+        if not corpus:
+            # Generated up front so the 12-MP source images don't count towards peak RSS
+            corpus = synthetic
+            for seed in range(args.count):
+                Path(synthetic, f"photo_{seed:03d}.jpg").write_bytes(synthetic_photo(seed))
+
+        # ru_maxrss is in kilobytes on Linux
+        print(f"{'mode':<9} {'photos':>6} {'cpu ms':>10} {'wall ms':>10} {'peak MB':>10} {'+MB':>10} {'out kB':>9}")
+        for mode in ("legacy", "pipeline"):
+            command = [sys.executable, __file__, "--mode", mode, "--count", str(args.count), "--corpus", corpus]
+            subprocess.run(command, check=True)
+
+
+if __name__ == "__main__":
+    main()
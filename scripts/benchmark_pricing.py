@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorised pricing engine against the scalar pricing loop
+
+Prices the same random distances both ways, checks the results are
+bit-identical and prints the timings.
+
+Usage:
+    python scripts/benchmark_pricing.py
+    python scripts/benchmark_pricing.py --count 100000 --discount percentage:10
+
+Needs MONGODB_URI like the app (no documents are read or written).
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services import pricing_engine
+from services.pricing_engine import price_batch, price_batch_scalar, PRICE_FIELDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorised vs scalar pricing")
+    parser.add_argument("--count", type=int, default=20000, help="Number of distances to price")
+    parser.add_argument("--discount", default="", help="Optional discount as type:value, e.g. percentage:10")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not pricing_engine.HAS_NUMPY:
+        print("numpy is not installed - install it to benchmark the vectorised engine (pip install numpy)")
+        sys.exit(1)
+
+    discount = None
+    if args.discount:
+        discount_type, _, value = args.discount.partition(":")
+        discount = {"type": discount_type, "value": float(value or 0)}
+
+    rng = random.Random(args.seed)
+    distances = [round(rng.uniform(1, 900), 1) for _ in range(args.count)]
+    metro = [rng.random() < 0.3 for _ in range(args.count)]
+
+    started = time.perf_counter()
+    scalar = price_batch_scalar(distances, metro, discount)
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vector = price_batch(distances, metro, discount)
+    vector_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1
+        for field in PRICE_FIELDS
+        for a, b in zip(vector[field], scalar[field])
+        if float(a).hex() != float(b).hex()
+    )
+
+    print(f"Distances:   {args.count}" + (f" (discount {args.discount})" if discount else ""))
+    print(f"Scalar loop: {scalar_seconds * 1000:10.1f} ms  ({scalar_seconds / args.count * 1e6:.2f} us/price)")
+    print(f"Vectorised:  {vector_seconds * 1000:10.1f} ms  ({vector_seconds / args.count * 1e6:.2f} us/price)")
+    print(f"Speed-up:    {scalar_seconds / vector_seconds:10.1f}x")
+    print(f"Mismatches:  {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark pooled SMTP sessions against a new connection per message
+
+Starts the local stub server (scripts/smtp_stub_server.py) with a simulated
+session setup cost and sends the same messages three ways:
+  per-message  Mail.send, one connect + login + quit per email (old path)
+  pooled       SMTPConnectionPool.send per email (request handlers)
+  batched      SMTPConnectionPool.send_many per batch (outbox worker)
+
+Usage:
+    python scripts/benchmark_smtp_pool.py
+    python scripts/benchmark_smtp_pool.py --count 500 --handshake-ms 150 --batch 20
+
+No database or real SMTP server needed.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from flask_mail import Mail, Message
+
+from services.smtp_pool import SMTPConnectionPool
+from scripts.smtp_stub_server import StubSMTPServer
+
+
+def make_messages(count):
+    return [
+        Message(f"[Levoro] Tilauksen #{n} tila päivitetty", recipients=[f"asiakas{n}@example.com"],
+                body="Tilauksesi tila on päivitetty.", html="<p>Tilauksesi tila on päivitetty.</p>")
+        for n in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-message SMTP sending")
+    parser.add_argument("--count", type=int, default=200, help="Messages per mode")
+    parser.add_argument("--handshake-ms", type=float, default=100, help="Simulated SSL + AUTH cost per connection")
+    parser.add_argument("--batch", type=int, default=20, help="Messages per send_many call")
+    args = parser.parse_args()
+
+    server = StubSMTPServer(handshake_delay=args.handshake_ms / 1000).start()
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER="127.0.0.1", MAIL_PORT=server.port, MAIL_USE_SSL=False, MAIL_USE_TLS=False,
+        MAIL_USERNAME="bench@levoro.fi", MAIL_PASSWORD="bench", MAIL_DEFAULT_SENDER="bench@levoro.fi"
+    )
+    mail = Mail(app)
+
+    def per_message(messages):
+        for message in messages:
+            mail.send(message)
+
+    def pooled(messages):
+        pool = SMTPConnectionPool(mail)
+        for message in messages:
+            pool.send(message)
+        pool.close_idle(force=True)
+
+    def batched(messages):
+        pool = SMTPConnectionPool(mail)
+        for start in range(0, len(messages), args.batch):
+            errors = pool.send_many(messages[start:start + args.batch])
+            if any(errors):
+                raise RuntimeError(f"send failed: {errors}")
+        pool.close_idle(force=True)
+
+    print(f"Messages per mode: {args.count}, simulated handshake {args.handshake_ms:.0f} ms\n")
+    print(f"{'mode':<12} {'total s':>9} {'msg/s':>9} {'ms/msg':>9} {'connections':>12}")
+    try:
+        with app.app_context():
+            for mode, send in (("per-message", per_message), ("pooled", pooled), ("batched", batched)):
+                server.reset()
+                messages = make_messages(args.count)
+                started = time.perf_counter()
+                send(messages)
+                seconds = time.perf_counter() - started
+                if len(server.messages) != args.count:
+                    raise RuntimeError(f"{mode}: server received {len(server.messages)} of {args.count}")
+                print(f"{mode:<12} {seconds:9.2f} {args.count / seconds:9.1f} "
+                      f"{seconds / args.count * 1000:9.2f} {server.connections:12d}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
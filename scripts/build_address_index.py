@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Build the local address autocomplete index
+
+Reads a curated address list (e.g. an imported street address register) and
+writes the memory-mapped index used by /api/places_autocomplete when
+ADDRESS_INDEX_PATH is set. The endpoint is public, so never feed customers'
+order or saved addresses into it.
+
+Usage:
+    python scripts/build_address_index.py data/address_index.bin addresses.txt
+
+Address file: one address per line, optionally "<address>\\t<place_id>".
+The file is replaced atomically, running workers pick it up automatically.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.address_index import build_index, collect_addresses, AddressIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local address autocomplete index")
+    parser.add_argument("output", help="Index file to write")
+    parser.add_argument("source", help="Curated address file to index")
+    args = parser.parse_args()
+
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    count = build_index(args.output, collect_addresses(args.source))
+    print(f"Wrote {count} addresses to {args.output} in {time.perf_counter() - started:.2f}s")
+
+    # Quick sanity check of the written file
+    index = AddressIndex(args.output)
+    print(f"Index loaded with {len(index)} records")
+
+
+if __name__ == "__main__":
+    main()
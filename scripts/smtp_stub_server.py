@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Local stub SMTP server for tests and benchmarks (stdlib only, no TLS)
+
+Accepts everything, keeps received messages in memory and can simulate
+the cost of a real session setup (SSL handshake + AUTH) with a delay per
+connection. Failures can be scripted per command, e.g. a 421 at MAIL FROM.
+
+Usage:
+    python scripts/smtp_stub_server.py --port 2525 --handshake-ms 150
+
+Then point the app at it with ZOHO_SMTP_SERVER=127.0.0.1 ZOHO_SMTP_PORT=2525
+ZOHO_USE_SSL=false ZOHO_PASSWORD= to see every message printed.
+"""
+
+import time
+import argparse
+import threading
+import socketserver
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session"""
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.open_sockets.add(self.connection)
+        try:
+            if server.handshake_delay:
+                time.sleep(server.handshake_delay)
+            self.reply("220 stub.local ESMTP ready")
+            self.session()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with server.lock:
+                server.open_sockets.discard(self.connection)
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def session(self):
+        server = self.server
+        envelope = {}
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].split(":", 1)[0].upper()
+
+            failure = server.take_failure(verb)
+            if failure:
+                code, text = failure
+                self.reply(f"{code} {text}")
+                if code == 421:
+                    return
+                continue
+
+            if verb == "EHLO":
+                self.wfile.write(b"250-stub.local\r\n250-AUTH PLAIN LOGIN\r\n250 SIZE 10485760\r\n")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                envelope = {"from": command[10:].strip(), "to": []}
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                envelope.setdefault("to", []).append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk)
+                envelope["data"] = b"".join(data)
+                with server.lock:
+                    server.messages.append(envelope)
+                if server.verbose:
+                    print(f"[STUB SMTP] {envelope['from']} -> {envelope['to']} ({len(envelope['data'])} bytes)")
+                envelope = {}
+                self.reply("250 OK queued")
+            elif verb in ("HELO", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                with server.lock:
+                    server.quits += 1
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """Threaded stub server; port 0 picks a free port"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, handshake_delay=0.0, verbose=False):
+        super().__init__((host, port), StubSMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.failures = []  # [(verb, code, text)] consumed in order
+        self.open_sockets = set()
+        self.reset()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def reset(self):
+        with self.lock:
+            self.connections = 0
+            self.quits = 0
+            self.messages = []
+            self.failures = []
+
+    def fail_next(self, verb, code, text="Service not available, try again later"):
+        """Answer the next verb command with code (421 also closes the connection)"""
+        with self.lock:
+            self.failures.append((verb.upper(), code, text))
+
+    def take_failure(self, verb):
+        with self.lock:
+            for index, (failure_verb, code, text) in enumerate(self.failures):
+                if failure_verb == verb:
+                    del self.failures[index]
+                    return code, text
+        return None
+
+    def drop_connections(self):
+        """Close every open session without a reply, like a server-side idle timeout"""
+        with self.lock:
+            sockets = list(self.open_sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub SMTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--handshake-ms", type=float, default=0, help="Simulated SSL + AUTH cost per connection")
+    args = parser.parse_args()
+
+    server = StubSMTPServer(args.host, args.port, args.handshake_ms / 1000, verbose=True)
+    print(f"Stub SMTP server on {args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
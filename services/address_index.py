@@ -0,0 +1,209 @@
+"""
+Local Address Index
+Sorted-array prefix index of known street addresses, stored in a single
+memory-mapped file so every gunicorn worker shares one copy through the OS
+page cache. Used to answer address autocomplete without calling Google.
+Built only from a curated address list (see scripts/build_address_index.py).
+
+File layout (little-endian):
+    8 bytes   magic b"LVAIDX01"
+    uint32    record count N
+    uint32    offsets[N + 1] into the record blob
+    blob      records "key \\x1f description \\x1f place_id \\x1f count", sorted by key
+"""
+
+import os
+import re
+import mmap
+import time
+import struct
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ADDRESS_INDEX_PATH = os.getenv("ADDRESS_INDEX_PATH", "").strip()
+# Max records scanned inside a prefix range when picking the most used addresses
+ADDRESS_INDEX_SCAN_LIMIT = int(os.getenv("ADDRESS_INDEX_SCAN_LIMIT", "200"))
+# How often workers check whether the index file was rebuilt
+ADDRESS_INDEX_RELOAD_SECONDS = float(os.getenv("ADDRESS_INDEX_RELOAD_SECONDS", "60"))
+
+MAGIC = b"LVAIDX01"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<I")
+FIELD_SEP = "\x1f"
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """Normalise address text for index keys and lookups"""
+    if not address:
+        return ""
+    return re.sub(r"\s+", " ", address.replace(FIELD_SEP, " ").strip().lower())
+
+
+def collect_addresses(import_path: str) -> Iterable[Tuple[str, str]]:
+    """
+    Yield (address, place_id) pairs from a curated address file
+
+    Format: one address per line, optionally followed by a tab and a place_id.
+    The index is served to anonymous users, so it must never be built from
+    customers' order or saved addresses.
+    """
+    with open(import_path, encoding="utf-8") as f:
+        for line in f:
+            address, _, place_id = line.rstrip("\n").partition("\t")
+            yield address, place_id.strip()
+
+
+def build_index(output_path: str, addresses: Iterable[Tuple[str, str]]) -> int:
+    """Write a sorted index file atomically; returns the number of records"""
+    counts: Counter = Counter()
+    display: Dict[str, Tuple[str, str]] = {}
+
+    for address, place_id in addresses:
+        key = normalize_address(address)
+        if len(key) < 3:
+            continue
+        counts[key] += 1
+        # Prefer a variant that carries a place_id
+        if key not in display or (place_id and not display[key][1]):
+            display[key] = (re.sub(r"\s+", " ", address.replace(FIELD_SEP, " ").strip()), place_id or "")
+
+    keys = sorted(counts)
+    blob = bytearray()
+    offsets = []
+    for key in keys:
+        offsets.append(len(blob))
+        description, place_id = display[key]
+        blob += FIELD_SEP.join([key, description, place_id, str(counts[key])]).encode("utf-8")
+    offsets.append(len(blob))
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.write(blob)
+    os.replace(tmp_path, output_path)
+    return len(keys)
+
+
+class AddressIndex:
+    """Read-only, memory-mapped prefix index over known addresses"""
+
+    def __init__(self, path: str = ADDRESS_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mm = None
+        self._count = 0
+        self._blob_start = 0
+        self._mtime = None
+        self._last_check = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        """Return up to `limit` predictions (Google Places shape) whose address starts with query"""
+        prefix = normalize_address(query)
+        if not prefix or not self._ensure_loaded():
+            return []
+
+        with self._lock:
+            start = self._lower_bound(prefix)
+            matches = []
+            index = start
+            while index < self._count and index - start < ADDRESS_INDEX_SCAN_LIMIT:
+                record = self._record(index)
+                if not record[0].startswith(prefix):
+                    break
+                matches.append(record)
+                index += 1
+
+        # Addresses listed most often first
+        matches.sort(key=lambda r: -r[3])
+        return [self._to_prediction(r, len(prefix)) for r in matches[:limit]]
+
+    def __len__(self) -> int:
+        return self._count if self._ensure_loaded() else 0
+
+    def _ensure_loaded(self) -> bool:
+        if not self.enabled:
+            return False
+
+        now = time.monotonic()
+        if self._mm is not None and now - self._last_check < ADDRESS_INDEX_RELOAD_SECONDS:
+            return True
+
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                return self._mm is not None
+            if self._mm is not None and mtime == self._mtime:
+                return True
+
+            try:
+                with open(self.path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, count = HEADER.unpack_from(mm, 0)
+                if magic != MAGIC:
+                    mm.close()
+                    print(f"Address index {self.path} has an unknown format")
+                    return self._mm is not None
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Address index could not be loaded: {e}")
+                return self._mm is not None
+
+            old = self._mm
+            self._mm = mm
+            self._count = count
+            self._blob_start = HEADER.size + OFFSET.size * (count + 1)
+            self._mtime = mtime
+            if old is not None:
+                old.close()
+            return True
+
+    def _offset(self, index: int) -> int:
+        return OFFSET.unpack_from(self._mm, HEADER.size + OFFSET.size * index)[0]
+
+    def _key(self, index: int) -> str:
+        start = self._blob_start + self._offset(index)
+        end = self._mm.find(FIELD_SEP.encode(), start)
+        return self._mm[start:end].decode("utf-8")
+
+    def _record(self, index: int) -> Tuple[str, str, str, int]:
+        start = self._blob_start + self._offset(index)
+        end = self._blob_start + self._offset(index + 1)
+        key, description, place_id, count = self._mm[start:end].decode("utf-8").split(FIELD_SEP)
+        return key, description, place_id, int(count)
+
+    def _lower_bound(self, prefix: str) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def _to_prediction(record: Tuple[str, str, str, int], matched_length: int) -> Dict:
+        _, description, place_id, _ = record
+        main_text, _, secondary_text = description.partition(",")
+        return {
+            "description": description,
+            "place_id": place_id,
+            "structured_formatting": {
+                "main_text": main_text.strip(),
+                "secondary_text": secondary_text.strip()
+            },
+            "matched_substrings": [{"offset": 0, "length": matched_length}],
+            "types": ["street_address"]
+        }
+
+
+# Global instance
+address_index = AddressIndex()
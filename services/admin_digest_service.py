@@ -0,0 +1,146 @@
+"""
+Admin Digest Service
+Collapses the admin emails sent for each driver step (job accepted, arrived,
+pickup images, transit, delivery images, complete) into one summary email
+per order. Events are buffered in admin_notification_digests; a digest is
+sent ADMIN_DIGEST_WINDOW_SECONDS after its first event, or at once when an
+urgent event arrives. The email outbox worker does the flushing.
+"""
+
+import os
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+from models.admin_digest import admin_digest_model
+
+# How long driver events for one order are collected into one email (0 = email every event)
+ADMIN_DIGEST_WINDOW_SECONDS = float(os.getenv("ADMIN_DIGEST_WINDOW_SECONDS", "120"))
+# Events that flush the order's digest immediately
+ADMIN_DIGEST_URGENT_EVENTS = {
+    event.strip() for event in os.getenv("ADMIN_DIGEST_URGENT_EVENTS", "MARKED_COMPLETE,DELIVERED").split(",")
+    if event.strip()
+}
+
+# Order fields shown in the digest email
+ORDER_SUMMARY_FIELDS = ("pickup_address", "dropoff_address", "distance_km", "reg_number")
+
+HELSINKI_TZ = ZoneInfo("Europe/Helsinki")
+
+
+class AdminDigestService:
+    """Buffers driver events for admins and sends them as per-order digests"""
+
+    def __init__(self, window_seconds: float = None):
+        self.window_seconds = ADMIN_DIGEST_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self._lock = threading.Lock()
+        self._stats = {"events_buffered": 0, "urgent_flushes": 0, "digests_sent": 0,
+                       "events_sent": 0, "flush_failures": 0}
+
+    def accepts(self) -> bool:
+        """True if driver events should be buffered (needs the outbox worker to flush them)"""
+        from services.email_outbox_worker import email_outbox_worker
+        return self.window_seconds > 0 and email_outbox_worker.accepts_mail()
+
+    def add_driver_event(self, order_id: int, kind: str, event: str, driver_name: str, description: str,
+                         order_data: Dict, metadata: Optional[Dict] = None, urgent: Optional[bool] = None) -> bool:
+        """Buffer one driver event for the order's digest; urgent events send the digest now"""
+        from services.email_outbox_worker import email_outbox_worker
+
+        if urgent is None:
+            urgent = event in ADMIN_DIGEST_URGENT_EVENTS
+        now = datetime.now(timezone.utc)
+        admin_digest_model.add_event(
+            order_id,
+            {"kind": kind, "event": event, "description": description, "driver_name": driver_name,
+             "metadata": metadata or {}, "at": now},
+            {field: (order_data or {}).get(field) for field in ORDER_SUMMARY_FIELDS},
+            now + timedelta(seconds=self.window_seconds),
+            flush_now=urgent
+        )
+        self._count("events_buffered")
+        if urgent:
+            self._count("urgent_flushes")
+            email_outbox_worker.wake()
+        return True
+
+    def flush_due(self) -> int:
+        """Send every digest whose window has closed; returns how many were sent (needs an app context)"""
+        sent = 0
+        for digest in admin_digest_model.claim_due():
+            try:
+                ok = self.send_digest(digest)
+            except Exception as e:
+                print(f"[ADMIN DIGEST] Digest for order #{digest['_id']} failed: {e}")
+                ok = False
+            if ok:
+                sent += 1
+                continue
+            # Try again after another window, keeping events that arrived meanwhile
+            self._count("flush_failures")
+            admin_digest_model.restore(
+                digest, datetime.now(timezone.utc) + timedelta(seconds=max(self.window_seconds, 60))
+            )
+        return sent
+
+    def send_digest(self, digest: Dict) -> bool:
+        """One summary email for a claimed digest"""
+        from services.email_service import email_service
+        from services.email_renderer import email_renderer
+
+        order_id = digest["_id"]
+        events = sorted(digest.get("events", []), key=lambda event: event["at"])
+        for event in events:
+            event["time"] = self._local_time(event["at"])
+
+        base_url = os.getenv("BASE_URL", "http://localhost:8000")
+        html_body, text_body = email_renderer.render(
+            "admin_driver_digest",
+            order_id=order_id,
+            order=digest.get("order") or {},
+            events=events,
+            driver_name=events[-1]["driver_name"] if events else "",
+            order_detail_url=f"{base_url}/admin/order/{order_id}"
+        )
+        if len(events) == 1:
+            subject = f"[Levoro] Kuljettajan eteneminen - Tilaus #{order_id} - {events[0]['description']}"
+        else:
+            subject = f"[Levoro] Kuljettajan eteneminen - Tilaus #{order_id} ({len(events)} tapahtumaa)"
+
+        ok = email_service.send_email(
+            subject=subject,
+            recipients=[os.getenv("ADMIN_EMAIL", "support@levoro.fi")],
+            html_body=html_body,
+            text_body=text_body
+        )
+        if ok:
+            self._count("digests_sent")
+            self._count("events_sent", len(events))
+        return ok
+
+    @staticmethod
+    def _local_time(value) -> str:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(HELSINKI_TZ).strftime("%H:%M")
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["window_seconds"] = self.window_seconds
+        # Emails saved by batching: events that did not get an email of their own
+        stats["emails_saved"] = stats["events_sent"] - stats["digests_sent"]
+        try:
+            stats["open_digests"] = admin_digest_model.get_open_count()
+        except Exception as e:
+            stats["open_digests"] = {"error": str(e)}
+        return stats
+
+
+# Global instance
+admin_digest_service = AdminDigestService()
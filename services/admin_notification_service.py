@@ -0,0 +1,152 @@
+"""
+Admin Notification Service
+Badge counts for the admin navigation (new orders, pending reviews, pending
+driver applications).
+
+Each kind is kept as a sorted snapshot of the pending items' created_at times
+in a per-process cache. The models update it when orders, ratings and
+applications change, and the snapshot is reloaded after
+ADMIN_NOTIFICATIONS_CACHE_TTL seconds so changes made in other workers show
+up. Each admin's "last viewed" offset is applied in memory, so a cached badge
+render does not query the database.
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from utils.cache import TTLCache
+
+ADMIN_NOTIFICATIONS_CACHE_TTL = float(os.getenv("ADMIN_NOTIFICATIONS_CACHE_TTL", "30"))
+
+KIND_ORDERS = "new_orders"
+KIND_REVIEWS = "pending_reviews"
+KIND_APPLICATIONS = "pending_applications"
+
+
+def _as_utc(value) -> Optional[datetime]:
+    """
+    Compare-safe timestamp: aware UTC, truncated to MongoDB's millisecond
+    precision so in-memory and reloaded times match
+    """
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    else:
+        value = value.astimezone(timezone.utc)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+class AdminNotificationService:
+    """Cached admin badge counts"""
+
+    def __init__(self):
+        self._snapshots = TTLCache(maxsize=8, ttl=ADMIN_NOTIFICATIONS_CACHE_TTL)
+        self._lock = threading.Lock()
+        self._counters = {"renders": 0, "loads": 0, "updates": 0, "invalidations": 0}
+
+    def _pending_query(self, kind: str):
+        """(model, filter) for a badge kind"""
+        if kind == KIND_ORDERS:
+            from models.order import order_model
+            return order_model, {"status": order_model.STATUS_NEW}
+        if kind == KIND_REVIEWS:
+            from models.rating import rating_model
+            return rating_model, {"status": rating_model.STATUS_PENDING}
+        if kind == KIND_APPLICATIONS:
+            from models.driver_application import driver_application_model
+            return driver_application_model, {"status": "pending"}
+        raise ValueError(f"Unknown notification kind: {kind}")
+
+    def _snapshot(self, kind: str) -> List[datetime]:
+        """Sorted created_at times of pending items, loaded with one query on a miss"""
+        cached = self._snapshots.get(kind)
+        if cached is not None:
+            return cached[1]
+
+        model, filter_dict = self._pending_query(kind)
+        docs = model.collection.find(filter_dict, {"_id": 0, "created_at": 1})
+        # Items without a timestamp still count while no offset applies
+        times = sorted(_as_utc(doc.get("created_at")) or datetime.min.replace(tzinfo=timezone.utc) for doc in docs)
+
+        with self._lock:
+            self._counters["loads"] += 1
+        self._snapshots.set(kind, (time.monotonic(), times))
+        return times
+
+    def get_badges(self, last_viewed: Optional[Dict[str, datetime]] = None) -> Dict[str, int]:
+        """
+        Badge counts, each limited to items created after the admin's last view
+        of that list (last_viewed: {kind: datetime or None})
+        """
+        last_viewed = last_viewed or {}
+        with self._lock:
+            self._counters["renders"] += 1
+
+        badges = {}
+        for kind in (KIND_ORDERS, KIND_REVIEWS, KIND_APPLICATIONS):
+            times = self._snapshot(kind)
+            since = _as_utc(last_viewed.get(kind))
+            badges[kind] = len(times) - bisect_right(times, since) if since else len(times)
+        return badges
+
+    def item_added(self, kind: str, created_at):
+        """A pending item was created in this process"""
+        self._update(kind, created_at, added=True)
+
+    def item_resolved(self, kind: str, created_at):
+        """A pending item was processed or deleted in this process"""
+        self._update(kind, created_at, added=False)
+
+    def _update(self, kind: str, created_at, added: bool):
+        created_at = _as_utc(created_at)
+        with self._lock:
+            cached = self._snapshots.get(kind)
+            if cached is None:
+                return  # Nothing cached yet; the next render loads fresh counts
+            loaded_at, times = cached
+            if created_at is None:
+                self._snapshots.delete(kind)
+                self._counters["invalidations"] += 1
+                return
+
+            # Copy so a render iterating the old list is unaffected
+            times = list(times)
+            if added:
+                insort(times, created_at)
+            else:
+                index = bisect_left(times, created_at)
+                if index == len(times) or times[index] != created_at:
+                    # Snapshot and database disagree; reload it
+                    self._snapshots.delete(kind)
+                    self._counters["invalidations"] += 1
+                    return
+                del times[index]
+            # Keep the load time so other workers' changes still show up within the TTL
+            remaining = loaded_at + ADMIN_NOTIFICATIONS_CACHE_TTL - time.monotonic()
+            self._snapshots.set(kind, (loaded_at, times), ttl=max(remaining, 0.0))
+            self._counters["updates"] += 1
+
+    def invalidate(self, kind: Optional[str] = None):
+        """Drop one snapshot (or all) when the changed item's created_at is unknown"""
+        if kind is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.delete(kind)
+        with self._lock:
+            self._counters["invalidations"] += 1
+
+    def get_stats(self) -> Dict:
+        """Render, snapshot load and update counts"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats["queries_per_render"] = round(stats["loads"] / stats["renders"], 4) if stats["renders"] else 0.0
+        return stats
+
+
+# Global instance
+admin_notification_service = AdminNotificationService()
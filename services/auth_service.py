@@ -3,8 +3,9 @@ Authentication Service
 Handles user authentication, session management, and authorization
 """
 
+import threading
 from typing import Optional, Dict, Tuple
-from flask import session, request
+from flask import session, request, g, has_request_context
 from models.user import user_model
 
 
@@ -13,6 +14,8 @@ class AuthService:
 
     def __init__(self):
         self.user_model = user_model
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "calls": 0, "memo_hits": 0, "cache_hits": 0, "db_lookups": 0}
 
     def login(self, email: str, password: str, remember: bool = False) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
@@ -74,12 +77,54 @@ class AuthService:
         return user is not None, user, error
 
     def get_current_user(self) -> Optional[Dict]:
-        """Get current logged-in user from session"""
+        """
+        Get current logged-in user from session.
+
+        Memoised on flask.g for the rest of the request (until a user write
+        invalidates it) and backed by the user model's cross-request snapshot
+        cache, so repeated calls from context processors, decorators and the
+        route itself cost one lookup at most.
+        """
         user_id = session.get("uid")
         if not user_id:
             return None
 
-        return self.user_model.find_by_id(user_id)
+        if not has_request_context():
+            return self.user_model.find_by_id(user_id)
+
+        memo = g.get("_current_user")
+        generation = self.user_model.cache_generation
+        if memo is not None and memo[0] == user_id and memo[1] == generation:
+            g.user_lookups_saved += 1
+            self._count("calls", "memo_hits")
+            return memo[2]
+
+        if "user_lookups_saved" not in g:
+            g.user_lookups_saved = 0
+            self._count("requests")
+
+        user, from_cache = self.user_model.find_by_id_cached(user_id)
+        if from_cache:
+            g.user_lookups_saved += 1
+        self._count("calls", "cache_hits" if from_cache else "db_lookups")
+
+        g._current_user = (user_id, generation, user)
+        return user
+
+    def _count(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._counters[key] += 1
+
+    def get_stats(self) -> Dict:
+        """get_current_user calls, how they were served and lookups saved per request"""
+        with self._lock:
+            stats = dict(self._counters)
+        saved = stats["memo_hits"] + stats["cache_hits"]
+        stats["lookups_saved"] = saved
+        stats["saved_per_request"] = round(saved / stats["requests"], 2) if stats["requests"] else 0.0
+        stats["user_cache"] = self.user_model.get_cache_stats()
+        return stats
 
     def is_authenticated(self) -> bool:
         """Check if user is authenticated"""
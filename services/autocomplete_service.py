@@ -0,0 +1,238 @@
+"""
+Autocomplete Service
+Server-side cache and request coalescing for address autocomplete
+(Google Places Autocomplete behind /api/places_autocomplete).
+Keystrokes are debounced by the client; the server only drops a query when a
+newer one from the same session is already pending. Per-process only, like
+utils/rate_limiter.
+"""
+
+import os
+import re
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from services.maps_client import maps_client
+from services.address_index import address_index
+
+GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY", "")
+AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "5000"))
+AUTOCOMPLETE_CACHE_TTL = float(os.getenv("AUTOCOMPLETE_CACHE_TTL", "86400"))
+# How long a request waits for an identical in-flight upstream call
+AUTOCOMPLETE_INFLIGHT_WAIT_SECONDS = float(os.getenv("AUTOCOMPLETE_INFLIGHT_WAIT_SECONDS", "5"))
+
+
+class AutocompleteSuperseded(Exception):
+    """A newer query from the same session was pending before this one went upstream"""
+
+
+class PrefixCache:
+    """
+    LRU/TTL cache of predictions keyed by (normalised query, scope).
+
+    Keys are also kept in a sorted list per scope, so a query can be served
+    from an entry cached for a longer string that starts with it (every
+    prediction for "mannerheimintie 12" is also a match for "mannerheimintie 1").
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[Dict], float]]" = OrderedDict()
+        self._sorted_keys: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, query: str, scope: str) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """Return (predictions, match_type) where match_type is 'exact' or 'prefix'"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((query, scope))
+            if entry and entry[1] > now:
+                self._entries.move_to_end((query, scope))
+                return entry[0], "exact"
+
+            keys = self._sorted_keys.get(scope, [])
+            index = bisect.bisect_right(keys, query)
+            while index < len(keys) and keys[index].startswith(query):
+                longer = self._entries.get((keys[index], scope))
+                if longer and longer[1] > now and longer[0]:
+                    self._entries.move_to_end((keys[index], scope))
+                    return longer[0], "prefix"
+                index += 1
+
+        return None, None
+
+    def set(self, query: str, scope: str, predictions: List[Dict]):
+        with self._lock:
+            key = (query, scope)
+            if key not in self._entries:
+                bisect.insort(self._sorted_keys.setdefault(scope, []), query)
+            self._entries[key] = (predictions, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                (old_query, old_scope), _ = self._entries.popitem(last=False)
+                keys = self._sorted_keys.get(old_scope, [])
+                index = bisect.bisect_left(keys, old_query)
+                if index < len(keys) and keys[index] == old_query:
+                    keys.pop(index)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class AutocompleteService:
+    """Service for address autocomplete with caching and request coalescing"""
+
+    def __init__(self):
+        self.cache = PrefixCache(AUTOCOMPLETE_CACHE_SIZE, AUTOCOMPLETE_CACHE_TTL)
+        self._lock = threading.Lock()
+        self._session_seq: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[str, str], Dict] = {}
+        self._counters = {
+            "requests": 0,
+            "cache_hits": 0,
+            "prefix_hits": 0,
+            "local_hits": 0,
+            "coalesced": 0,
+            "superseded": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0
+        }
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalise query text for cache keys"""
+        return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+    def get_predictions(self, query: str, scope: str = "fi", session_key: Optional[str] = None) -> Tuple[List[Dict], str]:
+        """
+        Get autocomplete predictions for a query
+
+        Returns:
+            Tuple[List[Dict], str]: (predictions, source) where source is
+            'cache', 'local', 'google' or 'coalesced'
+
+        Raises:
+            AutocompleteSuperseded: a newer query from the same session is already pending
+            ValueError: Google returned an error status
+            requests.RequestException: upstream HTTP failure
+        """
+        normalized = self.normalize_query(query)
+        self._count("requests")
+        seq = self._register_session(session_key) if session_key else None
+
+        predictions = self._from_cache(normalized, scope)
+        if predictions is not None:
+            return predictions, "cache"
+
+        # Optional local index of known Finnish addresses; Google only on a miss
+        if scope == "fi" and address_index.enabled:
+            predictions = address_index.search(normalized)
+            if predictions:
+                self._count("local_hits")
+                return predictions, "local"
+
+        self._check_superseded(session_key, seq, normalized)
+        return self._fetch_coalesced(query, normalized, scope, session_key, seq)
+
+    def get_stats(self) -> Dict:
+        """Cache hit rate and upstream call counts"""
+        with self._lock:
+            stats = dict(self._counters)
+        served_from_cache = stats["cache_hits"] + stats["prefix_hits"] + stats["local_hits"]
+        stats["cache_size"] = len(self.cache)
+        stats["local_index_records"] = len(address_index)
+        stats["hit_rate"] = round(served_from_cache / stats["requests"], 4) if stats["requests"] else 0.0
+        return stats
+
+    def _from_cache(self, normalized: str, scope: str) -> Optional[List[Dict]]:
+        predictions, match_type = self.cache.get(normalized, scope)
+        if predictions is None:
+            return None
+        self._count("cache_hits" if match_type == "exact" else "prefix_hits")
+        return predictions
+
+    def _register_session(self, session_key: str) -> int:
+        with self._lock:
+            seq = self._session_seq.get(session_key, 0) + 1
+            self._session_seq[session_key] = seq
+            # Keep the table bounded; stale sessions only lose supersede tracking
+            if len(self._session_seq) > AUTOCOMPLETE_CACHE_SIZE:
+                self._session_seq.pop(next(iter(self._session_seq)))
+            return seq
+
+    def _check_superseded(self, session_key: Optional[str], seq: Optional[int], normalized: str):
+        """Raise if a newer query from the same session is pending (never waits for one)"""
+        if not session_key:
+            return
+        with self._lock:
+            superseded = self._session_seq.get(session_key, seq) != seq
+        if superseded:
+            self._count("superseded")
+            raise AutocompleteSuperseded(normalized)
+
+    def _fetch_coalesced(self, query: str, normalized: str, scope: str,
+                         session_key: Optional[str] = None, seq: Optional[int] = None) -> Tuple[List[Dict], str]:
+        """Single upstream call per (query, scope); concurrent duplicates wait for it"""
+        key = (normalized, scope)
+        with self._lock:
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = {"event": threading.Event(), "predictions": None}
+                self._inflight[key] = inflight
+
+        if not owner:
+            self._count("coalesced")
+            if inflight["event"].wait(AUTOCOMPLETE_INFLIGHT_WAIT_SECONDS) and inflight["predictions"] is not None:
+                return inflight["predictions"], "coalesced"
+            # The shared call failed or timed out; only retry it if the user has not typed on
+            self._check_superseded(session_key, seq, normalized)
+            return self._fetch_upstream(query, normalized, scope), "google"
+
+        try:
+            predictions = self._fetch_upstream(query, normalized, scope)
+            inflight["predictions"] = predictions
+            return predictions, "google"
+        finally:
+            inflight["event"].set()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch_upstream(self, query: str, normalized: str, scope: str) -> List[Dict]:
+        params = {
+            "input": query,
+            "key": GOOGLE_PLACES_API_KEY,
+            "language": "fi",
+            "types": "address",  # Only address type to avoid API conflicts
+        }
+        if scope == "fi":
+            params["components"] = "country:FI"  # Restrict to Finland
+
+        self._count("upstream_calls")
+        try:
+            data = maps_client.get("autocomplete", params)
+        except Exception:
+            self._count("upstream_errors")
+            raise
+
+        if data.get("status") != "OK":
+            self._count("upstream_errors")
+            raise ValueError(f"Google Places API error: {data.get('status')} - {data.get('error_message', 'Unknown error')}")
+
+        predictions = data.get("predictions", [])
+
+        self.cache.set(normalized, scope, predictions)
+        return predictions
+
+    def _count(self, field: str):
+        with self._lock:
+            self._counters[field] += 1
+
+
+# Global instance
+autocomplete_service = AutocompleteService()
@@ -177,10 +177,12 @@ class DiscountService:
         pickup_city: str = "",
         dropoff_city: str = "",
         promo_code: Optional[str] = None,
-        is_first_order: bool = False
+        is_first_order: bool = False,
+        rules=None
     ) -> Dict:
         """
         Apply all applicable discounts and return pricing breakdown.
+        rules: optional DiscountModel.get_rules() snapshot shared by a batch.
         
         Returns:
             {
@@ -215,7 +217,8 @@ class DiscountService:
             pickup_city=pickup_city,
             dropoff_city=dropoff_city,
             promo_code=promo_code,
-            is_first_order=is_first_order
+            is_first_order=is_first_order,
+            rules=rules
         )
 
         if not applicable:
@@ -73,6 +73,7 @@ class DriverService:
 
         if not success:
             return False, "Tilauksen ottaminen epäonnistui"
+        order_model.invalidate_driver_stats()
 
         # Send admin notification about driver accepting job
         try:
@@ -374,16 +375,12 @@ class DriverService:
 
     def get_driver_statistics(self, driver_id: int) -> Dict:
         """Get statistics for a specific driver"""
-        all_orders = order_model.get_driver_orders(driver_id, limit=1000)
-
-        total_jobs = len(all_orders)
-        completed_jobs = len([o for o in all_orders if o.get("status") == order_model.STATUS_DELIVERED])
-        active_jobs = len(order_model.get_active_driver_orders(driver_id))
+        stats = order_model.get_driver_job_stats().get(int(driver_id), {})
 
         return {
-            "total_jobs": total_jobs,
-            "completed_jobs": completed_jobs,
-            "active_jobs": active_jobs
+            "total_jobs": stats.get("total_jobs", 0),
+            "completed_jobs": stats.get("completed_jobs", 0),
+            "active_jobs": stats.get("active_jobs", 0)
         }
 
     def get_all_drivers(self) -> List[Dict]:
@@ -393,13 +390,16 @@ class DriverService:
     def get_driver_performance_data(self) -> List[Dict]:
         """Get performance data for all drivers (admin view)"""
         drivers = self.get_all_drivers()
+        all_stats = order_model.get_driver_job_stats()
         performance_data = []
 
         for driver in drivers:
-            stats = self.get_driver_statistics(driver["id"])
+            stats = all_stats.get(int(driver["id"]), {})
             performance_data.append({
                 **driver,
-                **stats
+                "total_jobs": stats.get("total_jobs", 0),
+                "completed_jobs": stats.get("completed_jobs", 0),
+                "active_jobs": stats.get("active_jobs", 0)
             })
 
         return performance_data
@@ -0,0 +1,161 @@
+"""
+Email Outbox Worker
+Background thread (one per worker process) that drains the email_outbox
+collection: claims due messages in batches, sends each batch over one SMTP
+connection and records delivery status. Request handlers only enqueue.
+"""
+
+import os
+import socket
+import threading
+from typing import Dict, Optional
+
+from models.email_outbox import email_outbox_model
+
+# Queue emails instead of sending them inside the request (false: send synchronously)
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+# Messages claimed and sent per SMTP connection
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+# Idle poll interval; enqueues in this process wake the worker immediately
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+
+
+class EmailOutboxWorker:
+    """Drains the email outbox in a daemon thread"""
+
+    def __init__(self):
+        self.app = None
+        self.autostart = False
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "batches": 0}
+        self._last_error: Optional[str] = None
+
+    @property
+    def worker_id(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def init_app(self, app, start: bool = EMAIL_OUTBOX_ENABLED):
+        """Bind to the Flask app (sending needs its mail config); start the thread if start"""
+        self.app = app
+        self.autostart = start
+        if start:
+            self.ensure_running()
+
+    def accepts_mail(self) -> bool:
+        """True if EmailService.send_email should enqueue rather than send"""
+        return EMAIL_OUTBOX_ENABLED and self.app is not None
+
+    def enqueue(self, **message) -> Dict:
+        """Store a message in the outbox and wake this process's worker"""
+        doc = email_outbox_model.enqueue(**message)
+        self._count("enqueued")
+        if self.autostart:
+            self.ensure_running()
+        self._wake.set()
+        return doc
+
+    def ensure_running(self):
+        """Start the thread if this process has none (also after a fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread_pid = pid
+            self._thread.start()
+            print(f"[EMAIL OUTBOX] Worker started ({self.worker_id})")
+
+    def wake(self):
+        """Run the next loop now instead of after the poll interval"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the thread after its current batch"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self) -> int:
+        """Claim and send one batch; returns the number of messages handled"""
+        from services.email_service import email_service
+
+        batch = email_outbox_model.claim_batch(self.worker_id, EMAIL_OUTBOX_BATCH_SIZE)
+        if not batch:
+            return 0
+
+        with self.app.app_context():
+            errors = email_service.deliver_batch(batch)
+
+        for message, error in zip(batch, errors):
+            if error is None:
+                email_outbox_model.mark_sent(message["_id"])
+                self._count("sent")
+                continue
+            status = email_outbox_model.mark_failed(message, error)
+            self._count("failed" if status == email_outbox_model.STATUS_FAILED else "retried")
+            self._last_error = error
+            print(f"[EMAIL OUTBOX] Delivery to {message.get('recipients')} failed "
+                  f"(attempt {message.get('attempts')}, now {status}): {error}")
+        self._count("batches")
+        return len(batch)
+
+    def drain(self, max_batches: int = 100) -> int:
+        """Send everything that is due now (scripts, tests); returns messages handled"""
+        handled = 0
+        for _ in range(max_batches):
+            count = self.run_once()
+            handled += count
+            if count < EMAIL_OUTBOX_BATCH_SIZE:
+                break
+        return handled
+
+    def _run(self):
+        from services.email_service import email_service
+        from services.admin_digest_service import admin_digest_service
+
+        while not self._stopping.is_set():
+            try:
+                # Due admin digests go into the outbox first and out with this batch
+                with self.app.app_context():
+                    admin_digest_service.flush_due()
+                handled = self.run_once()
+            except Exception as e:
+                # Database or app trouble: back off for one poll interval
+                self._last_error = str(e)
+                print(f"[EMAIL OUTBOX] Worker error: {e}")
+                handled = 0
+            if handled < EMAIL_OUTBOX_BATCH_SIZE:
+                self._wake.wait(EMAIL_OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+                # Queue drained: quit SMTP sessions before the server times them out
+                email_service.smtp_pool.close_idle()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def get_stats(self) -> Dict:
+        """Per-process delivery counters plus queue depth"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["running"] = self._thread is not None and self._thread.is_alive()
+        stats["last_error"] = self._last_error
+        try:
+            stats["queue"] = email_outbox_model.get_queue_stats()
+        except Exception as e:
+            stats["queue"] = {"error": str(e)}
+        return stats
+
+
+# Global instance
+email_outbox_worker = EmailOutboxWorker()
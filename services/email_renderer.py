@@ -0,0 +1,114 @@
+"""
+Email Renderer
+Renders the emails in templates/emails from templates compiled once at
+startup. The plain-text part is rendered from the matching
+templates/emails/text/<name>.txt with the same context instead of being
+scraped out of the HTML afterwards.
+"""
+
+import re
+import time
+import html
+import threading
+from typing import Dict, Tuple
+from flask import current_app
+from jinja2 import TemplateNotFound
+
+HTML_TEMPLATE = "emails/{}.html"
+TEXT_TEMPLATE = "emails/text/{}.txt"
+
+_INVISIBLE_BLOCKS = re.compile(r"<(head|style|script)\b.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+_LINE_BREAKS = re.compile(r"<br\s*/?>|</(p|div|tr|h[1-6]|ul|ol|table)\s*>", re.IGNORECASE)
+_LIST_ITEMS = re.compile(r"<li\b[^>]*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n(\s*\n)+")
+
+
+def html_to_text(html_content: str) -> str:
+    """Readable text from HTML, for emails without a text template"""
+    text = _INVISIBLE_BLOCKS.sub("", html_content)
+    text = _LIST_ITEMS.sub("\n- ", text)
+    text = _LINE_BREAKS.sub("\n", text)
+    text = html.unescape(_TAGS.sub("", text))
+    text = "\n".join(line.strip() for line in _SPACES.sub(" ", text).split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def tidy_text(text: str) -> str:
+    """Trim the blank lines template tags leave behind"""
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip() + "\n"
+
+
+class EmailRenderer:
+    """Compiled email templates and their text counterparts"""
+
+    def __init__(self):
+        self.env = None
+        self._templates: Dict[str, object] = {}
+        self._missing = set()
+        self._lock = threading.Lock()
+        self._stats = {"renders": 0, "text_fallbacks": 0, "render_seconds": 0.0}
+
+    def init_app(self, app) -> int:
+        """Compile every email template now rather than on first send; returns how many"""
+        self.env = app.jinja_env
+        with self._lock:
+            self._templates.clear()
+            self._missing.clear()
+        names = self.env.list_templates(
+            filter_func=lambda name: name.startswith("emails/") and name.endswith((".html", ".txt"))
+        )
+        for name in names:
+            self._template(name)
+        return len(self._templates)
+
+    def render(self, name: str, /, **context) -> Tuple[str, str]:
+        """(html, text) for templates/emails/<name>.html and text/<name>.txt"""
+        started = time.perf_counter()
+        html_body = self._template(HTML_TEMPLATE.format(name)).render(**context)
+        text_template = self._template(TEXT_TEMPLATE.format(name), required=False)
+        if text_template is not None:
+            text_body = tidy_text(text_template.render(**context))
+        else:
+            text_body = html_to_text(html_body)
+        with self._lock:
+            self._stats["renders"] += 1
+            self._stats["render_seconds"] += time.perf_counter() - started
+            if text_template is None:
+                self._stats["text_fallbacks"] += 1
+        return html_body, text_body
+
+    def _template(self, name: str, required: bool = True):
+        env = self.env or current_app.jinja_env
+        # With auto_reload (development) always ask Jinja so edited templates are picked up
+        cached = not env.auto_reload
+        template = self._templates.get(name) if cached else None
+        if template is not None:
+            return template
+        if not required and cached and name in self._missing:
+            return None
+        try:
+            template = env.get_template(name)
+        except TemplateNotFound:
+            if required:
+                raise
+            with self._lock:
+                self._missing.add(name)
+            return None
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["compiled"] = len(self._templates)
+        renders = stats.pop("render_seconds")
+        stats["avg_render_ms"] = round(renders / stats["renders"] * 1000, 3) if stats["renders"] else None
+        return stats
+
+
+# Global instance
+email_renderer = EmailRenderer()
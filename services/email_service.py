@@ -5,8 +5,29 @@ Handles email sending functionality using Zoho SMTP
 
 import os
 from typing import Dict, Optional, List
-from flask import render_template, current_app
+from flask import current_app
 from flask_mail import Mail, Message
+from services.smtp_pool import SMTPConnectionPool
+from services.email_renderer import email_renderer, html_to_text
+
+# Admin notification texts for driver steps
+DRIVER_ACTION_DESCRIPTIONS = {
+    "DRIVER_ARRIVED": "Kuljettaja on saapunut noutopaikalle",
+    "PICKUP_IMAGES_ADDED": "Kuljettaja on lisännyt noutokuvat",
+    "IN_TRANSIT": "Kuljettaja on aloittanut kuljetuksen",
+    "DELIVERY_ARRIVED": "Kuljettaja on saapunut toimituspaikalle",
+    "DELIVERY_IMAGES_ADDED": "Kuljettaja on lisännyt toimituskuvat",
+    "DELIVERED": "Kuljettaja on merkinnyt toimituksen valmiiksi"
+}
+DRIVER_PROGRESS_DESCRIPTIONS = {
+    "JOB_ACCEPTED": "{driver} on ottanut työn vastaan",
+    "ARRIVED_PICKUP": "{driver} on saapunut noutopaikalle",
+    "PICKUP_IMAGES_COMPLETE": "{driver} on lisännyt {count} noutokuvaa",
+    "STARTED_TRANSIT": "{driver} on aloittanut kuljetuksen",
+    "ARRIVED_DELIVERY": "{driver} on saapunut toimituspaikalle",
+    "DELIVERY_IMAGES_COMPLETE": "{driver} on lisännyt {count} toimituskuvaa",
+    "MARKED_COMPLETE": "{driver} on merkinnyt toimituksen valmiiksi"
+}
 
 
 class EmailService:
@@ -14,6 +35,8 @@ class EmailService:
 
     def __init__(self, mail_instance: Mail = None):
         self.mail = mail_instance
+        # Open SMTP sessions reused across sends (per worker process)
+        self.smtp_pool = SMTPConnectionPool(mail_instance)
         self.dev_mode = os.getenv('FLASK_ENV', 'production') == 'development'
 
     def configure_mail(self, app):
@@ -32,12 +55,38 @@ class EmailService:
             self.mail = Mail(app)
         else:
             self.mail.init_app(app)
+        self.smtp_pool.mail = self.mail
 
         return self.mail
 
     def send_email(self, subject: str, recipients: List[str], html_body: str,
                    text_body: str = None, sender: str = None, reply_to: str = None) -> bool:
         """
+        Queue an email in the outbox; the outbox worker sends it outside the request.
+        Sends synchronously when the outbox is disabled or the enqueue fails.
+
+        Returns:
+            bool: True if the email was queued or sent, False otherwise
+        """
+        from services.email_outbox_worker import email_outbox_worker
+
+        if email_outbox_worker.accepts_mail():
+            if not recipients:
+                print(f"[EMAIL] Not queued, no recipients: {subject}")
+                return False
+            try:
+                email_outbox_worker.enqueue(subject=subject, recipients=recipients, html_body=html_body,
+                                            text_body=text_body, sender=sender, reply_to=reply_to)
+                print(f"[EMAIL] Queued '{subject}' to {recipients}")
+                return True
+            except Exception as e:
+                print(f"[EMAIL] Outbox unavailable, sending directly: {e}")
+
+        return self.send_now(subject, recipients, html_body, text_body, sender, reply_to)
+
+    def send_now(self, subject: str, recipients: List[str], html_body: str,
+                 text_body: str = None, sender: str = None, reply_to: str = None) -> bool:
+        """
         Send an email using Flask-Mail and Zoho SMTP
         In development mode, saves emails as HTML files instead of sending
 
@@ -97,7 +146,7 @@ class EmailService:
             )
 
             print(f"   [SEND] Attempting to send via Zoho SMTP...")
-            self.mail.send(msg)
+            self.smtp_pool.send(msg)
 
             success_msg = f"[SUCCESS] Email sent successfully to {recipients}"
             current_app.logger.info(success_msg)
@@ -121,16 +170,45 @@ class EmailService:
 
             return False
 
+    def deliver_batch(self, messages: List[Dict]) -> List[Optional[str]]:
+        """
+        Send outbox messages back to back on one pooled SMTP session (needs an app context).
+        Returns None or an error string per message, in order.
+        """
+        if os.getenv('FLASK_ENV', 'production').lower() == 'development':
+            return [
+                None if self._save_email_to_file(m["subject"], m["recipients"], m["html_body"],
+                                                 m.get("sender"), m.get("reply_to"))
+                else "Saving email to file failed"
+                for m in messages
+            ]
+        if not self.mail:
+            return ["Mail instance not configured"] * len(messages)
+
+        results = self.smtp_pool.send_many([
+            Message(
+                subject=m["subject"],
+                recipients=m["recipients"],
+                html=m["html_body"],
+                body=m.get("text_body") or self._html_to_text(m["html_body"]),
+                sender=m.get("sender"),
+                reply_to=m.get("reply_to")
+            )
+            for m in messages
+        ])
+        return [None if error is None else str(error) for error in results]
+
     def send_registration_email(self, user_email: str, user_name: str) -> bool:
         """Send welcome email after user registration"""
         try:
-            html_body = render_template('emails/registration.html',
-                                      user_name=user_name)
+            html_body, text_body = email_renderer.render('registration',
+                                                         user_name=user_name)
 
             return self.send_email(
                 subject="Tervetuloa Levoroon - Rekisteröinti vastaanotettu",
                 recipients=[user_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send registration email: {str(e)}")
@@ -139,13 +217,14 @@ class EmailService:
     def send_account_approved_email(self, user_email: str, user_name: str) -> bool:
         """Send email when user account is approved"""
         try:
-            html_body = render_template('emails/account_approved.html',
-                                      user_name=user_name)
+            html_body, text_body = email_renderer.render('account_approved',
+                                                         user_name=user_name)
 
             return self.send_email(
                 subject="Tilisi on hyväksytty - Tervetuloa Levoroon!",
                 recipients=[user_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send account approved email: {str(e)}")
@@ -158,15 +237,16 @@ class EmailService:
         print(f"   Reset URL: {reset_url}")
         
         try:
-            html_body = render_template('emails/password_reset.html',
-                                      user_name=user_name,
-                                      reset_url=reset_url,
-                                      token=token)
+            html_body, text_body = email_renderer.render('password_reset',
+                                                         user_name=user_name,
+                                                         reset_url=reset_url,
+                                                         token=token)
 
             return self.send_email(
                 subject="Salasanan palautus - Levoro",
                 recipients=[user_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             error_msg = f"Failed to send password reset email: {str(e)}"
@@ -197,15 +277,16 @@ class EmailService:
             }
 
             print(f"   [RENDER] Rendering order confirmation template...")
-            html_body = render_template('emails/order_created.html',
-                                      user_name=user_name,
-                                      order=order_info)
+            html_body, text_body = email_renderer.render('order_created',
+                                                         user_name=user_name,
+                                                         order=order_info)
 
             print(f"   [SEND] Sending order confirmation email...")
             return self.send_email(
                 subject=f"Tilausvahvistus #{order_data.get('id')} - Levoro",
                 recipients=[user_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             error_msg = f"Failed to send order created email: {str(e)}"
@@ -250,17 +331,18 @@ class EmailService:
             }
 
             print(f"   📝 Rendering status update template...")
-            html_body = render_template('emails/status_update.html',
-                                      user_name=user_name,
-                                      order=order_info,
-                                      new_status=new_status,
-                                      driver_name=driver_name)
+            html_body, text_body = email_renderer.render('status_update',
+                                                         user_name=user_name,
+                                                         order=order_info,
+                                                         new_status=new_status,
+                                                         driver_name=driver_name)
 
             print(f"   [SEND] Sending status update email...")
             return self.send_email(
                 subject=f"Tilaus #{order_id} - {status_finnish}",
                 recipients=[user_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             error_msg = f"Failed to send status update email: {str(e)}"
@@ -284,16 +366,17 @@ class EmailService:
             admin_url = f"{base_url}/admin"
             order_detail_url = f"{base_url}/admin/order/{order_data.get('id')}"
 
-            html_body = render_template('emails/admin_new_order.html',
-                                      order=order_data,
-                                      customer=customer_data,
-                                      admin_url=admin_url,
-                                      order_detail_url=order_detail_url)
+            html_body, text_body = email_renderer.render('admin_new_order',
+                                                         order=order_data,
+                                                         customer=customer_data,
+                                                         admin_url=admin_url,
+                                                         order_detail_url=order_detail_url)
 
             return self.send_email(
                 subject=f"[Levoro] Uusi tilaus #{order_data.get('id')} - Vahvistus tarvitaan",
                 recipients=[admin_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send admin order notification: {str(e)}")
@@ -325,18 +408,19 @@ class EmailService:
                     'driver_count': 'N/A'
                 }
 
-            html_body = render_template('emails/admin_new_user.html',
-                                      user=user_data,
-                                      admin_users_url=admin_users_url,
-                                      user_detail_url=user_detail_url,
-                                      total_users=stats.get('total_users'),
-                                      customer_count=stats.get('customer_count'),
-                                      driver_count=stats.get('driver_count'))
+            html_body, text_body = email_renderer.render('admin_new_user',
+                                                         user=user_data,
+                                                         admin_users_url=admin_users_url,
+                                                         user_detail_url=user_detail_url,
+                                                         total_users=stats.get('total_users'),
+                                                         customer_count=stats.get('customer_count'),
+                                                         driver_count=stats.get('driver_count'))
 
             return self.send_email(
                 subject=f"[Levoro] Uusi käyttäjä rekisteröitynyt: {user_data.get('name')}",
                 recipients=[admin_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send admin user notification: {str(e)}")
@@ -348,13 +432,14 @@ class EmailService:
         try:
             print(f"[EMAIL] Sending driver application confirmation to {email}")
 
-            html_body = render_template('emails/driver_application_confirmation.html',
-                                      name=name)
+            html_body, text_body = email_renderer.render('driver_application_confirmation',
+                                                         name=name)
 
             return self.send_email(
                 subject="Kuljettajahakemus vastaanotettu - Levoro",
                 recipients=[email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send driver application confirmation: {str(e)}")
@@ -374,15 +459,16 @@ class EmailService:
             base_url = os.getenv('BASE_URL', 'http://localhost:8000')
             application_url = f"{base_url}/admin/driver-applications/{application['id']}"
 
-            html_body = render_template('emails/admin_driver_application.html',
-                                      application=application,
-                                      applicant_name=applicant_name,
-                                      application_url=application_url)
+            html_body, text_body = email_renderer.render('admin_driver_application',
+                                                         application=application,
+                                                         applicant_name=applicant_name,
+                                                         application_url=application_url)
 
             return self.send_email(
                 subject=f"[Levoro] Uusi kuljettajahakemus: {applicant_name}",
                 recipients=[admin_email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send admin driver application notification: {str(e)}")
@@ -394,15 +480,16 @@ class EmailService:
         try:
             print(f"[EMAIL] Sending driver application approval to {email}")
 
-            html_body = render_template('emails/driver_application_approved.html',
-                                      name=name,
-                                      email=email,
-                                      temp_password=temp_password)
+            html_body, text_body = email_renderer.render('driver_application_approved',
+                                                         name=name,
+                                                         email=email,
+                                                         temp_password=temp_password)
 
             return self.send_email(
                 subject="Kuljettajahakemus hyväksytty - Tervetuloa Levorolle!",
                 recipients=[email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send driver application approval: {str(e)}")
@@ -543,21 +630,26 @@ class EmailService:
         try:
             print(f"[EMAIL] Sending driver application denial to {email}")
 
-            html_body = render_template('emails/driver_application_denied.html',
-                                      name=name)
+            html_body, text_body = email_renderer.render('driver_application_denied',
+                                                         name=name)
 
             return self.send_email(
                 subject="Kuljettajahakemus - Levoro",
                 recipients=[email],
-                html_body=html_body
+                html_body=html_body,
+                text_body=text_body
             )
         except Exception as e:
             current_app.logger.error(f"Failed to send driver application denial: {str(e)}")
             print(f"   [ERROR] Failed to send driver application denial: {str(e)}")
             return False
 
-    def send_admin_driver_action_notification(self, order_id: int, driver_name: str, action: str, order_data: Dict) -> bool:
-        """Send notification to admin when driver performs an action"""
+    def send_admin_driver_action_notification(self, order_id: int, driver_name: str, action: str, order_data: Dict,
+                                              urgent: Optional[bool] = None) -> bool:
+        """
+        Send notification to admin when driver performs an action.
+        Buffered into the order's admin digest; urgent (default: ADMIN_DIGEST_URGENT_EVENTS) sends it now.
+        """
         admin_email = os.getenv("ADMIN_EMAIL", "support@levoro.fi")
 
         print(f"[ADMIN] DRIVER ACTION NOTIFICATION:")
@@ -567,17 +659,15 @@ class EmailService:
         print(f"   Action: {action}")
 
         try:
-            # Map action to Finnish description
-            action_descriptions = {
-                "DRIVER_ARRIVED": "Kuljettaja on saapunut noutopaikalle",
-                "PICKUP_IMAGES_ADDED": "Kuljettaja on lisännyt noutokuvat",
-                "IN_TRANSIT": "Kuljettaja on aloittanut kuljetuksen",
-                "DELIVERY_ARRIVED": "Kuljettaja on saapunut toimituspaikalle",
-                "DELIVERY_IMAGES_ADDED": "Kuljettaja on lisännyt toimituskuvat",
-                "DELIVERED": "Kuljettaja on merkinnyt toimituksen valmiiksi"
-            }
+            from services.admin_digest_service import admin_digest_service
 
-            action_finnish = action_descriptions.get(action, action)
+            action_finnish = DRIVER_ACTION_DESCRIPTIONS.get(action, action)
+
+            # Collected into one digest email per order unless urgent or digests are off
+            if admin_digest_service.accepts():
+                return admin_digest_service.add_driver_event(
+                    order_id, "action", action, driver_name, action_finnish, order_data, urgent=urgent
+                )
 
             base_url = os.getenv("BASE_URL", "http://localhost:8000")
             order_detail_url = f"{base_url}/admin/order/{order_id}"
@@ -646,10 +736,12 @@ class EmailService:
             print(f"   [ERROR] Failed to send admin driver action notification: {str(e)}")
             return False
 
-    def send_admin_driver_progress_notification(self, order_id: int, driver_name: str, progress_event: str, order_data: Dict, metadata: Dict = None) -> bool:
+    def send_admin_driver_progress_notification(self, order_id: int, driver_name: str, progress_event: str, order_data: Dict, metadata: Dict = None,
+                                                urgent: Optional[bool] = None) -> bool:
         """
         Send notification to admin about driver progress updates
         Uses dev email mock system when FLASK_ENV=development
+        Buffered into the order's admin digest (services/admin_digest_service.py)
 
         Args:
             order_id: Order ID
@@ -658,6 +750,7 @@ class EmailService:
                           ARRIVED_DELIVERY, DELIVERY_IMAGES_COMPLETE, MARKED_COMPLETE
             order_data: Order information dict
             metadata: Optional metadata (e.g., {'count': 5} for image counts)
+            urgent: Send the order's digest now (default: event in ADMIN_DIGEST_URGENT_EVENTS)
 
         Returns:
             bool: True if email sent/saved successfully
@@ -673,18 +766,20 @@ class EmailService:
             print(f"   Metadata: {metadata}")
 
         try:
-            # Map progress events to Finnish descriptions
-            event_descriptions = {
-                "JOB_ACCEPTED": f"{driver_name} on ottanut työn vastaan",
-                "ARRIVED_PICKUP": f"{driver_name} on saapunut noutopaikalle",
-                "PICKUP_IMAGES_COMPLETE": f"{driver_name} on lisännyt {metadata.get('count', 0) if metadata else 0} noutokuvaa",
-                "STARTED_TRANSIT": f"{driver_name} on aloittanut kuljetuksen",
-                "ARRIVED_DELIVERY": f"{driver_name} on saapunut toimituspaikalle",
-                "DELIVERY_IMAGES_COMPLETE": f"{driver_name} on lisännyt {metadata.get('count', 0) if metadata else 0} toimituskuvaa",
-                "MARKED_COMPLETE": f"{driver_name} on merkinnyt toimituksen valmiiksi"
-            }
+            from services.admin_digest_service import admin_digest_service
+
+            description = DRIVER_PROGRESS_DESCRIPTIONS.get(progress_event)
+            event_finnish = description.format(
+                driver=driver_name, count=metadata.get('count', 0) if metadata else 0
+            ) if description else progress_event
+
+            # Collected into one digest email per order unless urgent or digests are off
+            if admin_digest_service.accepts():
+                return admin_digest_service.add_driver_event(
+                    order_id, "progress", progress_event, driver_name, event_finnish, order_data,
+                    metadata=metadata, urgent=urgent
+                )
 
-            event_finnish = event_descriptions.get(progress_event, progress_event)
             base_url = os.getenv("BASE_URL", "http://localhost:8000")
             order_detail_url = f"{base_url}/admin/order/{order_id}"
 
@@ -1027,20 +1122,9 @@ class EmailService:
             print(f"   ⚠️ [DEV] Failed to update email index: {str(e)}")
 
     def _html_to_text(self, html_content: str) -> str:
-        """Convert HTML content to plain text (simple implementation)"""
+        """Plain-text part for emails built without a text template"""
         try:
-            # Simple HTML to text conversion
-            import re
-            # Remove HTML tags
-            text = re.sub('<[^<]+?>', '', html_content)
-            # Replace HTML entities
-            text = text.replace('&nbsp;', ' ')
-            text = text.replace('&lt;', '<')
-            text = text.replace('&gt;', '>')
-            text = text.replace('&amp;', '&')
-            # Clean up whitespace
-            text = re.sub(r'\s+', ' ', text)
-            return text.strip()
+            return html_to_text(html_content)
         except Exception:
             return html_content
 
@@ -125,6 +125,27 @@ class GCSService:
             print(error_msg)
             return None, error_msg
 
+    def upload_bytes(self, data: bytes, destination_blob_name: str,
+                     content_type: str = 'image/jpeg') -> Tuple[Optional[str], Optional[str]]:
+        """
+        Upload an in-memory file (e.g. an encoded image buffer) to the GCS bucket
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (public_url, error_message)
+        """
+        if not self.enabled:
+            return None, "GCS not enabled"
+
+        try:
+            blob = self.bucket.blob(destination_blob_name)
+            blob.upload_from_string(data, content_type=content_type)
+            return blob.public_url, None
+
+        except Exception as e:
+            error_msg = f"GCS upload failed: {str(e)}"
+            print(error_msg)
+            return None, error_msg
+
     def upload_private_file(self, local_file_path: str, destination_blob_name: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Upload a file to PRIVATE GCS bucket (not publicly accessible)
@@ -157,6 +178,45 @@ class GCSService:
             print(error_msg)
             return None, error_msg
 
+    def upload_private_bytes(self, data: bytes, destination_blob_name: str,
+                             content_type: str = 'image/jpeg') -> Tuple[Optional[str], Optional[str]]:
+        """
+        Upload an in-memory file to the PRIVATE GCS bucket.
+        Falls back to local storage if GCS is not configured.
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (blob_name, error_message)
+        """
+        if not self.enabled:
+            return self._local_upload_private_bytes(data, destination_blob_name)
+
+        try:
+            blob = self.private_bucket.blob(destination_blob_name)
+            blob.upload_from_string(data, content_type=content_type)
+            return destination_blob_name, None
+
+        except Exception as e:
+            error_msg = f"GCS private upload failed: {str(e)}"
+            print(error_msg)
+            return None, error_msg
+
+    def _local_upload_private_bytes(self, data: bytes, destination_blob_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """Local storage fallback for upload_private_bytes (static/uploads/private/)"""
+        try:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            dest_path = os.path.join(base_dir, 'static', 'uploads', 'private', destination_blob_name)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with open(dest_path, 'wb') as f:
+                f.write(data)
+
+            print(f"[LOCAL] Private file saved: {dest_path}")
+            return destination_blob_name, None
+
+        except Exception as e:
+            error_msg = f"Local private upload failed: {str(e)}"
+            print(error_msg)
+            return None, error_msg
+
     def _local_upload_private(self, local_file_path: str, destination_blob_name: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Local storage fallback for private files when GCS is not enabled.
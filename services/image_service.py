@@ -5,6 +5,7 @@ Handles image upload, processing, and file management
 
 import os
 import uuid
+from io import BytesIO
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
@@ -20,6 +21,7 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 MAX_IMAGE_WIDTH = 1200
 IMAGE_QUALITY = 80
+SUPPORTED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'MPO')
 
 
 class ImageService:
@@ -38,6 +40,10 @@ class ImageService:
         """
         Save and process uploaded image for an order
 
+        The upload is decoded once from its in-memory/spooled stream, resized,
+        encoded to a buffer and that buffer is uploaded as is (or written once
+        to local storage).
+
         Args:
             file: Uploaded file object
             order_id: Order ID
@@ -48,46 +54,29 @@ class ImageService:
             Tuple[Optional[Dict], Optional[str]]: (image_info, error_message)
         """
         try:
-            # Validate file
-            validation_error = self._validate_file(file)
-            if validation_error:
-                return None, validation_error
-
-            # Generate unique filename
-            file_extension = self._get_file_extension(file.filename)
-            unique_filename = f"{order_id}_{image_type}_{uuid.uuid4().hex}.{file_extension}"
-            file_path = os.path.join(self.upload_folder, unique_filename)
-
-            # Save file temporarily
-            file.save(file_path)
-
-            # Process image (resize, optimize)
-            processed_path = self._process_image(file_path)
-            if not processed_path:
-                self._cleanup_file(file_path)
-                return None, "Kuvan käsittely epäonnistui - tarkista että kuva ei ole vioittunut"
+            data, error = self.process_upload(file)
+            if error:
+                return None, error
 
-            # Update filename if processing changed the extension
-            final_filename = os.path.basename(processed_path)
+            # Always JPEG after processing
+            final_filename = f"{order_id}_{image_type}_{uuid.uuid4().hex}.jpg"
 
             # Upload to GCS if enabled, otherwise use local storage
             file_path_url = None
             if gcs_service.enabled:
                 # Upload to Google Cloud Storage (organized by order ID)
                 blob_name = f"orders/{order_id}/{final_filename}"
-                public_url, gcs_error = gcs_service.upload_file(processed_path, blob_name)
+                public_url, gcs_error = gcs_service.upload_bytes(data, blob_name)
 
                 if gcs_error:
                     # Fallback to local storage on GCS error
                     print(f"GCS upload failed, using local storage: {gcs_error}")
-                    file_path_url = f"/static/uploads/orders/{final_filename}"
+                    file_path_url = self._save_local(data, final_filename)
                 else:
                     file_path_url = public_url
-                    # Clean up local file after successful GCS upload
-                    self._cleanup_file(processed_path)
             else:
                 # Use local storage
-                file_path_url = f"/static/uploads/orders/{final_filename}"
+                file_path_url = self._save_local(data, final_filename)
 
             # Create image info
             image_info = {
@@ -95,7 +84,7 @@ class ImageService:
                 "filename": final_filename,
                 "original_filename": secure_filename(file.filename),
                 "file_path": file_path_url,
-                "file_size": os.path.getsize(processed_path) if os.path.exists(processed_path) else 0,
+                "file_size": len(data),
                 "image_type": image_type,
                 "uploaded_at": datetime.utcnow(),
                 "uploaded_by": uploaded_by
@@ -104,11 +93,44 @@ class ImageService:
             return image_info, None
 
         except Exception as e:
-            # Cleanup on error
-            if 'file_path' in locals():
-                self._cleanup_file(file_path)
             return None, f"Kuvan tallennus epäonnistui: {str(e)}"
 
+    def process_upload(self, file, max_width: Optional[int] = MAX_IMAGE_WIDTH,
+                       quality: int = IMAGE_QUALITY) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Validate, decode, resize and JPEG-encode an uploaded image in one pass
+
+        JPEGs are decoded at reduced scale (Pillow draft mode) when they are
+        at least twice max_width, then resized with LANCZOS.
+
+        Returns:
+            Tuple[Optional[bytes], Optional[str]]: (jpeg_bytes, error_message)
+        """
+        validation_error = self._validate_file(file)
+        if validation_error:
+            return None, validation_error
+
+        # Werkzeug keeps the upload in a BytesIO/SpooledTemporaryFile; read it in place
+        stream = getattr(file, "stream", file)
+        stream.seek(0)
+        try:
+            with Image.open(stream) as img:
+                if img.format not in SUPPORTED_FORMATS:
+                    return None, f"Kuvaformaatti {img.format or 'tuntematon'} ei ole tuettu"
+
+                if max_width and img.width > max_width:
+                    # Only JPEG supports this; decodes at 1/2, 1/4 or 1/8 scale but never below the target
+                    img.draft("RGB", (max_width, int(img.height * max_width / img.width)))
+                # The single full decode; raises on corrupt or truncated data
+                img.load()
+                output = self._encode_jpeg(img, max_width, quality)
+        except Exception as e:
+            return None, f"Kuvatiedosto on vioittunut tai ei kelvollinen: {str(e)}"
+        finally:
+            stream.seek(0)
+
+        return output, None
+
     def delete_order_image(self, order_id: int, image_type: str, image_id: str) -> Tuple[bool, Optional[str]]:
         """
         Delete an image from an order
@@ -295,24 +317,7 @@ class ImageService:
         if file_size == 0:
             return "Tiedosto on tyhjä"
 
-        # Validate that PIL can read the image
-        try:
-            # Create a copy of file content for PIL validation
-            file_content = file.read()
-            file.seek(0)  # Reset file pointer for later use
-
-            from io import BytesIO
-            with Image.open(BytesIO(file_content)) as img:
-                # Basic validation - ensure it's a valid image
-                img.verify()  # This will raise an exception if the image is corrupted
-
-                # Check if it's actually an image format we can process
-                if img.format not in ['JPEG', 'PNG', 'WEBP', 'MPO']:
-                    return f"Kuvaformaatti {img.format or 'tuntematon'} ei ole tuettu"
-
-        except Exception as e:
-            return f"Kuvatiedosto on vioittunut tai ei kelvollinen: {str(e)}"
-
+        # Decoding (and corrupt-file detection) happens once, in process_upload
         return None
 
     def _allowed_file(self, filename: str) -> bool:
@@ -328,56 +333,32 @@ class ImageService:
             return 'jpg'
         return filename.rsplit('.', 1)[1].lower()
 
-    def _process_image(self, file_path: str, max_width: Optional[int] = MAX_IMAGE_WIDTH, quality: int = IMAGE_QUALITY) -> Optional[str]:
-        """Process and optimize image"""
-        try:
-            # First validate that PIL can open the image
-            with Image.open(file_path) as img:
-                # Validate image format
-                if img.format not in ['JPEG', 'PNG', 'WEBP', 'MPO']:
-                    print(f"Image processing error: Unsupported image format {img.format}")
-                    return None
-
-                # Convert RGBA to RGB if necessary for JPEG compatibility
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Create white background
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-
-                # Resize if too large
-                if max_width and img.width > max_width:
-                    # Calculate new height maintaining aspect ratio
-                    new_height = int((max_width / img.width) * img.height)
-                    img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-
-                # Determine output format and extension
-                output_path = file_path
-                if not file_path.lower().endswith('.jpg'):
-                    # Change extension to .jpg since we're saving as JPEG
-                    base_path = file_path.rsplit('.', 1)[0]
-                    output_path = f"{base_path}.jpg"
-
-                # Save optimized image as JPEG
-                img.save(output_path, 'JPEG', quality=quality, optimize=True)
-
-                # Remove original file if we changed the extension
-                if output_path != file_path:
-                    self._cleanup_file(file_path)
-
-            return output_path
-
-        except Exception as e:
-            print(f"Image processing error for {file_path}: {str(e)}")
-            # Log more specific error details
-            try:
-                with Image.open(file_path) as test_img:
-                    print(f"Image details - Format: {test_img.format}, Mode: {test_img.mode}, Size: {test_img.size}")
-            except Exception as inner_e:
-                print(f"Cannot read image file: {str(inner_e)}")
-            return None
+    def _encode_jpeg(self, img: Image.Image, max_width: Optional[int], quality: int) -> bytes:
+        """Flatten transparency, resize to max_width and encode as JPEG into memory"""
+        # Convert RGBA to RGB if necessary for JPEG compatibility
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Create white background
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+
+        # Resize if too large
+        if max_width and img.width > max_width:
+            # Calculate new height maintaining aspect ratio
+            new_height = int((max_width / img.width) * img.height)
+            img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        img.save(buffer, 'JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+
+    def _save_local(self, data: bytes, filename: str) -> str:
+        """Write a processed image to the local upload folder; returns its URL path"""
+        with open(os.path.join(self.upload_folder, filename), 'wb') as f:
+            f.write(data)
+        return f"/static/uploads/orders/{filename}"
 
     def _cleanup_file(self, file_path: str) -> bool:
         """Remove file safely"""
@@ -0,0 +1,224 @@
+"""
+Google Maps Client
+Shared HTTP client for Google Maps web services (Places, Geocoding, Directions)
+with a keep-alive connection pool, bounded retries with jitter, a per-endpoint
+circuit breaker and latency histograms.
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+# Base URL is pluggable so a local stub server can stand in for Google in tests/benchmarks
+GOOGLE_MAPS_BASE_URL = os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com").rstrip("/")
+MAPS_TIMEOUT_SECONDS = float(os.getenv("MAPS_TIMEOUT_SECONDS", "5"))
+MAPS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("MAPS_CONNECT_TIMEOUT_SECONDS", "2"))
+MAPS_MAX_RETRIES = int(os.getenv("MAPS_MAX_RETRIES", "2"))
+MAPS_RETRY_BACKOFF_SECONDS = float(os.getenv("MAPS_RETRY_BACKOFF_SECONDS", "0.2"))
+MAPS_POOL_SIZE = int(os.getenv("MAPS_POOL_SIZE", "16"))
+# Breaker opens after this many consecutive failed (or too slow) calls to one endpoint
+MAPS_BREAKER_FAILURES = int(os.getenv("MAPS_BREAKER_FAILURES", "5"))
+MAPS_BREAKER_RESET_SECONDS = float(os.getenv("MAPS_BREAKER_RESET_SECONDS", "30"))
+MAPS_SLOW_CALL_MS = float(os.getenv("MAPS_SLOW_CALL_MS", "3000"))
+
+ENDPOINT_PATHS = {
+    "autocomplete": "/maps/api/place/autocomplete/json",
+    "place_details": "/maps/api/place/details/json",
+    "find_place": "/maps/api/place/findplacefromtext/json",
+    "geocode": "/maps/api/geocode/json",
+    "directions": "/maps/api/directions/json",
+}
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised when an endpoint's circuit breaker is open and the call is skipped"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open -> closed)"""
+
+    STATE_CLOSED = "closed"
+    STATE_OPEN = "open"
+    STATE_HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = self.STATE_CLOSED
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through right now"""
+        with self._lock:
+            if self.state == self.STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                # Let a single trial call through
+                self.state = self.STATE_HALF_OPEN
+                return True
+            if self.state == self.STATE_HALF_OPEN:
+                return False
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.STATE_CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.STATE_OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets_ms: List[float]):
+        self.buckets_ms = list(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, duration_ms: float):
+        with self._lock:
+            index = len(self.buckets_ms)
+            for i, bound in enumerate(self.buckets_ms):
+                if duration_ms <= bound:
+                    index = i
+                    break
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += duration_ms
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            labels = [f"le_{int(b)}ms" for b in self.buckets_ms] + ["inf"]
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+                "buckets": dict(zip(labels, self.counts))
+            }
+
+
+class MapsClient:
+    """Pooled, retrying, circuit-broken client for Google Maps web services"""
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = (base_url or GOOGLE_MAPS_BASE_URL).rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(ENDPOINT_PATHS), pool_maxsize=MAPS_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._breakers = {
+            name: CircuitBreaker(MAPS_BREAKER_FAILURES, MAPS_BREAKER_RESET_SECONDS)
+            for name in ENDPOINT_PATHS
+        }
+        self._histograms = {name: LatencyHistogram(LATENCY_BUCKETS_MS) for name in ENDPOINT_PATHS}
+        self._counters = {name: {"calls": 0, "errors": 0, "retries": 0, "short_circuited": 0} for name in ENDPOINT_PATHS}
+        self._counter_lock = threading.Lock()
+
+    def url_for(self, endpoint: str) -> str:
+        """Full URL for a named endpoint"""
+        if endpoint == "directions" and os.getenv("GOOGLE_DIRECTIONS_URL"):
+            return os.getenv("GOOGLE_DIRECTIONS_URL")
+        return f"{self.base_url}{ENDPOINT_PATHS[endpoint]}"
+
+    def get(self, endpoint: str, params: Dict, timeout: Optional[float] = None) -> Dict:
+        """
+        GET a Maps endpoint and return the decoded JSON body
+
+        Raises:
+            CircuitOpenError: endpoint breaker is open (caller should use its fallback)
+            requests.RequestException: HTTP failure after retries were exhausted
+        """
+        breaker = self._breakers[endpoint]
+        if not breaker.allow():
+            self._count(endpoint, "short_circuited")
+            raise CircuitOpenError(f"Google Maps {endpoint} temporarily unavailable (circuit open)")
+
+        read_timeout = timeout if timeout is not None else MAPS_TIMEOUT_SECONDS
+        url = self.url_for(endpoint)
+        attempt = 0
+
+        while True:
+            self._count(endpoint, "calls")
+            started = time.perf_counter()
+            response = None
+            error = None
+            try:
+                response = self.session.get(url, params=params, timeout=(MAPS_CONNECT_TIMEOUT_SECONDS, read_timeout))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            except Exception:
+                # Not retryable, but every exit must settle the breaker (a half-open trial would block forever)
+                self._count(endpoint, "errors")
+                breaker.record_failure()
+                raise
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._histograms[endpoint].observe(duration_ms)
+
+            if error is None and response.status_code not in RETRYABLE_STATUS_CODES:
+                try:
+                    response.raise_for_status()
+                    data = response.json()
+                except Exception:
+                    # Client errors / malformed bodies are not an outage - don't trip the breaker
+                    self._count(endpoint, "errors")
+                    breaker.record_success()
+                    raise
+
+                if duration_ms > MAPS_SLOW_CALL_MS:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                return data
+
+            if attempt < MAPS_MAX_RETRIES:
+                attempt += 1
+                self._count(endpoint, "retries")
+                # Exponential backoff with full jitter
+                time.sleep(random.uniform(0, MAPS_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))))
+                continue
+
+            self._count(endpoint, "errors")
+            breaker.record_failure()
+            if error is not None:
+                raise error
+            response.raise_for_status()
+
+    def get_stats(self) -> Dict:
+        """Per-endpoint counters, breaker state and latency histograms"""
+        with self._counter_lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        return {
+            name: {
+                **counters[name],
+                "breaker": self._breakers[name].state,
+                "latency": self._histograms[name].snapshot()
+            }
+            for name in ENDPOINT_PATHS
+        }
+
+    def _count(self, endpoint: str, field: str):
+        with self._counter_lock:
+            self._counters[endpoint][field] += 1
+
+
+# Global instance
+maps_client = MapsClient()
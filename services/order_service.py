@@ -5,13 +5,19 @@ Handles order business logic, pricing, and operations
 
 import os
 import re
-import requests
+import time
+import atexit
+import threading
 import math
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal, ROUND_HALF_UP
+from pymongo import UpdateOne
 from models.order import order_model
-from models.database import DatabaseManager
+from models.route_cache import route_cache_model
+from services.maps_client import maps_client
+from utils.cache import TTLCache
 
 
 def round_half_up(value: float, decimals: int = 2) -> float:
@@ -58,20 +64,37 @@ MINIMUM_ORDER_PRICE_NET = 27.0
 
 # External API configuration
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY", "")
-GOOGLE_DIRECTIONS_URL = os.getenv(
-    "GOOGLE_DIRECTIONS_URL",
-    "https://maps.googleapis.com/maps/api/directions/json"
-)
 # When routing fails entirely, inflate straight-line distance to avoid underpricing
 STRAIGHT_LINE_DISTANCE_FACTOR = float(os.getenv("STRAIGHT_LINE_DISTANCE_FACTOR", "1.2"))
 
+# In-process route cache tier (in front of the Mongo route_cache collection)
+ROUTE_CACHE_MEMORY_SIZE = int(os.getenv("ROUTE_CACHE_MEMORY_SIZE", "2048"))
+ROUTE_CACHE_MEMORY_TTL = float(os.getenv("ROUTE_CACHE_MEMORY_TTL", "3600"))
+# How often batched last_used_at updates are written back to Mongo
+ROUTE_CACHE_TOUCH_FLUSH_SECONDS = float(os.getenv("ROUTE_CACHE_TOUCH_FLUSH_SECONDS", "60"))
+
+# Shared pool for resolving pickup and dropoff geocodes concurrently
+GEOCODE_POOL_WORKERS = int(os.getenv("GEOCODE_POOL_WORKERS", "8"))
+_geocode_pool = ThreadPoolExecutor(max_workers=GEOCODE_POOL_WORKERS, thread_name_prefix="geocode")
+# Cold routes slower than this are logged with their stage timings
+ROUTE_SLOW_LOG_MS = float(os.getenv("ROUTE_SLOW_LOG_MS", "1500"))
+
+# Batch quotes: route lookups run on their own pool (get_route itself uses the geocode pool)
+BATCH_QUOTE_WORKERS = int(os.getenv("BATCH_QUOTE_WORKERS", "8"))
+BATCH_QUOTE_MAX_ITEMS = int(os.getenv("BATCH_QUOTE_MAX_ITEMS", "200"))
+_quote_pool = ThreadPoolExecutor(max_workers=BATCH_QUOTE_WORKERS, thread_name_prefix="quote")
+
 
 class OrderService:
     """Service for handling order operations and business logic"""
 
     def __init__(self):
         self.order_model = order_model
-        self.route_cache = DatabaseManager().get_collection("route_cache")
+        self.route_cache = route_cache_model.collection
+        self._route_memory = TTLCache(ROUTE_CACHE_MEMORY_SIZE, ROUTE_CACHE_MEMORY_TTL)
+        self._route_touches: Dict[str, datetime] = {}
+        self._route_touch_lock = threading.Lock()
+        self._last_touch_flush = time.monotonic()
 
     def create_order(self, user_id: int, order_data: Dict) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """Create a new order with pricing calculation"""
@@ -91,8 +114,7 @@ class OrderService:
                     promo_code = order_data.get("promo_code")
                     is_first_order = False
                     try:
-                        existing_count = self.order_model.count_documents({"user_id": int(user_id)})
-                        is_first_order = existing_count == 0
+                        is_first_order = self.order_model.is_first_order(user_id)
                     except Exception as e:
                         print(f"Failed to check first order status during pricing: {e}")
 
@@ -140,6 +162,10 @@ class OrderService:
         """Get all orders for a user"""
         return self.order_model.get_user_orders(user_id, limit)
 
+    def is_first_order(self, user_id: Optional[int]) -> bool:
+        """True if the user has not placed any orders yet"""
+        return self.order_model.is_first_order(user_id)
+
     def get_order_details(self, order_id: int, user_id: Optional[int] = None) -> Optional[Dict]:
         """Get order details with user validation"""
         return self.order_model.find_by_id(order_id, user_id)
@@ -294,11 +320,13 @@ class OrderService:
         return_leg: bool = False,
         user_id: Optional[int] = None,
         promo_code: Optional[str] = None,
-        is_first_order: bool = False
+        is_first_order: bool = False,
+        discount_rules=None
     ) -> Dict:
         """
         Calculate price with applicable discounts.
-        
+        discount_rules: DiscountModel.get_rules() snapshot shared by a batch quote.
+
         Returns:
             {
                 "original_net": float,
@@ -355,7 +383,8 @@ class OrderService:
                 pickup_city=pickup_city,
                 dropoff_city=dropoff_city,
                 promo_code=promo_code,
-                is_first_order=is_first_order
+                is_first_order=is_first_order,
+                rules=discount_rules
             )
 
             applied_discounts = discount_result.get("applied_discounts", []) or []
@@ -403,6 +432,105 @@ class OrderService:
             "dropoff_address": dropoff_addr
         }
 
+    def batch_quote(
+        self,
+        legs: List[Dict],
+        user_id: Optional[int] = None,
+        promo_code: Optional[str] = None,
+        is_first_order: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Price many pickup/dropoff pairs, yielding results as they complete.
+
+        Identical legs are routed once, routes resolve concurrently through the
+        route cache and one compiled discount rule set is used for the whole batch.
+
+        Yields:
+            {"index": int, "km": float, "pricing": {...}} with pricing in the
+            price_from_km_with_discounts shape, or {"index": int, "error": str}
+        """
+        from models.discount import discount_model
+
+        try:
+            discount_rules = discount_model.get_rules()
+        except Exception as e:
+            print(f"Failed to load discounts for batch quote: {e}")
+            discount_rules = None
+
+        # Group item indexes by normalised leg so duplicates share one lookup
+        groups: Dict[Tuple, List[int]] = {}
+        leg_args: Dict[Tuple, Tuple[str, str, str, str, bool]] = {}
+        for index, leg in enumerate(legs):
+            args, error = self._parse_batch_leg(leg)
+            if error:
+                yield {"index": index, "error": error}
+                continue
+            pickup, dropoff, pickup_place_id, dropoff_place_id, return_leg = args
+            # Pricing also reads the address text (metro tier, city discounts), so key on both
+            key = (
+                self._normalize_for_cache(pickup), self._normalize_for_cache(dropoff),
+                pickup_place_id, dropoff_place_id, return_leg
+            )
+            groups.setdefault(key, []).append(index)
+            leg_args.setdefault(key, (pickup, dropoff, pickup_place_id, dropoff_place_id, return_leg))
+
+        def quote_leg(key: Tuple) -> Dict:
+            pickup, dropoff, pickup_place_id, dropoff_place_id, return_leg = leg_args[key]
+            km = self.route_km(pickup, dropoff, pickup_place_id, dropoff_place_id)
+            pricing = self.price_from_km_with_discounts(
+                km,
+                pickup_addr=pickup,
+                dropoff_addr=dropoff,
+                return_leg=return_leg,
+                user_id=user_id,
+                promo_code=promo_code,
+                is_first_order=is_first_order,
+                discount_rules=discount_rules
+            )
+            # Hidden discounts are internal, same as the single quote endpoint
+            pricing.pop("all_applied_discounts", None)
+            return {"km": round(km, 2), "pricing": pricing}
+
+        futures = {_quote_pool.submit(quote_leg, key): key for key in groups}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except ValueError as e:
+                result = {"error": str(e)}
+            except Exception as e:
+                print(f"Batch quote leg failed: {e}")
+                result = {"error": "Hintalaskenta ei ole saatavilla juuri nyt"}
+            for index in groups[futures[future]]:
+                yield {"index": index, **result}
+
+    @staticmethod
+    def _parse_batch_leg(leg) -> Tuple[Optional[Tuple[str, str, str, str, bool]], Optional[str]]:
+        """
+        Validate one batch quote item.
+
+        Returns:
+            ((pickup, dropoff, pickup_place_id, dropoff_place_id, return_leg), None) or (None, error)
+        """
+        if not isinstance(leg, dict):
+            return None, "Virheellinen kuljetus"
+
+        fields = []
+        for name in ("pickup", "dropoff", "pickup_place_id", "dropoff_place_id"):
+            value = leg.get(name)
+            if value is None:
+                value = ""
+            if not isinstance(value, str):
+                return None, "Virheellinen osoite"
+            fields.append(value.strip())
+        if not fields[0] or not fields[1]:
+            return None, "Lähtö- ja kohdeosoite vaaditaan"
+
+        return_leg = leg.get("return_leg", False)
+        if return_leg is not None and not isinstance(return_leg, bool):
+            return None, "Virheellinen paluukuljetuksen arvo"
+
+        return (*fields, bool(return_leg)), None
+
     # Status and translation methods
     def translate_status(self, status: str) -> str:
         """Translate order status to Finnish"""
@@ -453,27 +581,68 @@ class OrderService:
         return f"addr:{pickup_norm}:{dropoff_norm}"
 
     def _get_cached_route(self, cache_key: str) -> Optional[Dict]:
-        """Fetch cached route data if available."""
+        """Fetch cached route data if available (memory tier first, then Mongo)."""
         if not cache_key or self.route_cache is None:
             return None
 
-        cached = self.route_cache.find_one({"key": cache_key}, {"_id": 0})
-        if not cached:
-            return None
+        cached = self._route_memory.get(cache_key)
+        if cached is None:
+            doc = self.route_cache.find_one({"key": cache_key}, {"_id": 0})
+            if not doc:
+                return None
+
+            cached = {
+                "distance_km": doc.get("distance_km", 0.0),
+                "latlngs": doc.get("latlngs", []),
+                "start": doc.get("start"),
+                "end": doc.get("end"),
+                "provider": "route-cache",
+                "source_provider": doc.get("provider", "google-directions")
+            }
+            self._route_memory.set(cache_key, cached)
 
-        self.route_cache.update_one(
-            {"key": cache_key},
-            {"$set": {"last_used_at": datetime.utcnow()}}
-        )
+        self._touch_route_cache(cache_key)
+        return dict(cached)
 
-        return {
-            "distance_km": cached.get("distance_km", 0.0),
-            "latlngs": cached.get("latlngs", []),
-            "start": cached.get("start"),
-            "end": cached.get("end"),
-            "provider": "route-cache",
-            "source_provider": cached.get("provider", "google-directions")
-        }
+    def _touch_route_cache(self, cache_key: str):
+        """Queue a last_used_at update; writes are batched into a periodic flush."""
+        with self._route_touch_lock:
+            self._route_touches[cache_key] = datetime.utcnow()
+            due = time.monotonic() - self._last_touch_flush >= ROUTE_CACHE_TOUCH_FLUSH_SECONDS
+
+        if due:
+            self.flush_route_cache_touches()
+
+    def flush_route_cache_touches(self) -> int:
+        """Write pending last_used_at timestamps to Mongo in one bulk operation."""
+        with self._route_touch_lock:
+            touches = self._route_touches
+            self._route_touches = {}
+            self._last_touch_flush = time.monotonic()
+
+        if not touches or self.route_cache is None:
+            return 0
+
+        try:
+            self.route_cache.bulk_write(
+                [
+                    UpdateOne({"key": key}, {"$set": {"last_used_at": used_at}})
+                    for key, used_at in touches.items()
+                ],
+                ordered=False
+            )
+        except Exception as e:
+            print(f"Route cache touch flush failed: {e}")
+            return 0
+
+        return len(touches)
+
+    def get_route_cache_stats(self) -> Dict:
+        """Hit/miss counters of the in-process route cache tier."""
+        stats = self._route_memory.stats()
+        with self._route_touch_lock:
+            stats["pending_touches"] = len(self._route_touches)
+        return stats
 
     def _save_route_cache(
         self,
@@ -507,6 +676,15 @@ class OrderService:
         }
         self.route_cache.update_one({"key": cache_key}, update_doc, upsert=True)
 
+        self._route_memory.set(cache_key, {
+            "distance_km": route_data.get("distance_km", 0.0),
+            "latlngs": route_data.get("latlngs", []),
+            "start": route_data.get("start"),
+            "end": route_data.get("end"),
+            "provider": "route-cache",
+            "source_provider": route_data.get("provider", "google-directions")
+        })
+
     def _decode_polyline(self, polyline_str: Optional[str]) -> List[List[float]]:
         """Decode a Google polyline string into a list of [lat, lng]."""
         if not polyline_str:
@@ -572,9 +750,7 @@ class OrderService:
             "key": GOOGLE_PLACES_API_KEY
         }
 
-        res = requests.get(GOOGLE_DIRECTIONS_URL, params=params, timeout=10)
-        res.raise_for_status()
-        data = res.json()
+        data = maps_client.get("directions", params)
         status = data.get("status")
         if status != "OK" or not data.get("routes"):
             error_msg = data.get("error_message") or status or "Unknown error"
@@ -636,14 +812,22 @@ class OrderService:
         pickup_place_id: str = "",
         dropoff_place_id: str = ""
     ) -> Dict:
-        """Resolve geocodes and return route data with fallbacks."""
+        """Resolve geocodes and return route data with fallbacks.
+
+        Cold lookups geocode pickup and dropoff in parallel; the result carries
+        a "timings" dict (milliseconds per stage).
+        """
+        started = time.perf_counter()
         cache_key = self._build_route_cache_key(pickup_addr, dropoff_addr, pickup_place_id, dropoff_place_id)
         cached_route = self._get_cached_route(cache_key)
+        timings = {"cache_ms": self._elapsed_ms(started)}
         if cached_route:
+            cached_route["timings"] = timings
             return cached_route
 
-        pickup_coords = self._geocode_address(pickup_addr, pickup_place_id)
-        dropoff_coords = self._geocode_address(dropoff_addr, dropoff_place_id)
+        pickup_coords, dropoff_coords = self._geocode_endpoints(
+            pickup_addr, pickup_place_id, dropoff_addr, dropoff_place_id, timings
+        )
 
         if not pickup_coords or not dropoff_coords:
             raise ValueError("Osoitteiden geokoodaus epaonnistui")
@@ -654,8 +838,10 @@ class OrderService:
         origin = f"place_id:{pickup_place_id}" if pickup_place_id else f"{lat1},{lon1}"
         destination = f"place_id:{dropoff_place_id}" if dropoff_place_id else f"{lat2},{lon2}"
 
+        directions_started = time.perf_counter()
         try:
             route = self._fetch_google_route(origin, destination, [lat1, lon1], [lat2, lon2])
+            timings["directions_ms"] = self._elapsed_ms(directions_started)
             self._save_route_cache(
                 cache_key,
                 route,
@@ -664,10 +850,12 @@ class OrderService:
                 pickup_place_id,
                 dropoff_place_id
             )
+            route["timings"] = self._finish_timings(timings, started)
             return route
         except ValueError:
             raise
         except Exception as e:
+            timings["directions_ms"] = self._elapsed_ms(directions_started)
             print(f"Google Directions error: {e}")
 
         straight_km = self._haversine_distance(lat1, lon1, lat2, lon2)
@@ -680,39 +868,113 @@ class OrderService:
             "latlngs": [[lat1, lon1], [lat2, lon2]],
             "start": [lat1, lon1],
             "end": [lat2, lon2],
-            "provider": "straight-line-fallback"
+            "provider": "straight-line-fallback",
+            "timings": self._finish_timings(timings, started)
         }
 
+    def _geocode_endpoints(
+        self,
+        pickup_addr: str,
+        pickup_place_id: str,
+        dropoff_addr: str,
+        dropoff_place_id: str,
+        timings: Dict
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Geocode pickup and dropoff concurrently on the shared pool."""
+        geocode_started = time.perf_counter()
+        pickup_future = _geocode_pool.submit(self._timed_geocode, pickup_addr, pickup_place_id)
+        dropoff_future = _geocode_pool.submit(self._timed_geocode, dropoff_addr, dropoff_place_id)
+
+        pickup_coords, timings["geocode_pickup_ms"] = pickup_future.result()
+        dropoff_coords, timings["geocode_dropoff_ms"] = dropoff_future.result()
+        timings["geocode_ms"] = self._elapsed_ms(geocode_started)
+        return pickup_coords, dropoff_coords
+
+    def _timed_geocode(self, address: str, place_id: str) -> Tuple[Optional[Dict], float]:
+        """Geocode one endpoint and report how long it took."""
+        started = time.perf_counter()
+        coords = self._geocode_address(address, place_id)
+        return coords, self._elapsed_ms(started)
+
+    def _finish_timings(self, timings: Dict, started: float) -> Dict:
+        """Add total time and log slow cold route lookups."""
+        timings["total_ms"] = self._elapsed_ms(started)
+        if timings["total_ms"] > ROUTE_SLOW_LOG_MS:
+            print(f"Slow route lookup: {timings}")
+        return timings
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 2)
+
     def _geocode_address(self, address: str, place_id: Optional[str] = None) -> Optional[Dict]:
-        """Geocode address using Google Places/Geocode APIs"""
+        """Geocode address using the geocode cache, then Google Places/Geocode APIs"""
         if not GOOGLE_PLACES_API_KEY or (not address and not place_id):
             return None
 
+        result = self._resolve_geocode(address, place_id, require="lat")
+        if result and result.get("lat") is not None:
+            return {"lat": result["lat"], "lng": result["lng"]}
+        return None
+
+    def _resolve_geocode(self, address: str, place_id: Optional[str], require: str) -> Optional[Dict]:
+        """
+        Resolve coordinates and country code for an address.
+
+        Serves from the geocode cache when possible. On a miss only one worker
+        goes upstream per key; others wait briefly for its result.
+        """
+        from models.geocode_cache import geocode_cache_model
+
+        cached = geocode_cache_model.lookup(address, place_id, require=require)
+        if cached:
+            return cached
+
+        keys = geocode_cache_model.build_keys(address, place_id)
+        lock_key = keys[0]
+        locked = geocode_cache_model.acquire_lock(lock_key)
+        if not locked:
+            cached = geocode_cache_model.wait_for(address, place_id, require=require)
+            if cached:
+                return cached
+            # The lock holder did not finish in time; resolve ourselves but leave its lock alone
+
+        try:
+            if require == "country_code":
+                result = self._fetch_country_upstream(address, place_id)
+            else:
+                result = self._fetch_geocode_upstream(address, place_id)
+            if result:
+                geocode_cache_model.save(address, place_id, result)
+            return result
+        finally:
+            if locked:
+                geocode_cache_model.release_lock(lock_key)
+
+    def _fetch_geocode_upstream(self, address: str, place_id: Optional[str] = None) -> Optional[Dict]:
+        """Resolve coordinates via Place Details -> Find Place -> Geocoding API"""
         try:
             # 1) If we received a Places place_id from the UI, resolve it directly
             if place_id:
-                url = "https://maps.googleapis.com/maps/api/place/details/json"
                 params = {
                     "place_id": place_id,
-                    "fields": "geometry/location",
+                    "fields": "geometry/location,address_component",
                     "language": "fi",
                     "key": GOOGLE_PLACES_API_KEY
                 }
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+                data = maps_client.get("place_details", params)
                 if data.get("status") == "OK":
-                    location = (
-                        data.get("result", {})
-                        .get("geometry", {})
-                        .get("location")
-                    )
+                    result = data.get("result", {})
+                    location = result.get("geometry", {}).get("location")
                     if location:
-                        return {"lat": location["lat"], "lng": location["lng"]}
+                        return {
+                            "lat": location["lat"],
+                            "lng": location["lng"],
+                            "country_code": self._extract_country_code(result.get("address_components") or [])
+                        }
 
             # 2) Fall back to Places Find Place for plain text addresses
             if address:
-                url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
                 params = {
                     "input": address,
                     "inputtype": "textquery",
@@ -721,9 +983,7 @@ class OrderService:
                     "key": GOOGLE_PLACES_API_KEY,
                     "region": "fi"
                 }
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+                data = maps_client.get("find_place", params)
                 if data.get("status") == "OK" and data.get("candidates"):
                     location = (
                         data["candidates"][0]
@@ -734,18 +994,20 @@ class OrderService:
                         return {"lat": location["lat"], "lng": location["lng"]}
 
                 # 3) Absolute fallback to legacy Geocoding API if Places failed
-                legacy_url = "https://maps.googleapis.com/maps/api/geocode/json"
                 legacy_params = {
                     "address": address,
                     "key": GOOGLE_PLACES_API_KEY,
                     "region": "fi"
                 }
-                response = requests.get(legacy_url, params=legacy_params, timeout=10)
-                response.raise_for_status()
-                legacy_data = response.json()
+                legacy_data = maps_client.get("geocode", legacy_params)
                 if legacy_data.get("status") == "OK" and legacy_data.get("results"):
-                    location = legacy_data["results"][0]["geometry"]["location"]
-                    return {"lat": location["lat"], "lng": location["lng"]}
+                    first = legacy_data["results"][0]
+                    location = first["geometry"]["location"]
+                    return {
+                        "lat": location["lat"],
+                        "lng": location["lng"],
+                        "country_code": self._extract_country_code(first.get("address_components") or [])
+                    }
 
         except Exception as e:
             print(f"Geocoding error: {e}")
@@ -765,27 +1027,30 @@ class OrderService:
         return None
 
     def get_country_code(self, address: str = "", place_id: str = "") -> Optional[str]:
-        """Resolve ISO country code using Place Details or Geocoding."""
+        """Resolve ISO country code using the geocode cache, Place Details or Geocoding."""
         if not GOOGLE_PLACES_API_KEY or (not address and not place_id):
             return None
 
+        result = self._resolve_geocode(address, place_id, require="country_code")
+        return result.get("country_code") if result else None
+
+    def _fetch_country_upstream(self, address: str = "", place_id: str = "") -> Optional[Dict]:
+        """Resolve country code (and coordinates when available) from Google."""
         try:
             if place_id:
-                url = "https://maps.googleapis.com/maps/api/place/details/json"
                 params = {
                     "place_id": place_id,
-                    "fields": "address_component",
+                    "fields": "geometry/location,address_component",
                     "language": "fi",
                     "key": GOOGLE_PLACES_API_KEY
                 }
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+                data = maps_client.get("place_details", params)
                 if data.get("status") == "OK":
-                    components = data.get("result", {}).get("address_components") or []
-                    code = self._extract_country_code(components)
+                    result = data.get("result", {})
+                    code = self._extract_country_code(result.get("address_components") or [])
                     if code:
-                        return code
+                        location = result.get("geometry", {}).get("location") or {}
+                        return {"lat": location.get("lat"), "lng": location.get("lng"), "country_code": code}
         except Exception as e:
             print(f"Place details country lookup failed: {e}")
 
@@ -793,18 +1058,20 @@ class OrderService:
             return None
 
         try:
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
             params = {
                 "address": address,
                 "key": GOOGLE_PLACES_API_KEY,
                 "language": "fi"
             }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = maps_client.get("geocode", params)
             if data.get("status") == "OK" and data.get("results"):
-                components = data["results"][0].get("address_components") or []
-                return self._extract_country_code(components)
+                first = data["results"][0]
+                location = (first.get("geometry") or {}).get("location") or {}
+                return {
+                    "lat": location.get("lat"),
+                    "lng": location.get("lng"),
+                    "country_code": self._extract_country_code(first.get("address_components") or [])
+                }
         except Exception as e:
             print(f"Geocode country lookup failed: {e}")
 
@@ -880,3 +1147,4 @@ class OrderService:
 
 # Global instance
 order_service = OrderService()
+atexit.register(order_service.flush_route_cache_touches)
@@ -0,0 +1,223 @@
+"""
+Pricing Engine
+Vectorised pricing for many distances at once (admin what-if analysis, bulk
+re-pricing). Mirrors OrderService.calculate_price / price_from_km_with_discounts
+and DiscountService.calculate_discount_amount for a single chosen discount,
+with half-up rounding bit-identical to the scalar round_half_up.
+
+NumPy is a requirement; if it is missing (e.g. a slim dev environment)
+price_batch falls back to the scalar loop.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+from models.discount import DiscountModel
+from services.order_service import (
+    order_service, round_half_up, METRO_NET, MID_KM, MID_NET, LONG_KM, LONG_NET,
+    LEGACY_INTERPOLATION_START_KM, MINIMUM_ORDER_PRICE_NET, ROUNDTRIP_DISCOUNT, VAT_RATE
+)
+
+# DiscountService.apply_discounts uses these literals rather than the env config
+DISCOUNT_VAT_RATE = 0.255
+DISCOUNT_MIN_NET = 20.0
+
+# Above this the float/decimal boundary argument in round_half_up_array no longer holds
+_VECTOR_ROUND_LIMIT = 1e12
+
+PRICE_FIELDS = [
+    "original_net", "original_vat", "original_gross", "discount_amount",
+    "final_net", "final_vat", "final_gross"
+]
+
+
+def round_half_up_array(values, decimals: int = 2):
+    """
+    Vectorised round_half_up, bit-identical to Decimal(str(x)).quantize(ROUND_HALF_UP).
+
+    str(x) is the shortest decimal that round-trips to x, so it sits exactly on
+    a rounding boundary b = (m - 0.5) / 10**decimals only when x == float(b).
+    IEEE division is correctly rounded, so float(b) is (m - 0.5) / scale here,
+    which makes "x >= float(b)" the exact half-up test.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = float(10 ** decimals)
+    magnitude = np.abs(values)
+
+    cents = np.floor(magnitude * scale + 0.5)
+    # The float estimate can be one step off either way; settle against the exact boundaries
+    cents = np.where(magnitude < (cents - 0.5) / scale, cents - 1, cents)
+    cents = np.where(magnitude >= (cents + 0.5) / scale, cents + 1, cents)
+    result = np.copysign(cents / scale, values)
+
+    large = magnitude >= _VECTOR_ROUND_LIMIT
+    if large.any():
+        for index in np.flatnonzero(large):
+            result[index] = round_half_up(float(values[index]), decimals)
+    return result
+
+
+def gross_price_array(distances, metro, return_leg: bool = False):
+    """OrderService.calculate_price over arrays of distances and metro flags (gross, rounded)"""
+    distances = np.asarray(distances, dtype=np.float64)
+    metro = np.asarray(metro, dtype=bool)
+
+    # Same operation order as _interpolate so every element matches the scalar float result
+    mid = METRO_NET + (MID_NET - METRO_NET) * (distances - LEGACY_INTERPOLATION_START_KM) / (MID_KM - LEGACY_INTERPOLATION_START_KM)
+    long_tier = MID_NET + (LONG_NET - MID_NET) * (distances - MID_KM) / (LONG_KM - MID_KM)
+    beyond = distances * (LONG_NET / LONG_KM)
+
+    net = np.where(distances <= MID_KM, mid, np.where(distances <= LONG_KM, long_tier, beyond))
+    net = np.where(metro, METRO_NET, net)
+    if return_leg:
+        net = net * (1 - ROUNDTRIP_DISCOUNT)
+    net = np.maximum(net, MINIMUM_ORDER_PRICE_NET)
+
+    gross = round_half_up_array(net * (1 + VAT_RATE))
+    return np.where(distances <= 0, 0.0, gross)
+
+
+def discount_amount_array(discount: Dict, base_net, distances):
+    """DiscountService.calculate_discount_amount for one discount over arrays"""
+    base_net = np.asarray(base_net, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    discount_type = discount.get("type")
+    value = float(discount.get("value", 0))
+
+    if discount_type == DiscountModel.TYPE_PERCENTAGE:
+        return round_half_up_array(base_net * (value / 100))
+
+    if discount_type == DiscountModel.TYPE_FIXED_AMOUNT:
+        return np.minimum(value, base_net)
+
+    if discount_type == DiscountModel.TYPE_FREE_KILOMETERS:
+        reduced_gross = gross_price_array(distances - value, np.zeros(distances.shape, dtype=bool))
+        reduced_net = reduced_gross / 1.255
+        partial = np.maximum(0, round_half_up_array(base_net - reduced_net))
+        return np.where(distances <= value, base_net - 20.0, partial)
+
+    if discount_type == DiscountModel.TYPE_PRICE_CAP:
+        return np.where(base_net > value, round_half_up_array(base_net - value), 0.0)
+
+    if discount_type == DiscountModel.TYPE_CUSTOM_RATE:
+        custom_net = np.maximum(distances * value, 20.0)
+        return np.maximum(0, round_half_up_array(base_net - custom_net))
+
+    if discount_type == DiscountModel.TYPE_TIERED_PERCENTAGE:
+        amount = np.zeros(distances.shape)
+        matched = np.zeros(distances.shape, dtype=bool)
+        for tier in sorted(discount.get("tiers") or [], key=lambda t: t.get("min_km", 0), reverse=True):
+            hit = ~matched & (distances >= tier.get("min_km", 0))
+            amount = np.where(hit, round_half_up_array(base_net * (tier.get("percentage", 0) / 100)), amount)
+            matched |= hit
+        return amount
+
+    if discount_type == DiscountModel.TYPE_FIXED_PRICE:
+        return np.maximum(0.0, round_half_up_array(base_net - value))
+
+    return np.zeros(distances.shape)
+
+
+def price_batch(
+    distances: Sequence[float],
+    metro: Optional[Sequence[bool]] = None,
+    discount: Optional[Dict] = None,
+    return_leg: bool = False
+) -> Dict[str, List[float]]:
+    """
+    Price many distances in one pass.
+
+    metro: per-distance "both ends in the metro area" flags (default all False).
+    discount: a discount document applied as the only candidate; its km and
+    order value bounds are honoured, scope/city/validity are not (what-if).
+
+    Returns lists keyed like price_from_km_with_discounts: original_net,
+    original_vat, original_gross, discount_amount, final_net, final_vat, final_gross.
+    """
+    if metro is None:
+        metro = [False] * len(distances)
+    if len(metro) != len(distances):
+        raise ValueError("distances and metro must have the same length")
+
+    if not HAS_NUMPY:
+        return price_batch_scalar(distances, metro, discount, return_leg)
+
+    distances = np.asarray(distances, dtype=np.float64)
+    gross = gross_price_array(distances, metro, return_leg)
+
+    # OrderService._split_gross_to_net_vat, then rounded again as in price_from_km_with_discounts
+    net = round_half_up_array(gross / (1 + VAT_RATE))
+    vat = round_half_up_array(gross - gross / (1 + VAT_RATE))
+
+    result = {
+        "original_net": net,
+        "original_vat": vat,
+        "original_gross": gross,
+        "discount_amount": np.zeros(distances.shape),
+        "final_net": net,
+        "final_vat": vat,
+        "final_gross": gross
+    }
+
+    if discount:
+        eligible = np.ones(distances.shape, dtype=bool)
+        min_km, max_km = discount.get("min_distance_km"), discount.get("max_distance_km")
+        min_price, max_price = discount.get("min_order_value"), discount.get("max_order_value")
+        if min_km:
+            eligible &= distances >= min_km
+        if max_km:
+            eligible &= distances <= max_km
+        if min_price:
+            eligible &= net >= min_price
+        if max_price:
+            eligible &= net <= max_price
+
+        amount = discount_amount_array(discount, net, distances)
+        applied = eligible & (amount > 0)
+        current = np.maximum(net - amount, DISCOUNT_MIN_NET)
+
+        # Hidden discounts still change the price but are not itemised
+        shown = 0.0 if discount.get("hide_from_customer") else round_half_up_array(amount)
+        result["discount_amount"] = np.where(applied, shown, 0.0)
+        result["final_net"] = np.where(applied, round_half_up_array(current), net)
+        result["final_vat"] = np.where(applied, round_half_up_array(current * DISCOUNT_VAT_RATE), vat)
+        result["final_gross"] = np.where(applied, round_half_up_array(current * (1 + DISCOUNT_VAT_RATE)), gross)
+
+    return {field: result[field].tolist() for field in PRICE_FIELDS}
+
+
+def price_batch_scalar(
+    distances: Sequence[float],
+    metro: Sequence[bool],
+    discount: Optional[Dict] = None,
+    return_leg: bool = False
+) -> Dict[str, List[float]]:
+    """Reference implementation: one price_from_km_with_discounts call per distance"""
+    from models.discount import DiscountRuleSet
+
+    # Only the chosen discount, as if it were the sole active global discount
+    rules = DiscountRuleSet([{"id": None, "name": "", **discount, "scope": DiscountModel.SCOPE_GLOBAL, "active": True,
+                              "allowed_pickup_cities": [], "allowed_dropoff_cities": [], "excluded_cities": [],
+                              "valid_from": None, "valid_until": None, "max_uses_total": None}] if discount else [])
+    # Addresses only feed the metro check
+    metro_addr, other_addr = "Helsinki", ""
+
+    result = {field: [] for field in PRICE_FIELDS}
+    for distance_km, is_metro in zip(distances, metro):
+        address = metro_addr if is_metro else other_addr
+        pricing = order_service.price_from_km_with_discounts(
+            float(distance_km),
+            pickup_addr=address,
+            dropoff_addr=address,
+            return_leg=return_leg,
+            discount_rules=rules
+        )
+        for field in PRICE_FIELDS:
+            result[field].append(pricing[field])
+    return result
@@ -0,0 +1,181 @@
+"""
+SMTP Connection Pool
+Keeps authenticated Flask-Mail SMTP sessions open between sends so bulk and
+fan-out email pays the SSL handshake and AUTH once per session instead of once
+per message. Idle sessions are closed before the server drops them, and a send
+that fails on a dead or refusing session is retried once on a fresh one.
+"""
+
+import os
+import time
+import smtplib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Idle sessions kept open per worker process
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# Close sessions unused this long (keep below the server's idle disconnect)
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+# Reconnect after this many messages on one session
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+# Errors after which the session is discarded and the message retried on a new one
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError)
+
+
+class SMTPConnectionPool:
+    """Pool of open Flask-Mail connections for one Mail instance"""
+
+    def __init__(self, mail=None, size: int = None, idle_timeout: float = None, max_messages: int = None):
+        self.mail = mail
+        self.size = SMTP_POOL_SIZE if size is None else size
+        self.idle_timeout = SMTP_IDLE_TIMEOUT_SECONDS if idle_timeout is None else idle_timeout
+        self.max_messages = SMTP_MAX_MESSAGES_PER_CONNECTION if max_messages is None else max_messages
+        self._idle = []  # [(connection, messages_sent, last_used)]
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._stats = {"opened": 0, "reused": 0, "closed_idle": 0, "reconnects": 0, "sent": 0, "errors": 0}
+
+    def send(self, message):
+        """Send one flask_mail Message; raises if it fails on a fresh session too"""
+        error = self.send_many([message])[0]
+        if error is not None:
+            raise error
+
+    def send_many(self, messages: List) -> List[Optional[Exception]]:
+        """
+        Send messages back to back on one session (needs an app context).
+        Returns None or the exception per message, in order.
+        """
+        results = []
+        with self._session() as session:
+            for message in messages:
+                results.append(self._send_on(session, message))
+        return results
+
+    def close_idle(self, force: bool = False) -> int:
+        """Quit sessions idle longer than the timeout (all of them if force)"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_fork()
+            expired = [item for item in self._idle if force or now - item[2] >= self.idle_timeout]
+            self._idle = [item for item in self._idle if item not in expired]
+            self._stats["closed_idle"] += len(expired)
+        for connection, _, _ in expired:
+            self._quit(connection)
+        return len(expired)
+
+    @contextmanager
+    def _session(self):
+        # [connection, messages_sent, connect_error] so _send_on can swap in a fresh connection
+        session = [None, 0, None]
+        session[0], session[1] = self._checkout()
+        try:
+            yield session
+        except BaseException:
+            self._quit(session[0])
+            raise
+        self._checkin(session[0], session[1])
+
+    def _send_on(self, session, message) -> Optional[Exception]:
+        if session[2] is not None:
+            # Server unreachable for this batch: fail the rest without reconnecting per message
+            self._count("errors")
+            return session[2]
+        for attempt in (1, 2):
+            try:
+                if session[0] is None:
+                    try:
+                        session[0], session[1] = self._open(), 0
+                    except RECONNECT_ERRORS as e:
+                        if attempt == 2:
+                            session[2] = e
+                        raise
+                session[0].send(message)
+                session[1] += 1
+                self._count("sent")
+                if session[1] >= self.max_messages:
+                    self._quit(session[0])
+                    session[0] = None
+                return None
+            except smtplib.SMTPRecipientsRefused as e:
+                # Rejected addresses; the session itself is fine
+                self._count("errors")
+                return e
+            except RECONNECT_ERRORS as e:
+                self._quit(session[0])
+                session[0] = None
+                if attempt == 2:
+                    self._count("errors")
+                    return e
+                self._count("reconnects")
+                print(f"[SMTP POOL] Reconnecting after error: {e}")
+            except Exception as e:
+                # Invalid message (no recipients, bad headers): nothing reached the server
+                self._count("errors")
+                return e
+
+    def _checkout(self):
+        now = time.monotonic()
+        stale = []
+        found = None
+        with self._lock:
+            self._check_fork()
+            while self._idle:
+                connection, sent, last_used = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    found = (connection, sent)
+                    self._stats["reused"] += 1
+                    break
+                stale.append(connection)
+                self._stats["closed_idle"] += 1
+        for connection in stale:
+            self._quit(connection)
+        return found or (None, 0)
+
+    def _checkin(self, connection, sent: int):
+        if connection is None:
+            return
+        with self._lock:
+            self._check_fork()
+            if len(self._idle) < self.size:
+                self._idle.append((connection, sent, time.monotonic()))
+                return
+        self._quit(connection)
+
+    def _open(self):
+        """New logged-in session (no socket at all when the Mail instance suppresses sending)"""
+        connection = self.mail.connect()
+        connection.__enter__()
+        self._count("opened")
+        return connection
+
+    @staticmethod
+    def _quit(connection):
+        if connection is None or connection.host is None:
+            return
+        try:
+            connection.host.quit()
+        except Exception:
+            try:
+                connection.host.close()
+            except Exception:
+                pass
+        connection.host = None
+
+    def _check_fork(self):
+        # Sockets inherited from a parent process belong to the parent; forget them (lock held)
+        if self._pid != os.getpid():
+            self._idle = []
+            self._pid = os.getpid()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        return stats
@@ -0,0 +1,66 @@
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+from services.address_index import AddressIndex, build_index, collect_addresses
+from services.autocomplete_service import AutocompleteService
+from services.maps_client import maps_client
+
+ADDRESSES = (
+    "Mannerheimintie 12, Helsinki\tplace-12\n"
+    "Mannerheimintie 1, Helsinki\n"
+    "Mannerheimintie  1,   Helsinki\tplace-1\n"
+    "Mannerheimintie 1, Helsinki\n"
+    "Hämeenkatu 2, Tampere\n"
+    "xy\n"
+)
+
+
+class TestAddressIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "addresses.txt")
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write(ADDRESSES)
+        self.path = os.path.join(self.tmp.name, "address_index.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_from_curated_file_only(self):
+        self.assertEqual(build_index(self.path, collect_addresses(self.source)), 3)
+
+        index = AddressIndex(self.path)
+        self.assertEqual(len(index), 3)
+        predictions = index.search("MANNERHEIMINTIE 1")
+        # Listed three times, so ranked first; the place_id variant wins over plain text
+        self.assertEqual([p["description"] for p in predictions],
+                         ["Mannerheimintie 1, Helsinki", "Mannerheimintie 12, Helsinki"])
+        self.assertEqual(predictions[0]["place_id"], "place-1")
+        self.assertEqual(predictions[0]["structured_formatting"]["secondary_text"], "Helsinki")
+        self.assertEqual(index.search("tampere"), [])
+
+    def test_autocomplete_falls_back_to_google_on_index_miss(self):
+        build_index(self.path, collect_addresses(self.source))
+        service = AutocompleteService()
+        google = {"status": "OK", "predictions": [{"description": "Aleksanterinkatu 5, Helsinki", "place_id": "g"}]}
+
+        with patch("services.autocomplete_service.address_index", AddressIndex(self.path)), \
+                patch.object(maps_client, "get", return_value=google) as upstream:
+            predictions, source = service.get_predictions("Hämeenkatu")
+            self.assertEqual((source, predictions[0]["description"]), ("local", "Hämeenkatu 2, Tampere"))
+            upstream.assert_not_called()
+
+            self.assertEqual(service.get_predictions("Aleksanterinkatu 5"), (google["predictions"], "google"))
+            # Worldwide scope never uses the Finnish index
+            self.assertEqual(service.get_predictions("Hämeenkatu", scope="all")[1], "google")
+        self.assertEqual(upstream.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
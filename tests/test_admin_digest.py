@@ -0,0 +1,105 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timezone
+import mongomock
+from flask import Flask
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+os.environ["FLASK_ENV"] = "testing"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from services.email_service import email_service
+    from services.email_outbox_worker import email_outbox_worker
+    from services.admin_digest_service import admin_digest_service
+
+ORDER = {"id": 7, "pickup_address": "Mannerheimintie 1, Helsinki", "dropoff_address": "Hämeenkatu 2, Tampere",
+         "distance_km": 176.4, "reg_number": "ABC-123"}
+
+
+class TestAdminDigest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = Flask(__name__, template_folder=os.path.join(os.getcwd(), "templates"))
+        cls.app.testing = True
+        email_service.configure_mail(cls.app)
+        email_outbox_worker.init_app(cls.app, start=False)
+
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("email_outbox", "admin_notification_digests"):
+            self.db[name].drop()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def _outbox(self):
+        return list(self.db.email_outbox.find())
+
+    def test_driver_steps_become_one_email(self):
+        steps = ["JOB_ACCEPTED", "ARRIVED_PICKUP", "PICKUP_IMAGES_COMPLETE", "STARTED_TRANSIT",
+                 "ARRIVED_DELIVERY", "DELIVERY_IMAGES_COMPLETE"]
+        for step in steps:
+            self.assertTrue(email_service.send_admin_driver_progress_notification(
+                7, "Kalle Kuski", step, ORDER, metadata={"count": 4}
+            ))
+        self.assertTrue(email_service.send_admin_driver_action_notification(7, "Kalle Kuski", "IN_TRANSIT", ORDER))
+
+        # Still inside the window: nothing queued for SMTP yet
+        self.assertEqual(admin_digest_service.flush_due(), 0)
+        self.assertEqual(self._outbox(), [])
+
+        # Completion is urgent and sends the digest at once
+        email_service.send_admin_driver_progress_notification(7, "Kalle Kuski", "MARKED_COMPLETE", ORDER)
+        self.assertEqual(admin_digest_service.flush_due(), 1)
+
+        outbox = self._outbox()
+        self.assertEqual(len(outbox), 1)
+        self.assertIn("(8 tapahtumaa)", outbox[0]["subject"])
+        text = outbox[0]["text_body"]
+        self.assertIn("Kalle Kuski on lisännyt 4 noutokuvaa", text)
+        self.assertIn("Kuljettaja on aloittanut kuljetuksen", text)
+        self.assertLess(text.index("ottanut työn vastaan"), text.index("merkinnyt toimituksen valmiiksi"))
+        self.assertEqual(self.db.admin_notification_digests.count_documents({}), 0)
+
+    def test_window_flush_per_order(self):
+        email_service.send_admin_driver_progress_notification(7, "Kalle Kuski", "JOB_ACCEPTED", ORDER)
+        email_service.send_admin_driver_progress_notification(8, "Ville Kuski", "JOB_ACCEPTED", dict(ORDER, id=8))
+        email_service.send_admin_driver_progress_notification(8, "Ville Kuski", "ARRIVED_PICKUP", dict(ORDER, id=8))
+        self.assertEqual(admin_digest_service.flush_due(), 0)
+
+        # Window closed
+        self.db.admin_notification_digests.update_many({}, {"$set": {"flush_at": datetime.now(timezone.utc)}})
+        self.assertEqual(admin_digest_service.flush_due(), 2)
+        subjects = sorted(message["subject"] for message in self._outbox())
+        self.assertEqual(subjects, [
+            "[Levoro] Kuljettajan eteneminen - Tilaus #7 - Kalle Kuski on ottanut työn vastaan",
+            "[Levoro] Kuljettajan eteneminen - Tilaus #8 (2 tapahtumaa)",
+        ])
+
+    def test_failed_flush_keeps_events(self):
+        email_service.send_admin_driver_progress_notification(7, "Kalle Kuski", "JOB_ACCEPTED", ORDER, urgent=True)
+        with patch.object(email_service, "send_email", return_value=False):
+            self.assertEqual(admin_digest_service.flush_due(), 0)
+        email_service.send_admin_driver_progress_notification(7, "Kalle Kuski", "ARRIVED_PICKUP", ORDER, urgent=True)
+        self.assertEqual(admin_digest_service.flush_due(), 1)
+        self.assertIn("(2 tapahtumaa)", self._outbox()[0]["subject"])
+
+    def test_digests_off_sends_every_event(self):
+        with patch.object(admin_digest_service, "window_seconds", 0):
+            email_service.send_admin_driver_progress_notification(7, "Kalle Kuski", "JOB_ACCEPTED", ORDER)
+        self.assertEqual(len(self._outbox()), 1)
+        self.assertEqual(self.db.admin_notification_digests.count_documents({}), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
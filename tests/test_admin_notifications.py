@@ -0,0 +1,82 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import datetime
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.order import order_model, OrderModel
+    from models.rating import rating_model
+    from models.driver_application import driver_application_model
+    from services.admin_notification_service import (
+        admin_notification_service, KIND_ORDERS, KIND_REVIEWS, KIND_APPLICATIONS
+    )
+
+
+class TestAdminNotifications(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("orders", "order_counters", "ratings", "driver_applications", "counters"):
+            self.db[name].drop()
+        admin_notification_service.invalidate()
+
+    def _loads(self):
+        return admin_notification_service.get_stats()["loads"]
+
+    def _create_order(self):
+        order, error = order_model.create_order(1, {"pickup_address": "A", "dropoff_address": "B"})
+        self.assertIsNone(error)
+        return order
+
+    def test_badges_follow_writes_without_reloading(self):
+        first = self._create_order()
+        self.db.ratings.insert_one({"id": 1, "status": "pending", "created_at": datetime.datetime(2026, 1, 1)})
+        self.assertEqual(
+            admin_notification_service.get_badges(),
+            {KIND_ORDERS: 1, KIND_REVIEWS: 1, KIND_APPLICATIONS: 0}
+        )
+        loads = self._loads()
+
+        second = self._create_order()
+        order_model.update_status(first["id"], OrderModel.STATUS_CONFIRMED)
+        driver_application_model.create_application({"email": "kuski@example.com"})
+        rating_model.moderate_review(1, rating_model.STATUS_APPROVED, admin_id=1)
+
+        self.assertEqual(
+            admin_notification_service.get_badges(),
+            {KIND_ORDERS: 1, KIND_REVIEWS: 0, KIND_APPLICATIONS: 1}
+        )
+        order_model.delete_order(second["id"])
+        self.assertEqual(admin_notification_service.get_badges()[KIND_ORDERS], 0)
+        self.assertEqual(self._loads(), loads)
+
+        # Processing an application reloads just that snapshot
+        driver_application_model.approve_application(1, processed_by=1)
+        self.assertEqual(admin_notification_service.get_badges()[KIND_APPLICATIONS], 0)
+        self.assertEqual(self._loads(), loads + 1)
+
+    def test_last_viewed_offsets_applied_in_memory(self):
+        old = self._create_order()
+        self.db.orders.update_one({"id": old["id"]}, {"$set": {"created_at": datetime.datetime(2026, 1, 1)}})
+        admin_notification_service.invalidate()
+        self._create_order()
+
+        # Session values may be naive or aware
+        viewed = datetime.datetime(2026, 2, 1)
+        self.assertEqual(admin_notification_service.get_badges({KIND_ORDERS: viewed})[KIND_ORDERS], 1)
+        viewed = datetime.datetime.now(datetime.timezone.utc)
+        self.assertEqual(admin_notification_service.get_badges({KIND_ORDERS: viewed})[KIND_ORDERS], 0)
+        self.assertEqual(admin_notification_service.get_badges()[KIND_ORDERS], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
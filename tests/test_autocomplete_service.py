@@ -0,0 +1,137 @@
+import sys
+import os
+import time
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+from services.autocomplete_service import AutocompleteService, AutocompleteSuperseded, PrefixCache
+from services.address_index import address_index
+from services.maps_client import maps_client
+
+PREDICTION = {"description": "Mannerheimintie 12, Helsinki", "place_id": "abc"}
+
+
+def google_reply(params):
+    return {"status": "OK", "predictions": [dict(PREDICTION, query=params["input"])]}
+
+
+class TestPrefixCache(unittest.TestCase):
+    def test_exact_and_prefix_hits(self):
+        cache = PrefixCache(10, 60)
+        cache.set("mannerheimintie 12", "fi", [PREDICTION])
+
+        self.assertEqual(cache.get("mannerheimintie 12", "fi"), ([PREDICTION], "exact"))
+        self.assertEqual(cache.get("mannerheimintie 1", "fi"), ([PREDICTION], "prefix"))
+        # Other scopes and longer queries are misses
+        self.assertEqual(cache.get("mannerheimintie 1", "all"), (None, None))
+        self.assertEqual(cache.get("mannerheimintie 123", "fi"), (None, None))
+
+    def test_empty_longer_entry_not_used_for_prefix(self):
+        cache = PrefixCache(10, 60)
+        cache.set("mannerheimintie 12x", "fi", [])
+        self.assertEqual(cache.get("mannerheimintie 12", "fi"), (None, None))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = PrefixCache(2, 60)
+        cache.set("aleksanterinkatu", "fi", [PREDICTION])
+        cache.set("bulevardi", "fi", [PREDICTION])
+        cache.get("aleksanterinkatu", "fi")
+        cache.set("citykatu", "fi", [PREDICTION])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("bulevardi", "fi"), (None, None))
+        self.assertEqual(cache.get("bule", "fi"), (None, None))
+
+        expired = PrefixCache(10, -1)
+        expired.set("bulevardi", "fi", [PREDICTION])
+        self.assertEqual(expired.get("bulevardi", "fi"), (None, None))
+
+
+class TestAutocompleteService(unittest.TestCase):
+    def setUp(self):
+        self.service = AutocompleteService()
+        self.index_path = patch.object(address_index, "path", "")
+        self.index_path.start()
+
+    def tearDown(self):
+        self.index_path.stop()
+
+    def test_cache_miss_goes_upstream_once_without_delay(self):
+        with patch.object(maps_client, "get", side_effect=lambda _, params: google_reply(params)) as upstream:
+            started = time.perf_counter()
+            predictions, source = self.service.get_predictions("Mannerheimintie 12", session_key="a")
+            self.assertLess(time.perf_counter() - started, 0.05)
+            self.assertEqual((source, predictions[0]["query"]), ("google", "Mannerheimintie 12"))
+
+            self.assertEqual(self.service.get_predictions("mannerheimintie  1", session_key="a")[1], "cache")
+        upstream.assert_called_once()
+
+        stats = self.service.get_stats()
+        self.assertEqual((stats["upstream_calls"], stats["prefix_hits"]), (1, 1))
+
+    def test_newer_query_supersedes_pending_retry(self):
+        release = threading.Event()
+        results = {}
+
+        def google(_, params):
+            if params["input"] == "Bulevardi 1":
+                release.wait(5)
+                raise ValueError("upstream failed")
+            return google_reply(params)
+
+        def lookup(session_key):
+            try:
+                results[session_key] = self.service.get_predictions("Bulevardi 1", session_key=session_key)
+            except AutocompleteSuperseded:
+                results[session_key] = "superseded"
+            except ValueError:
+                results[session_key] = "error"
+
+        with patch.object(maps_client, "get", side_effect=google) as upstream:
+            owner = threading.Thread(target=lookup, args=("b",))
+            owner.start()
+            while not upstream.called:
+                time.sleep(0.005)
+            waiter = threading.Thread(target=lookup, args=("a",))
+            waiter.start()
+            while self.service.get_stats()["coalesced"] == 0:
+                time.sleep(0.005)
+
+            # Session a types on while its first query waits for the shared call
+            self.assertEqual(self.service.get_predictions("Bulevardi 12", session_key="a")[1], "google")
+            release.set()
+            owner.join(5)
+            waiter.join(5)
+
+        # The failed shared call is not retried for the stale query
+        self.assertEqual(upstream.call_count, 2)
+        self.assertEqual(results, {"b": "error", "a": "superseded"})
+
+    def test_identical_concurrent_queries_share_one_call(self):
+        release = threading.Event()
+        results = []
+
+        def slow_google(_, params):
+            release.wait(5)
+            return google_reply(params)
+
+        with patch.object(maps_client, "get", side_effect=slow_google) as upstream:
+            threads = [threading.Thread(target=lambda key=key: results.append(
+                self.service.get_predictions("Hämeenkatu 2", session_key=key)[1])) for key in ("a", "b", "c")]
+            for thread in threads:
+                thread.start()
+            while self.service.get_stats()["coalesced"] < 2:
+                time.sleep(0.005)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        upstream.assert_called_once()
+        self.assertEqual(sorted(results), ["coalesced", "coalesced", "google"])
+
+
+if __name__ == "__main__":
+    unittest.main()
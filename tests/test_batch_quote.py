@@ -0,0 +1,63 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from services.order_service import order_service
+
+
+class TestBatchQuote(unittest.TestCase):
+    def quote(self, items):
+        with patch.object(order_service, "route_km", return_value=42.0) as route_km:
+            results = sorted(order_service.batch_quote(items), key=lambda result: result["index"])
+        return results, route_km
+
+    def test_malformed_items_fail_individually(self):
+        items = [
+            {"pickup": "Mannerheimintie 1, Helsinki", "dropoff": "Hämeenkatu 2, Tampere"},
+            {"pickup": 123, "dropoff": "Hämeenkatu 2, Tampere"},
+            {"pickup": "Mannerheimintie 1, Helsinki", "dropoff": None},
+            {"pickup": {"street": "Mannerheimintie 1"}, "dropoff": "Tampere"},
+            {"pickup": "Helsinki", "dropoff": "Tampere", "pickup_place_id": ["x"]},
+            {"pickup": "Helsinki", "dropoff": "Tampere", "return_leg": "yes"},
+            "Helsinki - Tampere",
+            None,
+            {"pickup": " mannerheimintie 1,  helsinki ", "dropoff": "Hämeenkatu 2, Tampere", "return_leg": None},
+        ]
+        results, route_km = self.quote(items)
+
+        self.assertEqual([result["index"] for result in results], list(range(len(items))))
+        for index in (0, 8):
+            self.assertEqual(results[index]["km"], 42.0)
+            self.assertIn("final_gross", results[index]["pricing"])
+        errors = {result["index"]: result["error"] for result in results if "error" in result}
+        self.assertEqual(sorted(errors), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(errors[2], "Lähtö- ja kohdeosoite vaaditaan")
+        self.assertEqual(errors[1], "Virheellinen osoite")
+        # Items 0 and 8 are the same leg and share one route lookup
+        route_km.assert_called_once()
+
+    def test_routing_failure_is_per_leg(self):
+        def route_km(pickup, dropoff, *_):
+            if dropoff == "Utsjoki":
+                raise ValueError("Reitin laskenta epäonnistui")
+            return 10.0
+
+        items = [{"pickup": "Helsinki", "dropoff": "Utsjoki"}, {"pickup": "Helsinki", "dropoff": "Espoo"}]
+        with patch.object(order_service, "route_km", side_effect=route_km):
+            results = sorted(order_service.batch_quote(items), key=lambda result: result["index"])
+        self.assertEqual(results[0], {"index": 0, "error": "Reitin laskenta epäonnistui"})
+        self.assertEqual(results[1]["km"], 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import unittest
+import threading
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager, counter_manager, CounterManager
+    from models.user import user_model
+
+
+class TestCounterManager(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("counters", "users", "orders", "ratings"):
+            self.db[name].drop()
+        counter_manager.forget()
+
+    def test_blocks_cut_round_trips(self):
+        self.db.ratings.insert_one({"id": 7})
+        manager = CounterManager(block_size=10, sequential=())
+
+        ids = [manager.get_next_id("ratings") for _ in range(25)]
+        self.assertEqual(ids, list(range(8, 33)))
+        # One existence check plus three block reservations
+        self.assertEqual(manager.get_stats()["round_trips"], 4)
+        self.assertEqual(self.db.counters.find_one({"_id": "ratings"})["value"], 37)
+
+    def test_workers_never_share_ids(self):
+        workers = [CounterManager(block_size=5, sequential=()) for _ in range(3)]
+        seen = []
+        lock = threading.Lock()
+
+        def allocate(manager):
+            for _ in range(40):
+                value = manager.get_next_id("ratings")
+                with lock:
+                    seen.append(value)
+
+        threads = [threading.Thread(target=allocate, args=(manager,)) for manager in workers for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(seen), 240)
+        self.assertEqual(len(set(seen)), 240)
+
+    def test_sequential_ids_are_gap_free(self):
+        manager = CounterManager(block_size=50, sequential=("orders",))
+        first = manager.get_next_id("orders")
+        second = manager.get_next_id("orders")
+        self.assertEqual((first, second), (1, 2))
+
+        # A failed insert hands its number back; an older one cannot be
+        self.assertFalse(manager.release_id("orders", first))
+        self.assertTrue(manager.release_id("orders", second))
+        self.assertEqual(manager.get_next_id("orders"), 2)
+
+    def test_resync_moves_forward_only(self):
+        self.db.users.create_index("id", unique=True)
+        self.db.users.insert_one({"id": 3, "email": "a@example.com"})
+        self.db.counters.insert_one({"_id": "users", "value": 2})
+
+        # Counter behind the data: the duplicate is resolved by a resync and retry
+        user, error = user_model.create_user("b@example.com", "salasana1", "Bea")
+        self.assertIsNone(error)
+        self.assertGreater(user["id"], 3)
+
+        # Another worker's reserved block above the data is never handed out again
+        self.db.counters.update_one({"_id": "users"}, {"$set": {"value": 500}})
+        self.assertEqual(db_manager.sync_counter("users", "users", "id"), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+from flask import Flask, g, session
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.user import user_model
+    from services.auth_service import auth_service
+
+
+class TestCurrentUserCache(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        self.db.users.drop()
+        self.db.users.insert_one({"id": 5, "email": "a@example.com", "name": "Alku", "role": "admin", "status": "active"})
+        user_model.invalidate_cached()
+        self.app = Flask(__name__)
+        self.app.secret_key = "test"
+        self.ctx = None
+
+    def tearDown(self):
+        if self.ctx:
+            self.ctx.pop()
+
+    def _request(self):
+        """Start a new request (with its own flask.g) for uid 5"""
+        if self.ctx:
+            self.ctx.pop()
+        self.ctx = self.app.test_request_context("/")
+        self.ctx.push()
+        session["uid"] = 5
+
+    def test_request_memo_and_cross_request_cache(self):
+        with patch.object(user_model, "find_by_id", wraps=user_model.find_by_id) as find_by_id:
+            self._request()
+            for _ in range(4):
+                self.assertEqual(auth_service.get_current_user()["name"], "Alku")
+            self.assertEqual(find_by_id.call_count, 1)
+            self.assertEqual(g.user_lookups_saved, 3)
+
+            # Next request is served from the snapshot cache
+            self._request()
+            auth_service.get_current_user()
+            auth_service.get_current_user()
+            self.assertEqual(find_by_id.call_count, 1)
+            self.assertEqual(g.user_lookups_saved, 2)
+
+    def test_writes_invalidate_memo_and_cache(self):
+        self._request()
+        auth_service.get_current_user()
+
+        user_model.update_user_profile(5, name="Uusi")
+        self.assertEqual(auth_service.get_current_user()["name"], "Uusi")
+
+        user_model.update_one({"id": 5}, {"$set": {"status": "frozen"}})
+        self._request()
+        self.assertEqual(auth_service.get_current_user()["status"], "frozen")
+
+        user_model.deny_user(5)
+        self.assertIsNone(auth_service.get_current_user())
+
+    def test_cached_copies_are_independent(self):
+        self._request()
+        auth_service.get_current_user()["name"] = "Muutettu"
+        self._request()
+        self.assertEqual(auth_service.get_current_user()["name"], "Alku")
+
+
+if __name__ == "__main__":
+    unittest.main()
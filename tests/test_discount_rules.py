@@ -0,0 +1,120 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import datetime
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.discount import DiscountModel
+
+
+class TestDiscountRules(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        self.db.discounts.drop()
+        self.db.counters.drop()
+        self.model = DiscountModel()
+
+    def _create(self, **fields):
+        data = {"name": "Alennus", "type": DiscountModel.TYPE_PERCENTAGE, "value": 10, "scope": DiscountModel.SCOPE_GLOBAL}
+        data.update(fields)
+        discount, error = self.model.create_discount(data)
+        self.assertIsNone(error)
+        return discount
+
+    def _ids(self, **kwargs):
+        params = {"user_id": None, "distance_km": 100.0, "base_price": 80.0}
+        params.update(kwargs)
+        return [d["id"] for d in self.model.get_applicable_discounts(**params)]
+
+    def test_scope_buckets(self):
+        glob = self._create(priority=5)
+        account = self._create(scope=DiscountModel.SCOPE_ACCOUNT, assigned_users=[7], priority=1)
+        code = self._create(scope=DiscountModel.SCOPE_CODE, code="kevat", priority=3)
+        first = self._create(scope=DiscountModel.SCOPE_FIRST_ORDER, priority=2)
+
+        self.assertEqual(self._ids(), [glob["id"]])
+        # Priority order across buckets
+        self.assertEqual(
+            self._ids(user_id=7, promo_code=" Kevat ", is_first_order=True),
+            [account["id"], first["id"], code["id"], glob["id"]]
+        )
+
+    def test_missing_priority_sorts_first_like_the_query(self):
+        ranked = self._create(priority=1)
+        legacy = self._create()
+        self.db.discounts.update_one({"id": legacy["id"]}, {"$unset": {"priority": ""}})
+        self.model.invalidate_rules()
+
+        queried = [d["id"] for d in self.db.discounts.find({"active": True}).sort([("priority", 1)])]
+        self.assertEqual(queried, [legacy["id"], ranked["id"]])
+        self.assertEqual(self._ids(), queried)
+
+    def test_usage_invalidates_only_when_exhausted(self):
+        unlimited = self._create()
+        limited = self._create(max_uses_total=2)
+        self.assertEqual(self._ids(), [unlimited["id"], limited["id"]])
+        compiles = self.model.get_rules_stats()["compiles"]
+
+        self.assertTrue(self.model.increment_usage(unlimited["id"]))
+        self.assertTrue(self.model.increment_usage(limited["id"]))
+        self.assertEqual(self._ids(), [unlimited["id"], limited["id"]])
+        self.assertEqual(self.model.get_rules_stats()["compiles"], compiles)
+
+        # The last allowed use drops the discount from the compiled rules
+        self.model.increment_usage(limited["id"])
+        self.assertEqual(self._ids(), [unlimited["id"]])
+        self.assertEqual(self.model.get_rules_stats()["compiles"], compiles + 1)
+
+    def test_conditions_are_precompiled(self):
+        limited = self._create(
+            min_distance_km=50, max_distance_km=200, max_order_value=100,
+            allowed_pickup_cities=["Helsinki"], excluded_cities=["Turku"]
+        )
+        self.assertEqual(self._ids(pickup_city="HELSINKI"), [limited["id"]])
+        self.assertEqual(self._ids(pickup_city="helsinki", dropoff_city="turku"), [])
+        self.assertEqual(self._ids(pickup_city="espoo"), [])
+        self.assertEqual(self._ids(pickup_city="helsinki", distance_km=20.0), [])
+        self.assertEqual(self._ids(pickup_city="helsinki", base_price=120.0), [])
+
+    def test_validity_window_checked_at_match_time(self):
+        now = datetime.datetime.utcnow()
+        self._create(valid_from=now + datetime.timedelta(days=1))
+        self._create(valid_until=now - datetime.timedelta(days=1))
+        self.assertEqual(self._ids(), [])
+
+    def test_writes_invalidate_compiled_rules(self):
+        discount = self._create()
+        self.assertEqual(self._ids(), [discount["id"]])
+        version = self.model.get_rules().version
+
+        self.model.deactivate(discount["id"])
+        self.assertEqual(self._ids(), [])
+        self.model.activate(discount["id"])
+        self.model.update_discount(discount["id"], {"min_distance_km": 300})
+        self.assertEqual(self._ids(), [])
+        self.assertGreater(self.model.get_rules().version, version)
+
+    def test_other_workers_pick_up_version_bump(self):
+        discount = self._create()
+        other_worker = DiscountModel()
+        self.assertEqual(len(other_worker.get_rules().match(None, 100.0, 80.0)), 1)
+
+        self.model.deactivate(discount["id"])
+        # Until the next version check the other worker serves its compiled set without DB access
+        self.assertEqual(len(other_worker.get_rules().match(None, 100.0, 80.0)), 1)
+        other_worker._rules_checked_at = 0.0
+        self.assertEqual(other_worker.get_rules().match(None, 100.0, 80.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
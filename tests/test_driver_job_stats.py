@@ -0,0 +1,77 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager, counter_manager
+    from models.order import order_model
+    from services.driver_service import driver_service
+    from services.email_service import email_service
+
+
+class TestDriverJobStats(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("orders", "order_counters", "user_order_stats", "counters", "users"):
+            self.db[name].drop()
+        counter_manager.forget()
+        order_model.invalidate_driver_stats()
+
+        # One order per status for driver 10, plus a delivered and an unassigned order
+        statuses = order_model.DRIVER_ACTIVE_STATUSES + [order_model.STATUS_DELIVERED, order_model.STATUS_CANCELLED]
+        self.db.orders.insert_many(
+            [{"id": i, "user_id": 1, "driver_id": 10, "status": status} for i, status in enumerate(statuses, start=1)]
+            + [{"id": 50, "user_id": 1, "driver_id": 11, "status": order_model.STATUS_DELIVERED},
+               {"id": 51, "user_id": 1, "status": order_model.STATUS_CONFIRMED, "driver_reward": 20.0}]
+        )
+        self.active = len(order_model.DRIVER_ACTIVE_STATUSES)
+
+    def _counts(self, driver_id):
+        stats = order_model.get_driver_job_stats().get(driver_id, {})
+        return tuple(stats.get(key, 0) for key in ("total_jobs", "completed_jobs", "active_jobs"))
+
+    def test_grouped_counts(self):
+        stats = order_model.get_driver_job_stats()
+        self.assertEqual(set(stats), {10, 11})
+        self.assertEqual(self._counts(10), (self.active + 2, 1, self.active))
+        self.assertEqual(self._counts(11), (1, 1, 0))
+        for status in order_model.DRIVER_ACTIVE_STATUSES:
+            self.assertEqual(stats[10]["by_status"][status], 1)
+
+    def test_counts_refresh_after_each_write(self):
+        self.assertEqual(self._counts(10), (self.active + 2, 1, self.active))
+
+        # Cached: a raw write is not seen until something invalidates
+        self.db.orders.insert_one({"id": 60, "driver_id": 10, "status": order_model.STATUS_IN_TRANSIT})
+        self.assertEqual(self._counts(10), (self.active + 2, 1, self.active))
+        self.db.orders.delete_one({"id": 60})
+
+        order_model.update_status(1, order_model.STATUS_DELIVERED)
+        self.assertEqual(self._counts(10), (self.active + 2, 2, self.active - 1))
+
+        order_model.update_driver_status(2, order_model.STATUS_DELIVERED)
+        self.assertEqual(self._counts(10), (self.active + 2, 3, self.active - 2))
+
+        order_model.assign_driver(50, 10)
+        self.assertEqual(self._counts(10), (self.active + 3, 3, self.active - 1))
+        self.assertEqual(self._counts(11), (0, 0, 0))
+
+        with patch.object(email_service, "send_admin_driver_progress_notification"):
+            self.assertEqual(driver_service.accept_job(51, 11), (True, None))
+        self.assertEqual(self._counts(11), (1, 0, 1))
+
+        order_model.delete_order(51)
+        self.assertEqual(self._counts(11), (0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timezone, timedelta
+import mongomock
+from flask import Flask
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+os.environ["FLASK_ENV"] = "testing"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.email_outbox import email_outbox_model, EMAIL_OUTBOX_MAX_ATTEMPTS
+    from services.email_service import email_service
+    from services.email_outbox_worker import email_outbox_worker
+
+
+class TestEmailOutbox(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = Flask(__name__)
+        # TESTING suppresses real SMTP; record_messages still sees every send
+        cls.app.testing = True
+        email_service.configure_mail(cls.app)
+        email_outbox_worker.init_app(cls.app, start=False)
+
+    def setUp(self):
+        self.db = db_manager.db
+        self.db.email_outbox.drop()
+        email_service.smtp_pool.close_idle(force=True)
+
+    def _send(self, count):
+        with self.app.app_context():
+            for n in range(count):
+                self.assertTrue(email_service.send_email(f"Tilaus {n}", [f"asiakas{n}@example.com"], f"<p>Hei {n}</p>"))
+
+    def test_send_email_only_enqueues(self):
+        with self.app.app_context(), email_service.mail.record_messages() as outbox:
+            self._send(3)
+            self.assertEqual(outbox, [])
+        self.assertEqual(email_outbox_model.get_queue_stats()["pending"], 3)
+
+    def test_worker_sends_batch_over_one_connection(self):
+        self._send(3)
+        connect = email_service.mail.connect
+        with self.app.app_context(), email_service.mail.record_messages() as outbox, \
+                patch.object(email_service.mail, "connect", side_effect=connect) as connects:
+            self.assertEqual(email_outbox_worker.drain(), 3)
+        self.assertEqual(connects.call_count, 1)
+        self.assertEqual(sorted(msg.subject for msg in outbox), ["Tilaus 0", "Tilaus 1", "Tilaus 2"])
+        self.assertEqual(outbox[0].body, "Hei 0")
+        self.assertEqual(self.db.email_outbox.count_documents({"status": "sent", "sent_at": {"$ne": None}}), 3)
+
+    def test_failures_back_off_then_give_up(self):
+        self._send(1)
+        with patch.object(email_service, "deliver_batch", return_value=["421 try again later"]):
+            self.assertEqual(email_outbox_worker.run_once(), 1)
+            message = self.db.email_outbox.find_one()
+            self.assertEqual((message["status"], message["attempts"]), ("pending", 1))
+            self.assertEqual(message["last_error"], "421 try again later")
+            # Not due again until the backoff has passed
+            self.assertEqual(email_outbox_worker.run_once(), 0)
+
+            for _ in range(EMAIL_OUTBOX_MAX_ATTEMPTS - 1):
+                self.db.email_outbox.update_one({}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+                email_outbox_worker.run_once()
+        self.assertEqual(self.db.email_outbox.find_one()["status"], "failed")
+
+        self.assertEqual(email_outbox_model.retry_failed(), 1)
+        with self.app.app_context(), email_service.mail.record_messages() as outbox:
+            email_outbox_worker.run_once()
+        self.assertEqual(len(outbox), 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        self._send(1)
+        claimed = email_outbox_model.claim_batch("kaatunut:1", 10)
+        self.assertEqual(len(claimed), 1)
+        # Claimed by a live worker: nobody else takes it
+        self.assertEqual(email_outbox_model.claim_batch("toinen:2", 10), [])
+
+        self.db.email_outbox.update_one({}, {"$set": {"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        reclaimed = email_outbox_model.claim_batch("toinen:2", 10)
+        self.assertEqual([(m["worker"], m["attempts"]) for m in reclaimed], [("toinen:2", 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
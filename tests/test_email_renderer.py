@@ -0,0 +1,52 @@
+import sys
+import os
+import unittest
+from flask import Flask
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+from services.email_renderer import EmailRenderer, html_to_text
+
+ORDER = {
+    "order_id": 42, "status": "Vahvistettu", "status_description": "Tilaus on vahvistettu",
+    "pickup_address": "Mannerheimintie 1, Helsinki", "dropoff_address": "Hämeenkatu 2, Tampere",
+    "vehicle_make": "Volvo", "vehicle_model": "V70", "price_gross": 125.5
+}
+
+
+class TestEmailRenderer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = Flask(__name__, template_folder=os.path.join(os.getcwd(), "templates"))
+        cls.renderer = EmailRenderer()
+        cls.compiled = cls.renderer.init_app(cls.app)
+
+    def test_every_email_has_a_text_template(self):
+        emails_dir = os.path.join(os.getcwd(), "templates", "emails")
+        for filename in os.listdir(emails_dir):
+            if filename.endswith(".html") and filename != "base_email.html":
+                with self.subTest(filename=filename):
+                    self.assertTrue(os.path.exists(os.path.join(emails_dir, "text", filename[:-5] + ".txt")))
+        self.assertGreaterEqual(self.compiled, 24)
+
+    def test_text_part_rendered_from_context(self):
+        with self.app.app_context():
+            html_body, text_body = self.renderer.render(
+                "status_update", user_name="Matti <Meikäläinen>", order=ORDER, new_status="CONFIRMED"
+            )
+        self.assertIn("Matti &lt;Meikäläinen&gt;", html_body)
+        self.assertIn("Hei Matti <Meikäläinen>!", text_body)
+        self.assertIn("Yhteensä sis. ALV: 125.50 €", text_body)
+        self.assertNotIn("<", text_body.replace("<Meikäläinen>", ""))
+        self.assertNotIn("\n\n\n", text_body)
+        self.assertEqual(self.renderer.get_stats()["text_fallbacks"], 0)
+
+    def test_fallback_skips_styles(self):
+        text = html_to_text("<html><head><style>p { color: red; }</style></head>"
+                            "<body><h1>Tilaus</h1><p>Nouto &amp; toimitus<br>huomenna</p></body></html>")
+        self.assertEqual(text, "Tilaus\nNouto & toimitus\nhuomenna")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timezone, timedelta
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.geocode_cache import geocode_cache_model
+    from services.order_service import order_service
+
+ADDRESS = "Mannerheimintie 1, Helsinki"
+COORDS = {"lat": 60.17, "lng": 24.94, "country_code": "FI"}
+
+
+class TestGeocodeLock(unittest.TestCase):
+    def setUp(self):
+        geocode_cache_model.collection.drop()
+        geocode_cache_model.locks.drop()
+        geocode_cache_model._memory.clear()
+        self.lock_key = geocode_cache_model.build_keys(ADDRESS, None)[0]
+
+    def _resolve(self):
+        with patch.object(order_service, "_fetch_geocode_upstream", return_value=dict(COORDS)) as upstream:
+            result = order_service._resolve_geocode(ADDRESS, None, require="lat")
+        self.assertEqual(result["lat"], COORDS["lat"])
+        return upstream
+
+    def test_own_lock_released(self):
+        self._resolve()
+        self.assertIsNone(geocode_cache_model.locks.find_one({"_id": self.lock_key}))
+
+    def test_wait_timeout_leaves_other_workers_lock(self):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+        geocode_cache_model.locks.insert_one({"_id": self.lock_key, "expires_at": expires_at})
+
+        with patch.object(geocode_cache_model, "wait_for", return_value=None):
+            upstream = self._resolve()
+
+        upstream.assert_called_once()
+        self.assertIsNotNone(geocode_cache_model.locks.find_one({"_id": self.lock_key}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+import mongomock
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from services.image_service import image_service
+    from services.gcs_service import gcs_service
+
+
+def upload(image, filename="kuva.jpg", fmt="JPEG"):
+    buffer = BytesIO()
+    image.save(buffer, fmt, quality=90)
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename=filename)
+
+
+class TestImagePipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = patch.object(image_service, "upload_folder", self.tmp.name)
+        self.folder.start()
+
+    def tearDown(self):
+        self.folder.stop()
+        self.tmp.cleanup()
+
+    def test_large_jpeg_decoded_in_draft_mode(self):
+        file = upload(Image.linear_gradient("L").resize((4000, 3000)).convert("RGB"))
+        with patch.object(Image.Image, "resize", autospec=True, side_effect=Image.Image.resize) as resize:
+            data, error = image_service.process_upload(file)
+        self.assertIsNone(error)
+        # Decoded at half scale (2000 px), not from the full 4000 px image
+        self.assertEqual(resize.call_args[0][0].size, (2000, 1500))
+        with Image.open(BytesIO(data)) as result:
+            self.assertEqual((result.format, result.size), ("JPEG", (1200, 900)))
+
+    def test_png_alpha_flattened(self):
+        file = upload(Image.new("RGBA", (300, 200), (255, 0, 0, 0)), filename="logo.png", fmt="PNG")
+        data, error = image_service.process_upload(file)
+        self.assertIsNone(error)
+        with Image.open(BytesIO(data)) as result:
+            self.assertEqual(result.mode, "RGB")
+            self.assertGreater(min(result.getpixel((10, 10))), 240)
+
+    def test_corrupt_upload_rejected(self):
+        good = upload(Image.new("RGB", (2000, 1500), (0, 90, 200)))
+        truncated = FileStorage(stream=BytesIO(good.stream.getvalue()[:2000]), filename="rikki.jpg")
+        data, error = image_service.process_upload(truncated)
+        self.assertIsNone(data)
+        self.assertIn("vioittunut", error)
+
+    def test_saved_once_locally_or_uploaded_from_memory(self):
+        info, error = image_service.save_order_image(upload(Image.new("RGB", (1600, 1200))), 5, "pickup", "kuski")
+        self.assertIsNone(error)
+        self.assertEqual(os.listdir(self.tmp.name), [info["filename"]])
+        self.assertEqual(os.path.getsize(os.path.join(self.tmp.name, info["filename"])), info["file_size"])
+
+        with patch.object(gcs_service, "enabled", True), \
+                patch.object(gcs_service, "upload_bytes", return_value=("https://storage.example/kuva.jpg", None)) as upload_bytes:
+            info, error = image_service.save_order_image(upload(Image.new("RGB", (1600, 1200))), 5, "delivery")
+        self.assertIsNone(error)
+        self.assertEqual(info["file_path"], "https://storage.example/kuva.jpg")
+        self.assertEqual(upload_bytes.call_args[0][1], f"orders/5/{info['filename']}")
+        self.assertEqual(len(upload_bytes.call_args[0][0]), info["file_size"])
+        # Nothing written to disk for the GCS upload
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
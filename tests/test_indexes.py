@@ -0,0 +1,352 @@
+import sys
+import os
+import copy
+import threading
+import unittest
+from unittest.mock import patch
+import mongomock
+import pymongo
+from pymongo import monitoring
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.indexes import IndexSpec, declared_indexes, sync_indexes
+    from models.order import order_model
+    from models.user import user_model
+    from models.rating import rating_model
+    from models.discount import discount_model
+    from models.driver_application import driver_application_model
+    import mongomock.collection
+
+# Real server for the query plan checks, e.g. mongodb://localhost:27017
+PLAN_TEST_URI = os.getenv("MONGODB_PLAN_TEST_URI", "")
+
+# Read/write commands whose plans are checked
+EXPLAINED_COMMANDS = ("find", "aggregate", "findAndModify", "update", "delete", "distinct")
+# Collection methods whose filters are checked under mongomock
+FILTERED_METHODS = ("find", "find_one", "count_documents", "update_one", "update_many", "delete_one", "delete_many",
+                    "find_one_and_update", "find_one_and_delete", "find_one_and_replace", "distinct", "aggregate")
+# Session/driver fields explain does not accept
+_DRIVER_FIELDS = ("lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction")
+
+
+class TestIndexSync(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        self.tearDown()
+
+    def tearDown(self):
+        # Leave no unique indexes behind for other test modules
+        for name in declared_indexes():
+            db_manager.db[name].drop()
+
+    def test_sync_is_idempotent(self):
+        report = sync_indexes()
+        self.assertFalse(report["unchanged"] or report["rebuilt"])
+        self.assertIn("users.reset_token_1", report["created"])
+        self.assertEqual(
+            self.db.route_cache.index_information()["key_1"]["key"], [("key", 1)]
+        )
+
+        again = sync_indexes()
+        self.assertEqual(sorted(again["unchanged"]), sorted(report["created"]))
+        self.assertFalse(again["created"] or again["rebuilt"] or again["unknown"])
+
+    def test_changed_and_undeclared_indexes(self):
+        self.db.orders.create_index([("driver_id", 1), ("status", 1)])
+        self.db.geocode_locks.create_index("expires_at", expireAfterSeconds=60)
+
+        report = sync_indexes()
+        self.assertIn("geocode_locks.expires_at_1", report["rebuilt"])
+        self.assertEqual(self.db.geocode_locks.index_information()["expires_at_1"]["expireAfterSeconds"], 0)
+        self.assertEqual(report["unknown"], ["orders.driver_id_1_status_1"])
+
+        report = sync_indexes(prune=True, dry_run=True)
+        self.assertEqual(report["dropped"], ["orders.driver_id_1_status_1"])
+        self.assertIn("driver_id_1_status_1", self.db.orders.index_information())
+
+        sync_indexes(prune=True)
+        self.assertNotIn("driver_id_1_status_1", self.db.orders.index_information())
+
+    def test_spec_validation(self):
+        with self.assertRaises(ValueError):
+            IndexSpec("a", background=True)
+        self.assertEqual(IndexSpec("a", ("b", -1)).name, "a_1_b_-1")
+
+
+class _CommandRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.recording = False
+        self.commands = []
+
+    def started(self, event):
+        if self.recording and event.command_name in EXPLAINED_COMMANDS:
+            self.commands.append((event.command_name, copy.deepcopy(dict(event.command))))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _winning_stages(node, in_plan=False):
+    """Stage names in the winning plans of an explain result"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            if key == "stage" and in_plan:
+                yield value
+            else:
+                yield from _winning_stages(value, in_plan or key == "winningPlan")
+    elif isinstance(node, list):
+        for item in node:
+            yield from _winning_stages(item, in_plan)
+
+
+class ModelQueries:
+    """Model query paths checked against the declared indexes.
+    Full-collection reconciliations (rebuild_*) run during seeding only."""
+
+    def _seed(self):
+        user_model.invalidate_cached()
+        order_model._dashboard_counts.clear()
+        user_model._list_counts.clear()
+        customer, _ = user_model.create_user("asiakas@example.com", "salasana1", "Anna Asiakas")
+        driver, _ = user_model.create_driver("kuski@example.com", "salasana1", "Kalle Kuski")
+        user_model.approve_user(driver["id"])
+        order_model.rebuild_order_counters()
+        return customer["id"], driver["id"]
+
+    def _exercise(self, customer_id, driver_id):
+        user_model.find_by_email("asiakas@example.com")
+        user_model.find_by_id(customer_id)
+        token, _ = user_model.generate_reset_token("asiakas@example.com")
+        user_model.validate_reset_token(token)
+        user_model.get_pending_users()
+        user_model.get_all_users()
+        user_model.get_all_drivers()
+        user_model.get_driver_stats()
+        user_model.get_user_stats()
+        page = user_model.get_users_page({"role": "user"}, per_page=1)
+        user_model.get_users_page({"role": "user"}, cursor=page["next_cursor"], per_page=1)
+        user_model.get_users_page({}, per_page=1)
+
+        orders = [order_model.create_order(customer_id, {"reg_number": f"ABC-{i}"})[0] for i in range(3)]
+        order_id = orders[0]["id"]
+        order_model.find_by_id(order_id, user_id=customer_id)
+        order_model.get_user_orders(customer_id)
+        order_model.get_all_orders()
+        order_model.update_status(order_id, order_model.STATUS_CONFIRMED)
+        order_model.get_available_orders()
+        order_model.assign_driver(order_id, driver_id)
+        order_model.get_orders_by_status(order_model.STATUS_NEW)
+        order_model.get_driver_orders(driver_id)
+        order_model.get_active_driver_orders(driver_id)
+        order_model.get_driver_job_stats()
+        order_model.get_recent_orders()
+        order_model.search_orders("abc", user_id=customer_id)
+        order_model.get_order_statistics()
+        order_model.is_first_order(customer_id)
+        order_model.update_price_gross(orders[1]["id"], 120.0)
+        order_model.delete_order(orders[2]["id"])
+        for kwargs in ({}, {"search": "kalle"}, {"status": "NEW"}, {"date_filter": "7days"}):
+            page = order_model.get_orders_with_driver_info_page(per_page=1, **kwargs)
+            if page["next_cursor"]:
+                order_model.get_orders_with_driver_info_page(cursor=page["next_cursor"], per_page=1, **kwargs)
+
+        rating, _ = rating_model.create_rating(order_id, customer_id, driver_id, 5, "Hyvä")
+        rating_model.moderate_review(rating["id"], rating_model.STATUS_APPROVED, 1)
+        rating_model.toggle_landing_visibility(rating["id"], True)
+        rating_model._landing_cache.clear()
+        rating_model.get_landing_reviews()
+        rating_model.get_order_rating(order_id)
+        rating_model.get_driver_ratings(driver_id)
+        rating_model.get_driver_performance(driver_id)
+        rating_model.get_all_reviews()
+        rating_model.get_all_reviews(status=rating_model.STATUS_APPROVED)
+        rating_model.get_reviews_with_details()
+        rating_model.rebuild_driver_rating_aggregates(driver_id)
+
+        discount, _ = discount_model.create_discount({
+            "name": "Kampanja", "type": discount_model.TYPE_PERCENTAGE, "value": 10,
+            "scope": discount_model.SCOPE_CODE, "code": "KESA"
+        })
+        discount_model.find_by_id(discount["id"])
+        discount_model.find_by_code("kesa")
+        discount_model.get_all_discounts()
+        discount_model.get_all_discounts(include_inactive=True)
+        discount_model.get_user_discounts(customer_id)
+        discount_model.invalidate_rules()
+        discount_model._rules = None
+        discount_model.get_applicable_discounts(customer_id, 50.0, 100.0)
+        discount_model.increment_usage(discount["id"], customer_id)
+        discount_model.get_discount_statistics(discount["id"])
+
+        application, _ = driver_application_model.create_application({"name": "Ville Hakija", "email": "ville@example.com"})
+        driver_application_model.find_by_id(application["id"])
+        driver_application_model.find_by_email("ville@example.com")
+        driver_application_model.get_pending_applications()
+        driver_application_model.get_all_applications()
+        driver_application_model.get_application_statistics()
+
+
+@unittest.skipUnless(PLAN_TEST_URI, "integration test: set MONGODB_PLAN_TEST_URI to a disposable MongoDB")
+class TestQueryPlansIntegration(ModelQueries, unittest.TestCase):
+    """
+    Integration test (needs a real MongoDB): runs the model query paths with
+    the declared indexes, then explains every command they sent: none may
+    COLLSCAN. TestQueriesUseDeclaredIndexes is the CI counterpart.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.recorder = _CommandRecorder()
+        cls.client = pymongo.MongoClient(PLAN_TEST_URI, event_listeners=[cls.recorder])
+        cls.saved = (db_manager._client, db_manager._db)
+        db_manager._client = cls.client
+        db_manager._db = cls.client["index_plan_test"]
+        cls.client.drop_database("index_plan_test")
+        sync_indexes()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.drop_database("index_plan_test")
+        cls.client.close()
+        db_manager._client, db_manager._db = cls.saved
+
+    def _explain(self, name, command):
+        db = db_manager.db
+        command = {key: value for key, value in command.items() if key not in _DRIVER_FIELDS}
+        # explain takes one write statement at a time
+        if name in ("update", "delete"):
+            statements_key = "updates" if name == "update" else "deletes"
+            for statement in command.pop(statements_key):
+                yield db.command("explain", {**command, statements_key: [statement]}, verbosity="queryPlanner")
+            return
+        yield db.command("explain", command, verbosity="queryPlanner")
+
+    def test_no_collection_scans(self):
+        customer_id, driver_id = self._seed()
+        self.recorder.commands.clear()
+        self.recorder.recording = True
+        try:
+            self._exercise(customer_id, driver_id)
+        finally:
+            self.recorder.recording = False
+
+        self.assertTrue(self.recorder.commands)
+        scans = []
+        for name, command in self.recorder.commands:
+            for plan in self._explain(name, command):
+                if "COLLSCAN" in set(_winning_stages(plan)):
+                    scans.append((name, {key: command.get(key) for key in (name, "filter", "pipeline", "sort", "query", "updates", "deletes") if key in command}))
+        self.assertEqual(scans, [], "\n".join(repr(scan) for scan in scans))
+
+
+class _FilterRecorder:
+    """Records the filter (or leading $match/$sort) of every outermost mongomock collection call"""
+
+    def __init__(self):
+        self.calls = []
+        self._local = threading.local()
+        self._patches = [patch.object(mongomock.collection.Collection, name, self._wrap(name))
+                         for name in FILTERED_METHODS]
+
+    def _wrap(self, name):
+        original = getattr(mongomock.collection.Collection, name)
+        recorder = self
+
+        def method(collection, *args, **kwargs):
+            depth = getattr(recorder._local, "depth", 0)
+            if depth == 0:
+                if name == "aggregate":
+                    query = args[0] if args else kwargs.get("pipeline")
+                elif name == "distinct":
+                    query = args[1] if len(args) > 1 else kwargs.get("filter")
+                else:
+                    query = args[0] if args else kwargs.get("filter")
+                recorder.calls.append((collection.name, name, query, kwargs.get("sort")))
+            recorder._local.depth = depth + 1
+            try:
+                return original(collection, *args, **kwargs)
+            finally:
+                recorder._local.depth = depth
+
+        return method
+
+    def __enter__(self):
+        for active in self._patches:
+            active.start()
+        return self
+
+    def __exit__(self, *exc):
+        for active in self._patches:
+            active.stop()
+
+
+def _filter_fields(query) -> list:
+    """Alternatives of top-level fields an index could serve ($or needs every branch served)"""
+    if not isinstance(query, dict):
+        return [set()]
+    fields = {key for key in query if not key.startswith("$")}
+    for clause in query.get("$and", []):
+        for branch in _filter_fields(clause):
+            fields |= branch
+    if "$or" in query and not fields:
+        return [branch for clause in query["$or"] for branch in _filter_fields(clause)]
+    return [fields]
+
+
+class TestQueriesUseDeclaredIndexes(ModelQueries, unittest.TestCase):
+    """
+    CI counterpart of TestQueryPlansIntegration: under mongomock there are no
+    query plans, so every filter the model paths send must at least start
+    with the leading field of a declared index (or _id). Empty filters
+    (whole-collection reads and counts) are not checked.
+    """
+
+    def setUp(self):
+        for name in list(declared_indexes()) + ["counters", "order_counters", "user_order_stats"]:
+            db_manager.db[name].drop()
+        rating_model._landing_cache.clear()
+
+    def tearDown(self):
+        self.setUp()
+
+    def test_filters_start_with_an_indexed_field(self):
+        leading = {name: {spec.keys[0][0] for spec in specs} | {"_id"}
+                   for name, specs in declared_indexes().items()}
+        customer_id, driver_id = self._seed()
+
+        with _FilterRecorder() as recorder:
+            self._exercise(customer_id, driver_id)
+        self.assertTrue(recorder.calls)
+
+        unindexed = []
+        for collection_name, method, query, sort in recorder.calls:
+            if method == "aggregate":
+                stages = list(query or [])
+                query = stages[0].get("$match") if stages else None
+                # Without a selective $match the leading $sort decides the index
+                sort = None if query else next((stage["$sort"] for stage in stages[:2] if "$sort" in stage), None)
+            sort_fields = {field for field, _ in sort} if isinstance(sort, list) else set(sort or {})
+            alternatives = [fields | sort_fields for fields in _filter_fields(query)]
+            if not query and not sort_fields:
+                continue
+            indexed = leading.get(collection_name, {"_id"})
+            if not all(fields & indexed for fields in alternatives):
+                unindexed.append((collection_name, method, query, sort))
+        self.assertEqual(unindexed, [], "\n".join(repr(call) for call in unindexed))
+
+
+if __name__ == "__main__":
+    unittest.main()
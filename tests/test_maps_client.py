@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+import services.maps_client as maps_client_module
+from services.maps_client import MapsClient, CircuitOpenError
+
+# Keep retries fast and the breaker easy to trip in tests (the module may
+# already be imported by other tests, so patch the constants, not the env)
+TEST_SETTINGS = {
+    "MAPS_RETRY_BACKOFF_SECONDS": 0,
+    "MAPS_MAX_RETRIES": 2,
+    "MAPS_BREAKER_FAILURES": 3,
+    "MAPS_BREAKER_RESET_SECONDS": 60,
+}
+
+
+class StubGoogleHandler(BaseHTTPRequestHandler):
+    """Local stand-in for maps.googleapis.com; replies from a scripted status list"""
+
+    responses = []
+    requests_seen = []
+
+    def do_GET(self):
+        StubGoogleHandler.requests_seen.append(self.path)
+        status = StubGoogleHandler.responses.pop(0) if StubGoogleHandler.responses else 200
+        body = json.dumps({"status": "OK", "predictions": [{"description": "Mannerheimintie 1, Helsinki"}]})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestMapsClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubGoogleHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubGoogleHandler.responses = []
+        StubGoogleHandler.requests_seen = []
+        settings = patch.multiple(maps_client_module, **TEST_SETTINGS)
+        settings.start()
+        self.addCleanup(settings.stop)
+        self.client = MapsClient(base_url=self.base_url)
+
+    def test_get_uses_pluggable_base_url(self):
+        data = self.client.get("autocomplete", {"input": "Mannerheimintie"})
+        self.assertEqual(data["status"], "OK")
+        self.assertTrue(StubGoogleHandler.requests_seen[0].startswith("/maps/api/place/autocomplete/json"))
+
+    def test_retries_transient_server_errors(self):
+        StubGoogleHandler.responses = [503, 500, 200]
+        data = self.client.get("geocode", {"address": "Helsinki"})
+        self.assertEqual(data["status"], "OK")
+
+        stats = self.client.get_stats()["geocode"]
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["latency"]["count"], 3)
+
+    def test_breaker_opens_after_repeated_failures(self):
+        StubGoogleHandler.responses = [503] * 9
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                self.client.get("directions", {"origin": "a", "destination": "b"})
+
+        seen = len(StubGoogleHandler.requests_seen)
+        with self.assertRaises(CircuitOpenError):
+            self.client.get("directions", {"origin": "a", "destination": "b"})
+        # Open breaker short-circuits without touching the network
+        self.assertEqual(len(StubGoogleHandler.requests_seen), seen)
+        self.assertEqual(self.client.get_stats()["directions"]["breaker"], "open")
+
+        # Other endpoints keep their own breaker
+        self.assertEqual(self.client.get("place_details", {"place_id": "x"})["status"], "OK")
+
+    def test_unexpected_error_in_trial_call_reopens_breaker(self):
+        breaker = self.client._breakers["geocode"]
+        breaker.state, breaker.opened_at = breaker.STATE_OPEN, time.monotonic() - 3600
+
+        with patch.object(self.client.session, "get", side_effect=requests.exceptions.TooManyRedirects("loop")):
+            with self.assertRaises(requests.exceptions.TooManyRedirects):
+                self.client.get("geocode", {"address": "Helsinki"})
+        # Not stuck half-open: the failed trial re-opens it and the next trial can go through
+        self.assertEqual(breaker.state, breaker.STATE_OPEN)
+
+        breaker.opened_at = time.monotonic() - 3600
+        self.assertEqual(self.client.get("geocode", {"address": "Helsinki"})["status"], "OK")
+        self.assertEqual(breaker.state, breaker.STATE_CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import datetime
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.order import OrderModel, ORDER_COUNTERS_ID
+
+
+def _nonzero(counts):
+    """Counter $incs leave zero entries behind that a rebuild does not write"""
+    if isinstance(counts, dict):
+        return {k: _nonzero(v) for k, v in counts.items() if v != 0}
+    return counts
+
+
+class TestOrderCounters(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        self.db.orders.drop()
+        self.db.order_counters.drop()
+        self.db.counters.drop()
+        self.model = OrderModel()
+
+    def _create(self, **fields):
+        order, error = self.model.create_order(1, {"pickup_address": "A", "dropoff_address": "B", **fields})
+        self.assertIsNone(error)
+        return order
+
+    def _stored(self):
+        counters = self.db.order_counters.find_one({"_id": ORDER_COUNTERS_ID})
+        counters.pop("rebuilt_at", None)
+        return counters
+
+    def _rebuilt(self):
+        counters = self.model.rebuild_order_counters()
+        counters.pop("rebuilt_at", None)
+        return counters
+
+    def test_writes_keep_counters_in_step_with_rebuild(self):
+        # Seed the document first, as on a deployed database
+        self.model.get_order_counters()
+
+        first = self._create()
+        second = self._create()
+        old = self._create(created_at=datetime.datetime(2025, 12, 31, 23, 30, tzinfo=datetime.timezone.utc))
+
+        self.model.update_status(first["id"], OrderModel.STATUS_CONFIRMED)
+        self.model.assign_driver(first["id"], 9)
+        self.model.update_driver_status(first["id"], OrderModel.STATUS_DRIVER_ARRIVED,
+                                        required_current_status=OrderModel.STATUS_ASSIGNED_TO_DRIVER)
+        # Guarded update that does not match leaves the counters alone
+        success, _ = self.model.update_driver_status(second["id"], OrderModel.STATUS_IN_TRANSIT,
+                                                     required_current_status=OrderModel.STATUS_DRIVER_ARRIVED)
+        self.assertFalse(success)
+        # Same status again is not double counted
+        self.model.update_status(old["id"], OrderModel.STATUS_NEW)
+        self.model.update_status(old["id"], OrderModel.STATUS_CANCELLED)
+        self.model.delete_order(second["id"])
+
+        stored = self._stored()
+        self.assertEqual(_nonzero(stored), self._rebuilt())
+        self.assertEqual(stored["total"], 2)
+        self.assertEqual(stored["by_day"]["2025-12-31"], {"total": 1, "NEW": 0, "CANCELLED": 1})
+
+        stats = self.model.get_order_statistics()
+        self.assertEqual(stats["total"], 2)
+        self.assertEqual(stats["driver_arrived"], 1)
+        self.assertEqual(stats["cancelled"], 1)
+        self.assertEqual(stats["new"], 0)
+
+    def test_missing_document_is_rebuilt_on_read(self):
+        self._create()
+        self._create()
+        self.db.order_counters.drop()
+        # A counter $inc before the first rebuild upserts a partial document
+        self._create()
+
+        self.assertEqual(self.model.get_order_statistics()["total"], 3)
+        self.assertIn("rebuilt_at", self.db.order_counters.find_one({"_id": ORDER_COUNTERS_ID}))
+
+    def test_page_total_from_counters(self):
+        for _ in range(5):
+            self._create()
+        self.model.update_status(1, OrderModel.STATUS_CONFIRMED)
+
+        first = self.model.get_orders_with_driver_info_page(per_page=2)
+        page = self.model.get_orders_with_driver_info_page(cursor=first["next_cursor"], per_page=2)
+        self.assertEqual((page["total"], [o["id"] for o in page["orders"]]), (5, [3, 2]))
+
+        with patch.object(self.model._dashboard_counts, "count", side_effect=AssertionError("counters expected")):
+            page = self.model.get_orders_with_driver_info_page(status=OrderModel.STATUS_NEW, date_filter="today")
+        self.assertEqual((page["total"], len(page["orders"])), (4, 4))
+
+        # Rolling windows and searches fall back to a cached count
+        page = self.model.get_orders_with_driver_info_page(date_filter="30days", search="1")
+        self.assertEqual(page["total"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.order import order_model, search_tokens
+    from models.user import user_model
+
+
+class TestOrderSearch(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("orders", "order_counters", "users", "counters"):
+            self.db[name].drop()
+        user_model.invalidate_cached()
+        order_model._dashboard_counts.clear()
+        self.db.users.insert_many([
+            {"id": 1, "name": "Anna-Liisa Virtanen", "email": "a@example.com"},
+            {"id": 2, "name": "Kalle Kuski", "email": "k@example.com"},
+        ])
+
+    def _search(self, term, **kwargs):
+        page = order_model.get_orders_with_driver_info_page(search=term, per_page=100, **kwargs)
+        self.assertEqual(page["total"], len(page["orders"]))
+        return sorted(order["id"] for order in page["orders"])
+
+    def test_tokens(self):
+        self.assertEqual(
+            search_tokens(42, "ABC-123", "Anna-Liisa  Virtanen"),
+            ["123", "42", "abc", "abc-123", "abc123", "anna", "anna-liisa", "annaliisa", "liisa", "virtanen"]
+        )
+
+    def test_search_on_denormalised_fields(self):
+        first, _ = order_model.create_order(1, {"reg_number": "ABC-123"})
+        second, _ = order_model.create_order(1, {"orderer_name": "Pekka Tilaaja", "customer_name": "Yritys Oy"})
+        order_model.assign_driver(second["id"], 2)
+
+        self.assertEqual(self._search("virt"), [first["id"]])
+        self.assertEqual(self._search("abc123"), [first["id"]])
+        self.assertEqual(self._search("Liisa  virtanen"), [first["id"]])
+        self.assertEqual(self._search("kalle"), [second["id"]])
+        self.assertEqual(self._search("yritys pekka"), [second["id"]])
+        self.assertEqual(self._search(str(second["id"])), [second["id"]])
+        self.assertEqual(self._search("kalle", date_filter="30days", status="NEW"), [])
+        # Regex metacharacters are literal
+        self.assertEqual(self._search("abc.*"), [])
+
+        # Joined names still come from the users collection on the page rows
+        orders = order_model.get_orders_with_driver_info_page(search="kalle")["orders"]
+        self.assertEqual((orders[0]["driver_name"], orders[0]["user_name"]), ("Kalle Kuski", "Anna-Liisa Virtanen"))
+
+    def test_tokens_follow_renames_and_manual_drivers(self):
+        order, _ = order_model.create_order(1, {})
+        user_model.update_user_profile(1, name="Anna Korhonen")
+        self.assertEqual(self._search("korho"), [order["id"]])
+        self.assertEqual(self._search("virtanen"), [])
+
+        order_model.update_one({"id": order["id"]}, {"$set": {"driver_name": "Ville Vuokrakuski"}})
+        self.assertEqual(self._search("vuokra"), [order["id"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager
+    from models.order import order_model
+    from models.user import user_model
+    from utils.pagination import CURSOR_NEXT, decode_cursor, encode_cursor
+
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("orders", "order_counters", "users", "counters"):
+            self.db[name].drop()
+        order_model._dashboard_counts.clear()
+        user_model._list_counts.clear()
+
+    def _walk(self, fetch):
+        """Follow next cursors to the end and prev cursors back; returns ids per page"""
+        pages, cursor = [], None
+        while True:
+            rows, next_cursor, prev_cursor = fetch(cursor)
+            pages.append([row["id"] for row in rows])
+            if not next_cursor:
+                break
+            cursor = next_cursor
+        back = [pages[-1]]
+        while prev_cursor:
+            rows, _, prev_cursor = fetch(prev_cursor)
+            back.append([row["id"] for row in rows])
+        self.assertEqual(back[::-1], pages)
+        return pages
+
+    def test_orders_pages(self):
+        for _ in range(7):
+            order_model.create_order(1, {})
+
+        def fetch(cursor):
+            page = order_model.get_orders_with_driver_info_page(cursor=cursor, per_page=3)
+            self.assertEqual(page["total"], 7)
+            return page["orders"], page["next_cursor"], page["prev_cursor"]
+
+        self.assertEqual(self._walk(fetch), [[7, 6, 5], [4, 3, 2], [1]])
+
+        page = order_model.get_orders_with_driver_info_page(status="NEW", per_page=10)
+        self.assertEqual((len(page["orders"]), page["next_cursor"], page["prev_cursor"]), (7, None, None))
+
+    def test_users_pages_with_missing_created_at(self):
+        start = datetime(2026, 1, 1)
+        self.db.users.insert_many(
+            [{"id": i, "role": "user", "created_at": start + timedelta(days=i // 2)} for i in range(1, 6)]
+            + [{"id": 6, "role": "user"}, {"id": 7, "role": "user", "created_at": None}, {"id": 8, "role": "admin"}]
+        )
+
+        def fetch(cursor):
+            page = user_model.get_users_page({"role": "user"}, cursor=cursor, per_page=2)
+            self.assertEqual(page["total"], 7)
+            return page["users"], page["next_cursor"], page["prev_cursor"]
+
+        pages = self._walk(fetch)
+        self.assertEqual(pages, [[5, 4], [3, 2], [1, 7], [6]])
+
+        # A tampered token shows the first page instead of injecting an operator
+        tampered = encode_cursor(CURSOR_NEXT, [{"$ne": None}, {"$lt": 5}])
+        page = user_model.get_users_page({"role": "user"}, cursor=tampered, per_page=2)
+        self.assertEqual([user["id"] for user in page["users"]], [5, 4])
+
+    def test_cursor_tokens(self):
+        when = datetime(2026, 3, 1, 12, 30)
+        token = encode_cursor(CURSOR_NEXT, [when, 4])
+        self.assertEqual(decode_cursor(token, 2), (CURSOR_NEXT, [when, 4]))
+        # Tampered or mismatched tokens fall back to the first page
+        self.assertIsNone(decode_cursor(token, 1))
+        self.assertIsNone(decode_cursor(token[:-3] + "!!!", 2))
+        self.assertIsNone(decode_cursor(encode_cursor("x", [1]), 1))
+        # Operators smuggled into the key never reach the query
+        for value in ({"$ne": None}, {"$where": "1"}, "abc", 1.5, True, [1]):
+            self.assertIsNone(decode_cursor(encode_cursor(CURSOR_NEXT, [value, 5]), 2))
+        self.assertIsNone(decode_cursor(encode_cursor(CURSOR_NEXT, [{"$dt": 5}, 5]), 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import sys
+import os
+import random
+import unittest
+from unittest.mock import patch
+import mongomock
+from flask import Flask
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from services.order_service import round_half_up
+    from services import pricing_engine
+    from services.pricing_engine import price_batch, price_batch_scalar, PRICE_FIELDS
+    from services.auth_service import auth_service
+    from routes.admin import admin_bp
+
+
+def _bits(values):
+    return [float(v).hex() for v in values]
+
+
+class TestPricingEngineParity(unittest.TestCase):
+    """Vectorised results must be bit-identical to the scalar pricing path"""
+
+    def setUp(self):
+        rng = random.Random(20240501)
+        # Tier edges, exact boundaries and random distances with up to three decimals
+        self.distances = [0, -5, 0.1, 1, 49.999, 50, 50.001, 169.9, 170, 170.05, 599.99, 600, 600.01, 1500]
+        self.distances += [round(rng.uniform(0, 900), rng.choice([0, 1, 2, 3])) for _ in range(400)]
+        self.metro = [rng.random() < 0.3 for _ in self.distances]
+
+    def test_numpy_available(self):
+        # numpy is in requirements.txt; without it production silently runs the scalar loop
+        self.assertTrue(pricing_engine.HAS_NUMPY)
+
+    def assertParity(self, discount=None, return_leg=False):
+        vector = price_batch(self.distances, self.metro, discount, return_leg)
+        scalar = price_batch_scalar(self.distances, self.metro, discount, return_leg)
+        for field in PRICE_FIELDS:
+            self.assertEqual(_bits(vector[field]), _bits(scalar[field]), field)
+
+    def test_round_half_up_array_matches_decimal(self):
+        rng = random.Random(7)
+        values = [1.005, 2.675, 33.885, 6.885, 0.125, -2.345, -0.001, 0.0, 1e13 + 0.005]
+        values += [rng.randint(0, 10 ** 7) / 1000 for _ in range(20000)]
+        values += [rng.uniform(-1000, 1000) for _ in range(20000)]
+        expected = [round_half_up(v, 2) for v in values]
+        self.assertEqual(_bits(pricing_engine.round_half_up_array(values)), _bits(expected))
+
+    def test_base_prices(self):
+        self.assertParity()
+        self.assertParity(return_leg=True)
+
+    def test_discount_types(self):
+        discounts = [
+            {"type": "percentage", "value": 12.5},
+            {"type": "fixed_amount", "value": 15},
+            {"type": "free_km", "value": 40},
+            {"type": "price_cap", "value": 90},
+            {"type": "custom_rate", "value": 0.33},
+            {"type": "tiered", "value": 0, "tiers": [{"min_km": 100, "percentage": 5}, {"min_km": 300, "percentage": 9}]},
+            {"type": "fixed_price", "value": 60},
+            {"type": "percentage", "value": 20, "min_distance_km": 100, "max_order_value": 150},
+            {"type": "percentage", "value": 10, "hide_from_customer": True},
+        ]
+        for discount in discounts:
+            with self.subTest(discount=discount):
+                self.assertParity(discount)
+
+
+class TestPricingEngineFallback(unittest.TestCase):
+    """Without numpy price_batch must give the same lists through the scalar path"""
+
+    def test_scalar_fallback(self):
+        distances = [0, 12.5, 50, 170.05, 600.01]
+        metro = [False, True, False, False, False]
+        discount = {"type": "percentage", "value": 10, "min_distance_km": 100}
+        expected = price_batch_scalar(distances, metro, discount)
+
+        with patch.object(pricing_engine, "HAS_NUMPY", False), \
+                patch.object(pricing_engine, "np", None):
+            result = price_batch(distances, metro, discount)
+        self.assertEqual(result, expected)
+        self.assertEqual(result["final_gross"][0], 0.0)
+        self.assertEqual(result["discount_amount"][1], 0.0)
+        self.assertGreater(result["discount_amount"][3], 0.0)
+
+
+class TestWhatIfEndpoint(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(admin_bp)
+        self.client = app.test_client()
+        admin = patch.object(auth_service, "require_admin", return_value=(True, {"id": 1}, None))
+        admin.start()
+        self.addCleanup(admin.stop)
+
+    def post(self, body):
+        return self.client.post("/admin/api/discounts/what-if", json=body)
+
+    def test_rejects_bad_input(self):
+        for body in ({"distances": ["nan"]}, {"distances": [float("inf")]}, {"distances": [10, -1]},
+                     {"distances": ["abc"]}, {"distances": [10], "discount_id": "abc"},
+                     {"distances": [10], "discount_id": [1]}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+    def test_prices_distances(self):
+        response = self.post({"distances": [0, "120.5"]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["distances"], [0.0, 120.5])
+        self.assertEqual(data["final_gross"][0], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
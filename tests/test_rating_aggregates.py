@@ -0,0 +1,99 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager, counter_manager
+    from models.rating import rating_model
+
+
+class TestDriverRatingAggregates(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("ratings", "users", "counters"):
+            self.db[name].drop()
+        counter_manager.forget()
+        self.db.users.insert_many([{"id": 10, "role": "driver"}, {"id": 11, "role": "driver"}])
+
+    def _aggregates(self, driver_id):
+        driver = self.db.users.find_one({"id": driver_id})
+        return {key: driver.get(key) for key in ("rating_sum", "total_ratings", "rating_histogram", "average_rating")}
+
+    def _rate(self, order_id, driver_id, stars):
+        rating, error = rating_model.create_rating(order_id, 1, driver_id, stars)
+        self.assertIsNone(error)
+        return rating
+
+    def test_create_hide_and_reapprove(self):
+        first = self._rate(1, 10, 5)
+        self._rate(2, 10, 2)
+        self._rate(3, 11, 4)
+        self.assertEqual(self._aggregates(10), {
+            "rating_sum": 7, "total_ratings": 2,
+            "rating_histogram": {"2": 1, "5": 1}, "average_rating": 3.5
+        })
+
+        self.assertEqual(rating_model.moderate_review(first["id"], rating_model.STATUS_HIDDEN, 99), (True, None))
+        self.assertEqual(self._aggregates(10), {
+            "rating_sum": 2, "total_ratings": 1,
+            "rating_histogram": {"2": 1, "5": 0}, "average_rating": 2.0
+        })
+
+        # Approving twice counts the rating back in once
+        rating_model.moderate_review(first["id"], rating_model.STATUS_APPROVED, 99)
+        rating_model.moderate_review(first["id"], rating_model.STATUS_APPROVED, 99)
+        self.assertEqual(self._aggregates(10)["total_ratings"], 2)
+        self.assertEqual(self._aggregates(10)["rating_sum"], 7)
+        self.assertEqual(self._aggregates(10)["average_rating"], 3.5)
+
+        self.assertEqual(rating_model.get_driver_performance(10), {
+            "average_rating": 3.5, "total_ratings": 2, "distribution": {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}
+        })
+
+    def test_legacy_driver_rebuilds_on_next_rating(self):
+        # Ratings and a total_ratings written before the running aggregates existed
+        self.db.ratings.insert_many([
+            {"id": 1, "order_id": 1, "driver_id": 10, "rating": 4, "status": "approved"},
+            {"id": 2, "order_id": 2, "driver_id": 10, "rating": 3, "status": "approved"},
+            {"id": 3, "order_id": 3, "driver_id": 10, "rating": 1, "status": "hidden"},
+        ])
+        self.db.users.update_one({"id": 10}, {"$set": {"total_ratings": 2, "average_rating": 3.5}})
+        self.db.counters.insert_one({"_id": "ratings", "value": 3})
+
+        self._rate(4, 10, 5)
+        self.assertEqual(self._aggregates(10), {
+            "rating_sum": 12, "total_ratings": 3,
+            "rating_histogram": {"1": 0, "2": 0, "3": 1, "4": 1, "5": 1}, "average_rating": 4.0
+        })
+
+    def test_full_rebuild_matches_incremental(self):
+        ratings = [self._rate(order_id, driver_id, stars)
+                   for order_id, (driver_id, stars) in enumerate([(10, 5), (10, 3), (11, 1), (11, 4)], start=1)]
+        rating_model.moderate_review(ratings[2]["id"], rating_model.STATUS_HIDDEN, 99)
+        self.db.users.insert_one({"id": 12, "role": "driver", "total_ratings": 3, "rating_sum": 9})
+
+        def normalized(driver_id):
+            aggregates = self._aggregates(driver_id)
+            histogram = aggregates["rating_histogram"] or {}
+            aggregates["rating_histogram"] = {star: count for star, count in histogram.items() if count}
+            return aggregates
+
+        incremental = {driver_id: normalized(driver_id) for driver_id in (10, 11)}
+        self.assertEqual(rating_model.rebuild_driver_rating_aggregates(), 2)
+        self.assertEqual({driver_id: normalized(driver_id) for driver_id in (10, 11)}, incremental)
+        # A driver with no approved ratings left is reset to zero
+        self.assertEqual(self._aggregates(12)["total_ratings"], 0)
+        self.assertEqual(self._aggregates(12)["average_rating"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
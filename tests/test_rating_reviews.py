@@ -0,0 +1,87 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager, counter_manager
+    from models.rating import rating_model
+
+
+class TestRatingReviews(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("ratings", "users", "orders", "counters"):
+            self.db[name].drop()
+        counter_manager.forget()
+        rating_model._landing_cache.clear()
+
+        self.db.users.insert_many([
+            {"id": 1, "name": "Matti Asiakas"}, {"id": 2, "name": "Liisa Asiakas"}, {"id": 10, "name": "Kalle Kuski"}
+        ])
+        self.db.orders.insert_many([{"id": 100 + i, "reg_number": f"ABC-{i}"} for i in range(4)])
+        # Customer 3 and order 103 no longer exist; one review has no driver
+        for order_id, customer_id, driver_id in ((100, 1, 10), (101, 2, 10), (102, 1, None), (103, 3, 10)):
+            rating, error = rating_model.create_rating(order_id, customer_id, driver_id, 5, "Hyvä")
+            self.assertIsNone(error)
+        self.db.orders.delete_one({"id": 103})
+
+    def _per_review_lookup(self, review):
+        """What the enrichment used to do: one find_one per referenced document"""
+        customer = self.db.users.find_one({"id": review["customer_id"]}) if review.get("customer_id") else None
+        driver = self.db.users.find_one({"id": review["driver_id"]}) if review.get("driver_id") else None
+        order = self.db.orders.find_one({"id": review["order_id"]}) if review.get("order_id") else None
+        return (
+            customer.get("name") if customer else "Tuntematon",
+            driver.get("name") if driver else "Ei kuljettajaa",
+            order.get("reg_number") if order else "-"
+        )
+
+    def test_details_batched_per_collection(self):
+        finds = []
+        original_find = mongomock.collection.Collection.find
+
+        def counting_find(collection, *args, **kwargs):
+            finds.append(collection.name)
+            return original_find(collection, *args, **kwargs)
+
+        with patch.object(mongomock.collection.Collection, "find", autospec=True, side_effect=counting_find):
+            reviews = rating_model.get_reviews_with_details()
+
+        self.assertEqual(sorted(finds), ["orders", "ratings", "users"])
+        self.assertEqual(len(reviews), 4)
+        for review in reviews:
+            self.assertEqual(
+                (review["customer_name"], review["driver_name"], review["order_reg_number"]),
+                self._per_review_lookup(review)
+            )
+
+    def test_landing_cache_cleared_by_writes(self):
+        ratings = list(self.db.ratings.find(sort=[("id", 1)]))
+        self.assertEqual(rating_model.get_landing_reviews(), [])
+
+        rating_model.toggle_landing_visibility(ratings[0]["id"], True)
+        landing = rating_model.get_landing_reviews()
+        self.assertEqual([(r["id"], r["customer_name"]) for r in landing], [(ratings[0]["id"], "Matti Asiakas")])
+
+        # Served from the cache until a write clears it
+        self.db.ratings.update_one({"id": ratings[1]["id"]}, {"$set": {"show_on_landing": True}})
+        self.assertEqual(len(rating_model.get_landing_reviews()), 1)
+
+        rating_model.moderate_review(ratings[0]["id"], rating_model.STATUS_HIDDEN, 99)
+        self.assertEqual([r["id"] for r in rating_model.get_landing_reviews()], [ratings[1]["id"]])
+
+        rating_model.toggle_landing_visibility(ratings[1]["id"], False)
+        self.assertEqual(rating_model.get_landing_reviews(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
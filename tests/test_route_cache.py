@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.route_cache import route_cache_model
+    from services.order_service import OrderService
+
+ROUTE = {"distance_km": 165.2, "latlngs": [[60.17, 24.94], [61.5, 23.76]], "provider": "google-directions"}
+KEY = "addr:mannerheimintie 1, helsinki:hämeenkatu 2, tampere"
+
+
+class TestRouteCache(unittest.TestCase):
+    def setUp(self):
+        route_cache_model.collection.drop()
+        self.service = OrderService()
+        self.service._save_route_cache(KEY, ROUTE, "Mannerheimintie 1, Helsinki", "Hämeenkatu 2, Tampere", "", "")
+        # Spy on Mongo while still reading and writing the mongomock collection
+        self.service.route_cache = MagicMock(wraps=route_cache_model.collection)
+
+    def test_memory_hit_skips_mongo(self):
+        cached = self.service._get_cached_route(KEY)
+        self.assertEqual((cached["distance_km"], cached["provider"]), (165.2, "route-cache"))
+        self.service.route_cache.find_one.assert_not_called()
+        self.assertEqual(self.service.get_route_cache_stats()["hits"], 1)
+
+    def test_expired_memory_entry_falls_through_to_mongo(self):
+        later = time.monotonic() + self.service._route_memory.ttl + 1
+        with patch("utils.cache.time.monotonic", return_value=later):
+            cached = self.service._get_cached_route(KEY)
+            self.assertEqual(cached["distance_km"], 165.2)
+            self.service.route_cache.find_one.assert_called_once()
+
+            # Refilled from Mongo, so the next read is a memory hit again
+            self.service._get_cached_route(KEY)
+        self.service.route_cache.find_one.assert_called_once()
+
+    def test_touches_are_batched_into_one_bulk_write(self):
+        stale = datetime.utcnow() - timedelta(days=30)
+        route_cache_model.collection.update_one({"key": KEY}, {"$set": {"last_used_at": stale}})
+
+        for _ in range(3):
+            self.service._get_cached_route(KEY)
+        self.service.route_cache.update_one.assert_not_called()
+        self.service.route_cache.bulk_write.assert_not_called()
+        self.assertEqual(self.service.get_route_cache_stats()["pending_touches"], 1)
+
+        # The next touch after the flush interval writes all pending keys at once
+        self.service._last_touch_flush -= 3600
+        self.service._get_cached_route(KEY)
+        self.service.route_cache.bulk_write.assert_called_once()
+        self.assertEqual(self.service.get_route_cache_stats()["pending_touches"], 0)
+        self.assertGreater(route_cache_model.collection.find_one({"key": KEY})["last_used_at"], stale)
+
+        # Shutdown flush (atexit) writes whatever is still pending
+        self.service._get_cached_route(KEY)
+        self.assertEqual(self.service.flush_route_cache_touches(), 1)
+        self.assertEqual(self.service.flush_route_cache_touches(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import os
+import time
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.route_cache import route_cache_model
+    from services.order_service import order_service
+
+DELAY = 0.3
+COORDS = {
+    "Mannerheimintie 1, Helsinki": {"lat": 60.17, "lng": 24.94},
+    "Hämeenkatu 2, Tampere": {"lat": 61.5, "lng": 23.76},
+}
+
+
+class TestRouteGeocode(unittest.TestCase):
+    def setUp(self):
+        route_cache_model.collection.drop()
+        order_service._route_memory.clear()
+
+    def _route(self, geocode):
+        route = {"distance_km": 165.2, "latlngs": [], "provider": "google-directions"}
+        with patch.object(order_service, "_geocode_address", side_effect=geocode), \
+                patch.object(order_service, "_fetch_google_route", return_value=route):
+            return order_service.get_route("Mannerheimintie 1, Helsinki", "Hämeenkatu 2, Tampere")
+
+    def test_legs_are_geocoded_concurrently(self):
+        def slow_geocode(address, place_id=None):
+            time.sleep(DELAY)
+            return COORDS[address]
+
+        started = time.perf_counter()
+        route = self._route(slow_geocode)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(route["distance_km"], 165.2)
+        self.assertLess(elapsed, DELAY * 1.8)
+        self.assertGreaterEqual(route["timings"]["geocode_pickup_ms"], DELAY * 1000 * 0.9)
+        self.assertGreaterEqual(route["timings"]["geocode_dropoff_ms"], DELAY * 1000 * 0.9)
+        self.assertLess(route["timings"]["geocode_ms"], DELAY * 1000 * 1.8)
+
+    def test_failing_leg_surfaces_as_route_error(self):
+        def geocode(address, place_id=None):
+            if address.startswith("Hämeenkatu"):
+                raise RuntimeError("geocode upstream down")
+            time.sleep(DELAY)
+            return COORDS[address]
+
+        started = time.perf_counter()
+        with self.assertRaises(RuntimeError):
+            self._route(geocode)
+        self.assertLess(time.perf_counter() - started, DELAY * 1.8)
+        # Callers pricing an order see no distance instead of a hang
+        with patch.object(order_service, "_geocode_address", side_effect=geocode):
+            self.assertEqual(order_service.calculate_route_distance("Mannerheimintie 1, Helsinki", "Hämeenkatu 2, Tampere"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
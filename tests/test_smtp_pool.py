@@ -0,0 +1,83 @@
+import sys
+import os
+import unittest
+from flask import Flask
+from flask_mail import Mail, Message
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+from services.smtp_pool import SMTPConnectionPool
+from scripts.smtp_stub_server import StubSMTPServer
+
+
+class TestSMTPConnectionPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubSMTPServer().start()
+        cls.app = Flask(__name__)
+        cls.app.config.update(
+            MAIL_SERVER="127.0.0.1", MAIL_PORT=cls.server.port, MAIL_USE_SSL=False, MAIL_USE_TLS=False,
+            MAIL_USERNAME="support@levoro.fi", MAIL_PASSWORD="salasana", MAIL_DEFAULT_SENDER="support@levoro.fi"
+        )
+        cls.mail = Mail(cls.app)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.pool = SMTPConnectionPool(self.mail, size=2, idle_timeout=60, max_messages=100)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        self.pool.close_idle(force=True)
+        self.ctx.pop()
+
+    def _messages(self, count):
+        return [Message(f"Tilaus {n}", recipients=[f"asiakas{n}@example.com"], body="Hei") for n in range(count)]
+
+    def test_session_reused_across_sends(self):
+        self.assertEqual(self.pool.send_many(self._messages(5)), [None] * 5)
+        for message in self._messages(3):
+            self.pool.send(message)
+        self.assertEqual(len(self.server.messages), 8)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.pool.get_stats()["reused"], 3)
+
+    def test_reconnects_on_4xx_and_dropped_session(self):
+        self.pool.send(self._messages(1)[0])
+        self.server.fail_next("MAIL", 421)
+        self.pool.send(self._messages(1)[0])
+
+        # Server closed the idle session on its side
+        self.server.drop_connections()
+        self.pool.send(self._messages(1)[0])
+
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 3)
+        self.assertEqual(self.pool.get_stats()["reconnects"], 2)
+
+    def test_gives_up_after_one_reconnect(self):
+        self.server.fail_next("MAIL", 554, "Rejected")
+        self.server.fail_next("MAIL", 554, "Rejected")
+        results = self.pool.send_many(self._messages(2))
+        self.assertEqual(results[0].smtp_code, 554)
+        self.assertIsNone(results[1])
+        self.assertEqual(len(self.server.messages), 1)
+
+    def test_idle_sessions_are_closed(self):
+        self.pool.idle_timeout = 0
+        self.pool.send(self._messages(1)[0])
+        self.pool.send(self._messages(1)[0])
+        self.assertEqual(self.server.connections, 2)
+
+        self.pool.idle_timeout = 60
+        self.assertEqual(self.pool.close_idle(force=True), 1)
+        self.assertEqual(self.pool.get_stats()["idle"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
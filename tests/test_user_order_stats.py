@@ -0,0 +1,95 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+import mongomock
+
+# Add current directory to path
+sys.path.insert(0, os.getcwd())
+
+os.environ["MONGODB_URI"] = "mongodb://mock-uri"
+os.environ["DB_NAME"] = "test_db"
+
+# Patch MongoClient BEFORE importing models.database
+with patch('pymongo.MongoClient', mongomock.MongoClient):
+    from models.database import db_manager, counter_manager
+    from models.order import order_model
+
+
+class TestUserOrderStats(unittest.TestCase):
+    def setUp(self):
+        self.db = db_manager.db
+        for name in ("orders", "order_counters", "user_order_stats", "counters", "users"):
+            self.db[name].drop()
+        counter_manager.forget()
+
+    def _stats(self, user_id):
+        stats = order_model.get_user_order_stats(user_id)
+        return {key: stats.get(key) for key in ("order_count", "last_order_number", "first_order_id", "lifetime_spend")}
+
+    def test_numbers_first_order_and_spend(self):
+        self.assertTrue(order_model.is_first_order(7))
+        first, _ = order_model.create_order(7, {"price_gross": 100.0})
+        second, _ = order_model.create_order(7, {"price_gross": 50.0})
+        other, _ = order_model.create_order(8, {})
+        self.assertEqual((first["user_order_number"], second["user_order_number"], other["user_order_number"]), (1, 2, 1))
+        self.assertFalse(order_model.is_first_order(7))
+
+        order_model.update_price_gross(second["id"], 80.0)
+        order_model.delete_order(first["id"])
+        self.assertEqual(self._stats(7), {
+            "order_count": 1, "last_order_number": 2, "first_order_id": second["id"], "lifetime_spend": 80.0
+        })
+
+        # Deleted numbers are not handed out again
+        third, _ = order_model.create_order(7, {})
+        self.assertEqual(third["user_order_number"], 3)
+
+        order_model.delete_order(second["id"])
+        order_model.delete_order(third["id"])
+        self.assertTrue(order_model.is_first_order(7))
+        self.assertIsNone(self._stats(7)["first_order_id"])
+
+    def test_failed_bookkeeping_after_insert_keeps_the_order(self):
+        with patch.object(order_model, "_count_order", side_effect=RuntimeError("counter down")):
+            first, error = order_model.create_order(7, {"price_gross": 100.0})
+        self.assertIsNone(error)
+        self.assertIsNotNone(order_model.find_by_id(first["id"]))
+        self.assertEqual(self._stats(7)["order_count"], 1)
+
+        # The persisted order's ID and number are not handed out again
+        second, _ = order_model.create_order(7, {})
+        self.assertNotEqual(second["id"], first["id"])
+        self.assertEqual(second["user_order_number"], 2)
+
+    def test_failed_insert_rolls_back(self):
+        with patch.object(order_model, "insert_one", side_effect=RuntimeError("write failed")):
+            order, error = order_model.create_order(7, {})
+        self.assertIsNone(order)
+        self.assertIn("write failed", error)
+        self.assertTrue(order_model.is_first_order(7))
+
+        first, _ = order_model.create_order(7, {})
+        self.assertEqual(first["user_order_number"], 1)
+
+    def test_seeded_from_existing_orders(self):
+        # Orders written before the stats existed, one without a number
+        self.db.orders.insert_many([
+            {"id": 3, "user_id": 5, "user_order_number": 1, "price_gross": 20.0},
+            {"id": 9, "user_id": 5, "user_order_number": 4, "price_gross": 30.0},
+            {"id": 11, "user_id": 5},
+        ])
+        order, _ = order_model.create_order(5, {"price_gross": 10.0})
+        self.assertEqual(order["user_order_number"], 5)
+        self.assertEqual(self._stats(5), {
+            "order_count": 4, "last_order_number": 5, "first_order_id": 3, "lifetime_spend": 60.0
+        })
+
+        # A full rebuild agrees with the incremental updates
+        incremental = self._stats(5)
+        order_model.rebuild_user_order_stats()
+        self.assertEqual(self._stats(5), incremental)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Keyset (cursor) pagination helpers.
+Pages are read with a range filter on the sort key instead of $skip, so every
+page costs the same. Links carry opaque next/prev tokens encoding the sort
+key of the last/first row shown.
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.cache import TTLCache
+
+CURSOR_NEXT = "n"
+CURSOR_PREV = "p"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def _is_key_value(value) -> bool:
+    """Sort key values a cursor may carry; anything else (e.g. {"$ne": null}) would become a query operator"""
+    return value is None or isinstance(value, datetime) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def encode_cursor(direction: str, key: Sequence) -> str:
+    """Opaque URL-safe token for a page boundary (direction CURSOR_NEXT/CURSOR_PREV)"""
+    raw = json.dumps([direction, [_encode_value(v) for v in key]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], key_length: int) -> Optional[Tuple[str, List]]:
+    """(direction, key) from a token, or None for a missing or tampered token (first page)"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        direction, key = json.loads(raw)
+        if direction not in (CURSOR_NEXT, CURSOR_PREV) or len(key) != key_length:
+            return None
+        key = [_decode_value(v) for v in key]
+        if not all(_is_key_value(v) for v in key):
+            return None
+        return direction, key
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_filter(fields: Sequence[str], key: Sequence, after: bool, nullable: Sequence[str] = ()) -> Dict:
+    """
+    Filter for rows after (or before) key in a descending sort on fields.
+
+    Missing/null values sort below everything in MongoDB, so for nullable
+    fields rows without a value come after every row that has one.
+    """
+    clauses = []
+    for index, field in enumerate(fields):
+        prefix = {fields[i]: key[i] for i in range(index)}
+        value = key[index]
+        if after:
+            if value is None:
+                continue  # Nothing sorts below null
+            clauses.append({**prefix, field: {"$lt": value}})
+            if field in nullable:
+                clauses.append({**prefix, field: None})
+        else:
+            clauses.append({**prefix, field: {"$ne": None} if value is None else {"$gt": value}})
+    if not clauses:
+        return {"_id": {"$exists": False}}  # Past the end: matches nothing
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def keyset_page(
+    collection,
+    match: Dict,
+    fields: Sequence[str],
+    cursor: Optional[str],
+    per_page: int,
+    nullable: Sequence[str] = (),
+    pipeline_tail: Optional[List[Dict]] = None,
+    projection: Optional[Dict] = None
+) -> Tuple[List[Dict], Optional[str], Optional[str]]:
+    """
+    One page of collection rows matching match, newest first on fields.
+
+    pipeline_tail runs on the page rows only (joins, $project); the sort key
+    fields must survive it. Without a tail, projection is applied to a find().
+    Returns (rows, next_cursor, prev_cursor).
+    """
+    decoded = decode_cursor(cursor, len(fields))
+    direction = decoded[0] if decoded else None
+    backwards = direction == CURSOR_PREV
+
+    filter_dict = dict(match)
+    if decoded:
+        boundary = keyset_filter(fields, decoded[1], after=not backwards, nullable=nullable)
+        filter_dict = {"$and": [match, boundary]} if match else boundary
+
+    sort_order = 1 if backwards else -1
+    if pipeline_tail is None:
+        cursor_obj = collection.find(filter_dict, projection or {"_id": 0})
+        rows = list(cursor_obj.sort([(field, sort_order) for field in fields]).limit(per_page + 1))
+    else:
+        rows = list(collection.aggregate([
+            {"$match": filter_dict},
+            {"$sort": {field: sort_order for field in fields}},
+            {"$limit": per_page + 1},
+            *pipeline_tail
+        ]))
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def key_of(row):
+        return [row.get(field) for field in fields]
+
+    if not rows:
+        return rows, None, None
+    # Coming back from a later page there is always a next page, and vice versa
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else direction is not None
+    next_cursor = encode_cursor(CURSOR_NEXT, key_of(rows[-1])) if has_next else None
+    prev_cursor = encode_cursor(CURSOR_PREV, key_of(rows[0])) if has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+class ApproximateCounter:
+    """count_documents results cached per filter key for a short TTL"""
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 256):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def count(self, collection, filter_dict: Dict, key) -> int:
+        """Cached count for key; filter_dict is only evaluated on a miss"""
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        total = collection.count_documents(filter_dict) if filter_dict else collection.estimated_document_count()
+        self._cache.set(key, total)
+        return total
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        return self._cache.stats()